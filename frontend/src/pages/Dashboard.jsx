@@ -413,6 +413,58 @@ export default function Dashboard() {
   break;
 
 
+      case "dashboard_batch":
+        // Пачка обновлений за один тик: последние состояния роботов, свежие сканы и статистика
+        setData(prevData => {
+          if (!prevData) return prevData;
+
+          const { robots = [], scans = [], statistics } = lastMessage.data;
+
+          const newRobots = [...prevData.robots];
+          robots.forEach(robot => {
+            const robotIndex = newRobots.findIndex(r => r.id === robot.id);
+            if (robotIndex !== -1) {
+              newRobots[robotIndex] = robot;
+            } else {
+              newRobots.push(robot);
+            }
+          });
+
+          // Сканы в пачке идут от старых к новым, в таблице - от новых к старым
+          const newScans = [...scans].reverse();
+          const scanIds = newScans.map(scan => `${scan.robot_id}-${scan.time}`);
+          setNewScanIds(prev => new Set([...prev, ...scanIds]));
+          setTimeout(() => {
+            setNewScanIds(prev => {
+              const newSet = new Set(prev);
+              scanIds.forEach(id => newSet.delete(id));
+              return newSet;
+            });
+          }, 2000);
+
+          return {
+            ...prevData,
+            robots: newRobots,
+            recent_scans: [...newScans, ...prevData.recent_scans].slice(0, 20),
+            statistics: {
+              ...prevData.statistics,
+              ...(robots.length > 0 && {
+                active_robots: newRobots.filter(r => r.status === "active").length,
+                total_robots: newRobots.length,
+                avg_battery: Math.round(
+                  newRobots.reduce((sum, r) => sum + (r.battery || 0), 0) / newRobots.length
+                ),
+              }),
+              ...(statistics && {
+                checked_today: statistics.checked_today,
+                critical_stock: statistics.critical_stock,
+              }),
+            },
+          };
+        });
+        setLastUpdated(new Date().toLocaleTimeString());
+        break;
+
       case "inventory_alert":
         // Критический остаток
         const alert = {
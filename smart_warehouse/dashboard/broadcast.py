@@ -0,0 +1,109 @@
+import threading
+from collections import deque
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+
+DASHBOARD_GROUP = 'dashboard_updates'
+
+
+class DashboardBroadcaster:
+    """
+    Агрегатор событий для группы dashboard_updates.
+
+    robot_update и new_scan буферизуются на DASHBOARD_BROADCAST_TICK секунд
+    и уходят одним сообщением dashboard_batch: по каждому роботу остаётся
+    только последнее состояние, сканов - не больше DASHBOARD_BROADCAST_MAX_SCANS
+    самых свежих. inventory_alert и import_progress отправляются сразу.
+    При DASHBOARD_BROADCAST_TICK = 0 все события отправляются без буферизации.
+    """
+
+    def __init__(self, tick=None, max_scans=None):
+        self.tick = tick if tick is not None else getattr(settings, 'DASHBOARD_BROADCAST_TICK', 0.25)
+        self.max_scans = max_scans or getattr(settings, 'DASHBOARD_BROADCAST_MAX_SCANS', 50)
+        self._lock = threading.Lock()
+        self._robots = {}
+        self._scans = deque(maxlen=self.max_scans)
+        self._statistics = None
+        self._timer = None
+
+    def robot_update(self, data):
+        if not self.tick:
+            self._send('robot_update', data)
+            return
+
+        with self._lock:
+            self._robots[data['id']] = data
+            self._schedule()
+
+    def new_scan(self, data):
+        if not self.tick:
+            self._send('new_scan', data)
+            return
+
+        with self._lock:
+            self._scans.append(data)
+            if data.get('statistics'):
+                self._statistics = data['statistics']
+            self._schedule()
+
+    def inventory_alert(self, data):
+        self._send('inventory_alert', data)
+
+    def import_progress(self, data):
+        """Прогресс фонового импорта CSV: события редкие (раз в порцию строк), отправляются сразу"""
+        self._send('import_progress', data)
+
+    def flush(self):
+        """Отправляет накопленные события одним сообщением"""
+        with self._lock:
+            self._timer = None
+            if not self._robots and not self._scans:
+                return
+            batch = {
+                'robots': list(self._robots.values()),
+                'scans': list(self._scans),
+                'statistics': self._statistics,
+            }
+            self._robots = {}
+            self._scans.clear()
+            self._statistics = None
+
+        self._send('dashboard_batch', batch)
+
+    def _schedule(self):
+        # Вызывается под self._lock
+        if self._timer is None:
+            self._timer = threading.Timer(self.tick, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    @staticmethod
+    def _send(message_type, data):
+        channel_layer = get_channel_layer()
+        if not channel_layer:
+            return
+
+        async_to_sync(channel_layer.group_send)(
+            DASHBOARD_GROUP,
+            {
+                'type': message_type,
+                'data': data
+            }
+        )
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster():
+    """Возвращает общий для процесса агрегатор событий дашборда"""
+    global _broadcaster
+    if _broadcaster is None:
+        with _broadcaster_lock:
+            if _broadcaster is None:
+                _broadcaster = DashboardBroadcaster()
+    return _broadcaster
@@ -3,8 +3,7 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from robots.models import Robot
 from warehouse.models import InventoryHistory
-from django.utils import timezone
-from datetime import datetime, time
+from warehouse.services import ScanCounterService
 
 
 class DashboardConsumer(AsyncWebsocketConsumer):
@@ -65,19 +64,28 @@ class DashboardConsumer(AsyncWebsocketConsumer):
             'data': event['data']
         }))
 
+    async def import_progress(self, event):
+        """Прогресс фонового импорта CSV"""
+        await self.send(text_data=json.dumps({
+            'type': 'import_progress',
+            'data': event['data']
+        }))
+
+    async def dashboard_batch(self, event):
+        """Пачка обновлений за один тик агрегатора (роботы, сканы, статистика)"""
+        await self.send(text_data=json.dumps({
+            'type': 'dashboard_batch',
+            'data': event['data']
+        }))
+
     @database_sync_to_async
     def get_initial_data(self):
         """Получение начальных данных"""
         robots = Robot.objects.all()
         recent_scans = InventoryHistory.objects.order_by('-scanned_at')[:20]
 
-        # Получаем начало сегодняшнего дня
-        today_start = timezone.make_aware(
-            datetime.combine(timezone.now().date(), time.min)
-        )
-
-        # Сканирования за сегодня для статистики
-        today_scans = InventoryHistory.objects.filter(scanned_at__gte=today_start)
+        # Статистика за сегодня из дневных счётчиков
+        today_stats = ScanCounterService.get_day_statistics()
 
         return {
             'robots': [
@@ -105,8 +113,8 @@ class DashboardConsumer(AsyncWebsocketConsumer):
             'statistics': {
                 'active_robots': robots.filter(is_active=True).count(),
                 'total_robots': robots.count(),
-                'checked_today': today_scans.count(),
-                'critical_stock': today_scans.filter(status="CRITICAL").count(),
+                'checked_today': today_stats['checked_today'],
+                'critical_stock': today_stats['critical_stock'],
                 'avg_battery': round(sum(r.battery_level for r in robots) / robots.count()) if robots.count() > 0 else 0
             }
         }
@@ -0,0 +1,148 @@
+import time
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from inventory.services import lttb_indices
+
+
+def legacy_lttb_downsample(data, threshold):
+    """
+    Исходная поточечная реализация lttb_downsample - эталон для сравнения результатов.
+    """
+    if len(data) <= threshold:
+        return data
+
+    if threshold < 3:
+        return data[:threshold] if len(data) >= threshold else data
+
+    points = []
+    seen_timestamps = set()
+
+    for d in data:
+        timestamp = datetime.fromisoformat(d['scanned_at'].replace('Z', '+00:00')).timestamp()
+
+        original_timestamp = timestamp
+        counter = 0
+        while timestamp in seen_timestamps:
+            counter += 1
+            timestamp = original_timestamp + (counter * 0.001)
+
+        seen_timestamps.add(timestamp)
+
+        y = float(d['quantity']) if d['quantity'] is not None else 0.0
+        points.append({'x': timestamp, 'y': y, 'original': d})
+
+    points.sort(key=lambda p: p['x'])
+
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+
+    for i in range(threshold - 2):
+        avg_range_start = int((i + 1) * bucket_size) + 1
+        avg_range_end = int((i + 2) * bucket_size) + 1
+        avg_range_end = min(avg_range_end, len(points))
+
+        if avg_range_start >= avg_range_end:
+            continue
+
+        avg_x = 0
+        avg_y = 0
+        avg_range_length = avg_range_end - avg_range_start
+
+        for j in range(avg_range_start, avg_range_end):
+            avg_x += points[j]['x']
+            avg_y += points[j]['y']
+
+        avg_x /= avg_range_length
+        avg_y /= avg_range_length
+
+        range_start = int(i * bucket_size) + 1
+        range_end = int((i + 1) * bucket_size) + 1
+        range_end = min(range_end, len(points))
+
+        if range_start >= range_end:
+            continue
+
+        max_area = -1
+        max_area_point = None
+        point_a = sampled[-1]
+
+        for j in range(range_start, range_end):
+            area = abs(
+                (point_a['x'] - avg_x) * (points[j]['y'] - point_a['y']) -
+                (point_a['x'] - points[j]['x']) * (avg_y - point_a['y'])
+            ) * 0.5
+
+            if area > max_area:
+                max_area = area
+                max_area_point = points[j]
+
+        if max_area_point is not None:
+            sampled.append(max_area_point)
+
+    sampled.append(points[-1])
+
+    return [p['original'] for p in sampled]
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает исходный поточечный LTTB с lttb_indices (NumPy) на синтетических рядах "
+        "и проверяет, что выбираются одни и те же точки"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[10_000, 100_000, 1_000_000, 10_000_000],
+            help='Количество точек в ряду'
+        )
+        parser.add_argument('--threshold', type=int, default=200, help='Целевое количество точек')
+        parser.add_argument(
+            '--legacy-max-points',
+            type=int,
+            default=1_000_000,
+            help='Не запускать исходную реализацию на рядах длиннее этого'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        threshold = options['threshold']
+
+        for size in options['sizes']:
+            # Сканы раз в ~30 с с повторами отметок времени и случайным остатком
+            start = datetime(2025, 1, 1, tzinfo=dt_timezone.utc).timestamp()
+            x = start + np.cumsum(rng.integers(0, 60, size)).astype(np.float64)
+            y = rng.integers(0, 200, size).astype(np.float64)
+
+            started = time.perf_counter()
+            indices = lttb_indices(x, y, threshold)
+            numpy_ms = (time.perf_counter() - started) * 1000
+
+            line = f"{size:>10} точек: NumPy {numpy_ms:9.1f} мс"
+
+            if size <= options['legacy_max_points']:
+                data = [
+                    {
+                        'scanned_at': datetime.fromtimestamp(ts, dt_timezone.utc).isoformat(),
+                        'quantity': int(q),
+                    }
+                    for ts, q in zip(x, y)
+                ]
+                started = time.perf_counter()
+                legacy = legacy_lttb_downsample(data, threshold)
+                legacy_ms = (time.perf_counter() - started) * 1000
+
+                identical = [data[i] for i in indices] == legacy
+                line += (
+                    f", исходный {legacy_ms:9.1f} мс (x{legacy_ms / max(numpy_ms, 1e-6):.0f}), "
+                    f"{'совпадает' if identical else 'ОТЛИЧАЕТСЯ'}"
+                )
+                self.stdout.write(self.style.SUCCESS(line) if identical else self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from inventory.services import ExportJobService
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет задания экспорта, завершённые раньше срока хранения (EXPORT_JOB_TTL_HOURS), "
+        "вместе с файлами выгрузок, и помечает прерванными задания остановленных процессов. "
+        "Запускать по расписанию."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=None,
+            help='Срок хранения в часах вместо EXPORT_JOB_TTL_HOURS'
+        )
+
+    def handle(self, *args, **options):
+        before = None
+        if options['hours'] is not None:
+            before = timezone.now() - timedelta(hours=options['hours'])
+
+        orphaned = ExportJobService.fail_orphaned()
+        deleted = ExportJobService.expire(before)
+        self.stdout.write(self.style.SUCCESS(
+            f"Прервано заданий без живого процесса: {orphaned}, удалено заданий экспорта: {deleted}"
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from inventory.services import ImportJobService
+
+
+class Command(BaseCommand):
+    help = (
+        "Помечает прерванными задания импорта CSV остановленных процессов и удаляет "
+        "загруженные файлы, не принадлежащие незавершённым заданиям. Запускать по расписанию."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=None,
+            help='Удалять файлы старше стольких секунд вместо BACKGROUND_JOB_STALE_SECONDS'
+        )
+
+    def handle(self, *args, **options):
+        orphaned = ImportJobService.fail_orphaned()
+        removed = ImportJobService.cleanup_orphaned_files(options['min_age'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Прервано заданий без живого процесса: {orphaned}, удалено файлов без задания: {removed}"
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from inventory.services import ObservationService
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересобирает единое хранилище наблюдений (inventory_observations) по inventory_history "
+        "и импортам CSV - после записи в источники в обход сервисов"
+    )
+
+    def handle(self, *args, **options):
+        rows = ObservationService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Наблюдения пересобраны: {rows} строк"))
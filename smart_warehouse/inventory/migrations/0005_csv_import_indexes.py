@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:43
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY не блокирует запись сканирований, но не работает в транзакции
+    atomic = False
+
+    dependencies = [
+        ('inventory', '0004_inventorycsvimport_status'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='inventorycsvimport',
+            index=models.Index(fields=['-scanned_at'], name='csv_import_scanned_at_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='inventorycsvimport',
+            index=models.Index(condition=models.Q(('row_number__isnull', False)), fields=['zone', 'row_number', '-scanned_at'], name='csv_import_cell_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='inventorycsvimport',
+            index=models.Index(fields=['product_id', '-scanned_at'], name='csv_import_product_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:58
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_csv_import_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('format', models.CharField(choices=[('xlsx', 'Excel'), ('pdf', 'PDF'), ('csv', 'CSV'), ('ndjson', 'NDJSON')], max_length=10)),
+                ('params', models.JSONField(default=dict)),
+                ('params_hash', models.CharField(max_length=64)),
+                ('status', models.CharField(choices=[('PENDING', 'В очереди'), ('RUNNING', 'Выполняется'), ('DONE', 'Готово'), ('FAILED', 'Ошибка')], default='PENDING', max_length=10)),
+                ('rows_total', models.IntegerField(blank=True, null=True)),
+                ('rows_done', models.IntegerField(default=0)),
+                ('file_path', models.CharField(blank=True, max_length=500)),
+                ('file_size', models.BigIntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='export_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Задание экспорта',
+                'verbose_name_plural': 'Задания экспорта',
+                'db_table': 'export_jobs',
+                'indexes': [models.Index(fields=['params_hash', '-created_at'], name='export_job_hash_idx')],
+            },
+        ),
+    ]
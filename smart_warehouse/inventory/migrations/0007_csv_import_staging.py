@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:00
+
+from django.db import migrations, models
+
+
+def set_unlogged(apps, schema_editor):
+    """Строки staging живут только во время импорта: WAL для них не пишется (только PostgreSQL)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('ALTER TABLE inventory_csv_import_staging SET UNLOGGED')
+
+
+def set_logged(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('ALTER TABLE inventory_csv_import_staging SET LOGGED')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_export_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CSVImportStaging',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_id', models.UUIDField(db_index=True)),
+                ('row_num', models.IntegerField()),
+                ('product_id', models.CharField(max_length=50)),
+                ('product_name', models.CharField(max_length=255)),
+                ('quantity', models.IntegerField()),
+                ('zone', models.CharField(max_length=10)),
+                ('row_number', models.IntegerField(blank=True, null=True)),
+                ('shelf_number', models.IntegerField(blank=True, null=True)),
+                ('scanned_at', models.DateTimeField()),
+                ('status', models.CharField(max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Строка импорта CSV (staging)',
+                'verbose_name_plural': 'Строки импорта CSV (staging)',
+                'db_table': 'inventory_csv_import_staging',
+            },
+        ),
+        migrations.RunPython(set_unlogged, set_logged),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:11
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_csv_import_staging'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file_name', models.CharField(max_length=255)),
+                ('file_path', models.CharField(blank=True, max_length=500)),
+                ('file_size', models.BigIntegerField(default=0)),
+                ('atomic', models.BooleanField(default=True)),
+                ('status', models.CharField(choices=[('QUEUED', 'В очереди'), ('VALIDATING', 'Проверка'), ('WRITING', 'Запись'), ('DONE', 'Готово'), ('FAILED', 'Ошибка')], default='QUEUED', max_length=10)),
+                ('rows_processed', models.IntegerField(default=0)),
+                ('created_count', models.IntegerField(default=0)),
+                ('total_errors', models.IntegerField(default=0)),
+                ('total_warnings', models.IntegerField(default=0)),
+                ('errors', models.JSONField(default=list)),
+                ('warnings', models.JSONField(default=list)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Задание импорта CSV',
+                'verbose_name_plural': 'Задания импорта CSV',
+                'db_table': 'import_jobs',
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from inventory.services.csv_import import calculate_status_sql
+
+
+def copy_observations(apps, schema_editor):
+    """
+    Переносит существующие сканирования и строки импорта CSV в inventory_observations.
+    Статус строк CSV вычисляется по количеству: старые импорты сохраняли status='OK' для любого остатка.
+    """
+    quote = schema_editor.connection.ops.quote_name
+    history = quote(apps.get_model('warehouse', 'InventoryHistory')._meta.db_table)
+    imports = quote(apps.get_model('inventory', 'InventoryCSVImport')._meta.db_table)
+    products = quote(apps.get_model('products', 'Product')._meta.db_table)
+    columns = (
+        'source, source_id, robot_id, product_id, product_name, zone, row_number, '
+        'shelf_number, quantity, expected_quantity, status, scanned_at, created_at'
+    )
+
+    schema_editor.execute(
+        f"INSERT INTO inventory_observations ({columns}) "
+        f"SELECT 'history', t.id, t.robot_id, t.product_id, COALESCE(p.name, ''), t.zone, t.row_number, "
+        f"t.shelf_number, t.quantity, t.expected_quantity, t.status, t.scanned_at, t.created_at "
+        f"FROM {history} t LEFT JOIN {products} p ON p.id = t.product_id"
+    )
+    schema_editor.execute(
+        f"INSERT INTO inventory_observations ({columns}) "
+        f"SELECT 'csv', t.id, NULL, t.product_id, t.product_name, t.zone, t.row_number, "
+        f"t.shelf_number, t.quantity, NULL, {calculate_status_sql('t.quantity')}, t.scanned_at, t.created_at "
+        f"FROM {imports} t"
+    )
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("ANALYZE inventory_observations")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_import_jobs'),
+        ('products', '0002_product_optimal_stock_alter_product_min_stock'),
+        ('warehouse', '0012_scanrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryObservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('history', 'Сканирование робота'), ('csv', 'Импорт CSV')], max_length=10)),
+                ('source_id', models.BigIntegerField()),
+                ('robot_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('product_name', models.CharField(blank=True, default='', max_length=255)),
+                ('zone', models.CharField(max_length=10)),
+                ('row_number', models.IntegerField(blank=True, null=True)),
+                ('shelf_number', models.IntegerField(blank=True, null=True)),
+                ('quantity', models.IntegerField()),
+                ('expected_quantity', models.IntegerField(blank=True, null=True)),
+                ('status', models.CharField(blank=True, max_length=50, null=True)),
+                ('scanned_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField()),
+                ('product', models.ForeignKey(db_column='product_id', db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Наблюдение остатка',
+                'verbose_name_plural': 'Наблюдения остатков',
+                'db_table': 'inventory_observations',
+                'indexes': [models.Index(fields=['-scanned_at', '-source', '-id'], name='inv_obs_scanned_at_idx'), models.Index(fields=['product', 'scanned_at'], name='inv_obs_product_idx'), models.Index(fields=['zone', '-scanned_at'], name='inv_obs_zone_idx')],
+                'constraints': [models.UniqueConstraint(fields=('source', 'source_id'), name='inv_obs_source_uniq')],
+            },
+        ),
+        migrations.RunPython(copy_observations, migrations.RunPython.noop),
+    ]
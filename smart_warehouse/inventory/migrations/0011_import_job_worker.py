@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_export_job_worker'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='worker',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,128 @@
+import re
+from datetime import date
+
+from django.db import migrations, models
+
+# Сколько месяцев вперёд создать партиций при миграции (дальше их ведёт manage_history_partitions)
+AHEAD_MONTHS = 3
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def restore_constraints(schema_editor, model, primary_key):
+    """Первичный ключ, ограничения и индексы новой таблицы inventory_observations - под именами из модели"""
+    table = model._meta.db_table
+
+    schema_editor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY ({primary_key})")
+    for constraint in model._meta.constraints:
+        schema_editor.add_constraint(model, constraint)
+    for index in model._meta.indexes:
+        schema_editor.add_index(model, index)
+
+
+def history_months(cursor):
+    """Месяцы присоединённых партиций inventory_history"""
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'inventory_history'::regclass"
+    )
+    months = set()
+    for (name,) in cursor.fetchall():
+        match = re.fullmatch(r'inventory_history_p(\d{4})(\d{2})', name)
+        if match:
+            months.add(date(int(match.group(1)), int(match.group(2)), 1))
+    return months
+
+
+def partition_observations(apps, schema_editor):
+    """
+    Пересоздаёт inventory_observations как PARTITION BY LIST (source): строки CSV - в inventory_observations_csv,
+    сканирования роботов - в inventory_observations_history, PARTITION BY RANGE (scanned_at) с помесячными
+    партициями, как у inventory_history (срок хранения удаляет месяцы обеих таблиц целиком).
+    Выполняется в транзакции миграции: при ошибке таблица остаётся прежней.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    model = apps.get_model('inventory', 'InventoryObservation')
+    table = model._meta.db_table
+    legacy = f"{table}_legacy"
+    history = f"{table}_history"
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"SELECT MAX(id), now() FROM {table}")
+        max_id, now = cursor.fetchone()
+        months = history_months(cursor)
+
+    # Те же месяцы, что у inventory_history: строки вне них, как и в истории, лежат в default-партиции
+    current = date(now.year, now.month, 1)
+    months.update(add_months(current, offset) for offset in range(AHEAD_MONTHS + 1))
+
+    schema_editor.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+    # LIKE без INCLUDING: копируются колонки и NOT NULL, но не identity, ключи и индексы старой таблицы
+    schema_editor.execute(f"CREATE TABLE {table} (LIKE {legacy}) PARTITION BY LIST (source)")
+    schema_editor.execute(f"CREATE TABLE {table}_csv PARTITION OF {table} FOR VALUES IN ('csv')")
+    schema_editor.execute(
+        f"CREATE TABLE {history} PARTITION OF {table} FOR VALUES IN ('history') PARTITION BY RANGE (scanned_at)"
+    )
+    for month in sorted(months):
+        schema_editor.execute(
+            f"CREATE TABLE {history}_p{month:%Y%m} PARTITION OF {history} "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+        )
+    schema_editor.execute(f"CREATE TABLE {history}_default PARTITION OF {history} DEFAULT")
+
+    schema_editor.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+    schema_editor.execute(f"DROP TABLE {legacy}")
+
+    schema_editor.execute(f"CREATE SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    schema_editor.execute(f"SELECT setval('{table}_id_seq', {(max_id or 0) + 1}, false)")
+    schema_editor.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{table}_id_seq')")
+
+    restore_constraints(schema_editor, model, 'id, source, scanned_at')
+    schema_editor.execute(f"ANALYZE {table}")
+
+
+def unpartition_observations(apps, schema_editor):
+    """Обратная миграция: обычная таблица с первичным ключом id"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    model = apps.get_model('inventory', 'InventoryObservation')
+    table = model._meta.db_table
+    legacy = f"{table}_partitioned"
+
+    schema_editor.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+    schema_editor.execute(f"CREATE TABLE {table} (LIKE {legacy})")
+    schema_editor.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+    schema_editor.execute(f"DROP TABLE {legacy} CASCADE")
+
+    schema_editor.execute(f"ALTER TABLE {table} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY")
+    schema_editor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+    )
+
+    restore_constraints(schema_editor, model, 'id')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_import_job_worker'),
+        ('warehouse', '0012_scanrollup'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='inventoryobservation',
+            name='inv_obs_source_uniq',
+        ),
+        migrations.AddConstraint(
+            model_name='inventoryobservation',
+            constraint=models.UniqueConstraint(fields=('source', 'source_id', 'scanned_at'), name='inv_obs_source_uniq'),
+        ),
+        migrations.RunPython(partition_observations, unpartition_observations),
+    ]
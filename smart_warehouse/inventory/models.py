@@ -1,3 +1,6 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
 
 class InventoryCSVImport(models.Model):
@@ -15,7 +18,202 @@ class InventoryCSVImport(models.Model):
 
     class Meta:
         verbose_name = "Импорт CSV"
+        indexes = [
+            models.Index(fields=['-scanned_at'], name='csv_import_scanned_at_idx'),
+            models.Index(
+                fields=['zone', 'row_number', '-scanned_at'],
+                name='csv_import_cell_idx',
+                condition=models.Q(row_number__isnull=False),
+            ),
+            models.Index(fields=['product_id', '-scanned_at'], name='csv_import_product_idx'),
+        ]
         verbose_name_plural = "Импорты CSV"
 
     def __str__(self):
-        return f"{self.product_name} ({self.product_id}) - {self.quantity} шт. в зоне {self.zone}"
\ No newline at end of file
+        return f"{self.product_name} ({self.product_id}) - {self.quantity} шт. в зоне {self.zone}"
+
+
+class CSVImportStaging(models.Model):
+    """
+    Промежуточная таблица импорта CSV «всё или ничего»: строки файла пишутся сюда порциями
+    и переносятся в InventoryCSVImport одним INSERT ... SELECT, только если во всём файле нет ошибок.
+    На PostgreSQL таблица UNLOGGED - данные временные, журнал для них не нужен.
+    """
+    batch_id = models.UUIDField(db_index=True)
+    row_num = models.IntegerField()
+    product_id = models.CharField(max_length=50)
+    product_name = models.CharField(max_length=255)
+    quantity = models.IntegerField()
+    zone = models.CharField(max_length=10)
+    row_number = models.IntegerField(null=True, blank=True)
+    shelf_number = models.IntegerField(null=True, blank=True)
+    scanned_at = models.DateTimeField()
+    status = models.CharField(max_length=50)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'inventory_csv_import_staging'
+        verbose_name = "Строка импорта CSV (staging)"
+        verbose_name_plural = "Строки импорта CSV (staging)"
+
+
+class InventoryObservation(models.Model):
+    """
+    Единое хранилище наблюдений остатков для чтения: сканирования роботов (InventoryHistory)
+    и строки импорта CSV (InventoryCSVImport) в одной таблице с колонкой source.
+    Только добавление (ObservationService): статус и название товара фиксируются при записи,
+    source_id - id строки в таблице источника.
+    В PostgreSQL таблица секционирована по source, сканирования роботов - ещё и помесячно по scanned_at
+    вместе с inventory_history (HistoryPartitionService); первичный ключ в БД - (id, source, scanned_at).
+    """
+    SOURCE_HISTORY = 'history'
+    SOURCE_CSV = 'csv'
+    SOURCE_CHOICES = [
+        (SOURCE_HISTORY, 'Сканирование робота'),
+        (SOURCE_CSV, 'Импорт CSV'),
+    ]
+
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    source_id = models.BigIntegerField()
+    robot_id = models.CharField(max_length=50, null=True, blank=True)
+    # Без ограничения внешнего ключа: строки CSV могли ссылаться на товары без карточки.
+    # null=True - чтобы карточка присоединялась LEFT JOIN и такие строки не выпадали из выборок
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.DO_NOTHING,
+        null=True,
+        db_constraint=False,
+        db_index=False,
+        db_column='product_id',
+        related_name='+',
+    )
+    product_name = models.CharField(max_length=255, blank=True, default='')
+    zone = models.CharField(max_length=10)
+    row_number = models.IntegerField(null=True, blank=True)
+    shelf_number = models.IntegerField(null=True, blank=True)
+    quantity = models.IntegerField()
+    expected_quantity = models.IntegerField(null=True, blank=True)
+    status = models.CharField(max_length=50, null=True, blank=True)
+    scanned_at = models.DateTimeField()
+    created_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'inventory_observations'
+        verbose_name = "Наблюдение остатка"
+        verbose_name_plural = "Наблюдения остатков"
+        constraints = [
+            # scanned_at - ключ секционирования, уникальность без него в секционированной таблице невозможна
+            models.UniqueConstraint(fields=['source', 'source_id', 'scanned_at'], name='inv_obs_source_uniq'),
+        ]
+        indexes = [
+            # Порядок истории инвентаризации и экспорта: (scanned_at, source, id)
+            models.Index(fields=['-scanned_at', '-source', '-id'], name='inv_obs_scanned_at_idx'),
+            models.Index(fields=['product', 'scanned_at'], name='inv_obs_product_idx'),
+            models.Index(fields=['zone', '-scanned_at'], name='inv_obs_zone_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.source}:{self.source_id} {self.product_id} - {self.quantity} шт. в зоне {self.zone}"
+
+
+class ExportJob(models.Model):
+    """Фоновая выгрузка инвентаризации: параметры, прогресс и готовый файл на диске"""
+
+    FORMAT_CHOICES = [
+        ('xlsx', 'Excel'),
+        ('pdf', 'PDF'),
+        ('csv', 'CSV'),
+        ('ndjson', 'NDJSON'),
+    ]
+
+    STATUS_PENDING = 'PENDING'
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_DONE = 'DONE'
+    STATUS_FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'В очереди'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_DONE, 'Готово'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    params = models.JSONField(default=dict)
+    # sha256 от формата и параметров - одинаковые запросы используют одно задание
+    params_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    rows_total = models.IntegerField(null=True, blank=True)
+    rows_done = models.IntegerField(default=0)
+    file_path = models.CharField(max_length=500, blank=True)
+    file_size = models.BigIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    # Процесс, в пуле которого выполняется задание (host:pid:суффикс), и его последний heartbeat
+    worker = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='export_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'export_jobs'
+        verbose_name = "Задание экспорта"
+        verbose_name_plural = "Задания экспорта"
+        indexes = [
+            models.Index(fields=['params_hash', '-created_at'], name='export_job_hash_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.format} {self.id} ({self.status})"
+
+
+class ImportJob(models.Model):
+    """Фоновый импорт CSV: файл на диске, этап обработки, прогресс и итог (ошибки/предупреждения)"""
+
+    STATUS_QUEUED = 'QUEUED'
+    STATUS_VALIDATING = 'VALIDATING'
+    STATUS_WRITING = 'WRITING'
+    STATUS_DONE = 'DONE'
+    STATUS_FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'В очереди'),
+        (STATUS_VALIDATING, 'Проверка'),
+        (STATUS_WRITING, 'Запись'),
+        (STATUS_DONE, 'Готово'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file_name = models.CharField(max_length=255)
+    file_path = models.CharField(max_length=500, blank=True)
+    file_size = models.BigIntegerField(default=0)
+    atomic = models.BooleanField(default=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    rows_processed = models.IntegerField(default=0)
+    created_count = models.IntegerField(default=0)
+    total_errors = models.IntegerField(default=0)
+    total_warnings = models.IntegerField(default=0)
+    # Первые 10 ошибок и предупреждений, как в ответе синхронной загрузки
+    errors = models.JSONField(default=list)
+    warnings = models.JSONField(default=list)
+    error = models.TextField(blank=True)
+    # Процесс, в пуле которого выполняется задание (host:pid:суффикс), и его последний heartbeat
+    worker = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='import_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'import_jobs'
+        verbose_name = "Задание импорта CSV"
+        verbose_name_plural = "Задания импорта CSV"
+
+    def __str__(self):
+        return f"{self.file_name} ({self.status})"
@@ -0,0 +1,157 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db import connection
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+
+
+def estimate_count(queryset):
+    """
+    Приблизительное количество строк по оценке планировщика (EXPLAIN), без COUNT(*).
+    На не-PostgreSQL базах возвращает точный count().
+    """
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    plan = json.loads(queryset.explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination:
+    """
+    Курсорная (keyset) пагинация: страница выбирается условием WHERE по ключу сортировки,
+    а не OFFSET, поэтому стоимость не зависит от глубины страницы.
+
+    ordering - ключ сортировки, например ('-scanned_at', '-id'); последнее поле должно быть уникальным.
+    Курсоры непрозрачны для клиента: base64 от позиции строки и направления.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+
+    def __init__(self, ordering):
+        self.ordering = list(ordering)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+
+    @classmethod
+    def is_requested(cls, request):
+        """Курсорный режим включается явно: ?pagination=cursor или переданным курсором"""
+        return (
+            request.query_params.get(cls.mode_query_param) == 'cursor'
+            or cls.cursor_query_param in request.query_params
+        )
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate(self, request, build_queryset):
+        """
+        build_queryset(position_q, order_by) -> упорядоченный queryset страницы.
+        position_q - условие «после курсора» (None для первой страницы).
+        Возвращает список строк страницы (dict или экземпляры моделей).
+        """
+        self.page_size_value = self.get_page_size(request)
+        position, backwards = self.decode_cursor(request.query_params.get(self.cursor_query_param))
+
+        order_by = self._order_by(reverse=backwards)
+        position_q = self._after(position, reverse=backwards) if position else None
+
+        rows = list(build_queryset(position_q, order_by)[:self.page_size_value + 1])
+        has_more = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+
+        if backwards:
+            rows.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.next_cursor = self.encode_cursor(self._position(rows[-1]), False) if rows and self.has_next else None
+        self.previous_cursor = self.encode_cursor(self._position(rows[0]), True) if rows and self.has_previous else None
+        return rows
+
+    def paginate_queryset(self, queryset, request):
+        """Пагинация обычного queryset по self.ordering"""
+        return self.paginate(
+            request,
+            lambda position_q, order_by: (queryset.filter(position_q) if position_q else queryset).order_by(*order_by)
+        )
+
+    def get_pagination_data(self):
+        return {
+            'mode': 'cursor',
+            'page_size': self.page_size_value,
+            'next_cursor': self.next_cursor,
+            'previous_cursor': self.previous_cursor,
+            'has_next': self.has_next,
+            'has_previous': self.has_previous,
+        }
+
+    def encode_cursor(self, position, backwards):
+        values = [
+            {'dt': value.isoformat()} if isinstance(value, datetime) else value
+            for value in position
+        ]
+        payload = json.dumps({'p': values, 'b': int(backwards)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None, False
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            values = [
+                parse_datetime(value['dt']) if isinstance(value, dict) else value
+                for value in payload['p']
+            ]
+            backwards = bool(payload.get('b'))
+        except (ValueError, KeyError, TypeError):
+            raise NotFound('Invalid cursor')
+
+        if len(values) != len(self.fields):
+            raise NotFound('Invalid cursor')
+        return values, backwards
+
+    def _order_by(self, reverse):
+        order_by = []
+        for field in self.ordering:
+            descending = field.startswith('-') != reverse
+            name = field.lstrip('-')
+            order_by.append(F(name).desc() if descending else F(name).asc())
+        return order_by
+
+    def _after(self, position, reverse):
+        """Лексикографическое условие «строго после position» в порядке сортировки"""
+        condition = Q()
+        for index in reversed(range(len(self.ordering))):
+            field = self.ordering[index]
+            descending = field.startswith('-') != reverse
+            name = field.lstrip('-')
+            lookup = 'lt' if descending else 'gt'
+
+            step = Q(**{f'{name}__{lookup}': position[index]})
+            if index < len(self.ordering) - 1:
+                step |= Q(**{name: position[index]}) & condition
+            condition = step
+
+        # Дублирующее условие по первому полю даёт планировщику диапазон для индекса
+        first = self.ordering[0]
+        bound = 'lte' if first.startswith('-') != reverse else 'gte'
+        return condition & Q(**{f'{self.fields[0]}__{bound}': position[0]})
+
+    def _position(self, row):
+        if isinstance(row, dict):
+            return [row[field] for field in self.fields]
+        return [getattr(row, field) for field in self.fields]
@@ -0,0 +1,20 @@
+from .inventory_queries import InventoryQueryService
+from .observations import ObservationService
+from .inventory_export import InventoryExportService
+from .export_jobs import ExportJobService
+from .csv_import import CSVImportService, calculate_status, calculate_status_sql
+from .import_jobs import ImportJobService
+from .downsampling import dedupe_timestamps, lttb_indices
+
+__all__ = [
+    'InventoryQueryService',
+    'ObservationService',
+    'InventoryExportService',
+    'ExportJobService',
+    'CSVImportService',
+    'calculate_status',
+    'calculate_status_sql',
+    'ImportJobService',
+    'dedupe_timestamps',
+    'lttb_indices',
+]
@@ -0,0 +1,343 @@
+import csv
+import io
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+
+# Функция для расчета статуса товара по количеству
+def calculate_status(quantity):
+    if quantity is None:
+        return "-"
+    if quantity <= 5:
+        return "CRITICAL"
+    if quantity <= 20:
+        return "LOW_STOCK"
+    return "OK"
+
+
+def calculate_status_sql(quantity):
+    """SQL-аналог calculate_status для массовой записи (INSERT ... SELECT, COPY); quantity - SQL-выражение"""
+    return (
+        f"CASE WHEN {quantity} IS NULL THEN '-' WHEN {quantity} <= 5 THEN 'CRITICAL' "
+        f"WHEN {quantity} <= 20 THEN 'LOW_STOCK' ELSE 'OK' END"
+    )
+
+
+class CSVImportRun:
+    """
+    Состояние импорта одного файла. Строки проверяются по одной и сохраняются порциями
+    по CSV_IMPORT_BATCH_SIZE; в памяти - текущая порция, кэш карточек товаров,
+    счётчики по дням и первые MAX_REPORTED ошибок/предупреждений.
+
+    atomic=True - «всё или ничего»: порции пишутся в staging-таблицу и переносятся
+    в InventoryCSVImport одной транзакцией в конце, только если в файле нет ошибок.
+    atomic=False - порции сразу сохраняются в InventoryCSVImport, строки с ошибками пропускаются.
+
+    progress(phase, run) вызывается после каждой порции и перед переносом из staging;
+    phase - PHASE_VALIDATING (проверка и запись в staging) или PHASE_WRITING (запись в InventoryCSVImport).
+    """
+
+    MAX_REPORTED = 10
+
+    PHASE_VALIDATING = 'validating'
+    PHASE_WRITING = 'writing'
+
+    def __init__(self, atomic=True, progress=None):
+        self.atomic = atomic
+        self.progress = progress
+        self.batch_id = uuid.uuid4()
+        self.batch_size = CSVImportService.batch_size()
+        self.chunk = []
+        # product_id -> Product или None (карточки нет в БД на момент начала импорта)
+        self.products = {}
+        # Недостающие карточки по первой строке с таким product_id; created - уже сохранены
+        self.new_products = {}
+        self.created_products = set()
+        self.counts = Counter()
+        self.errors = []
+        self.total_errors = 0
+        self.warnings = []
+        self.total_warnings = 0
+        self.created_count = 0
+        self.rows_processed = 0
+
+    def report(self, phase):
+        if self.progress:
+            self.progress(phase, self)
+
+    def add_error(self, row_num, row, message):
+        self.total_errors += 1
+        if len(self.errors) < self.MAX_REPORTED:
+            self.errors.append({"row": row_num, "data": row, "error": message})
+
+    def add_warning(self, warning):
+        self.total_warnings += 1
+        if len(self.warnings) < self.MAX_REPORTED:
+            self.warnings.append(warning)
+
+    def consume(self, rows, start=2):
+        phase = self.PHASE_VALIDATING if self.atomic else self.PHASE_WRITING
+        for row_num, row in enumerate(rows, start=start):
+            self.rows_processed += 1
+            try:
+                data = CSVImportService.parse_row(row)
+            except ValueError as e:
+                self.add_error(row_num, row, f"Ошибка преобразования данных: {str(e)}")
+                continue
+            except Exception as e:
+                self.add_error(row_num, row, str(e))
+                continue
+
+            self.chunk.append((row_num, data))
+            if len(self.chunk) >= self.batch_size:
+                self.flush()
+                self.report(phase)
+        self.flush()
+        self.report(phase)
+
+    def load_products(self, product_ids):
+        from products.models import Product
+
+        missing = set(product_ids) - self.products.keys()
+        if missing:
+            found = Product.objects.in_bulk(missing)
+            for product_id in missing:
+                self.products[product_id] = found.get(product_id)
+
+    def flush(self):
+        """Проверяет расхождения по порции и сохраняет её (в staging или сразу в InventoryCSVImport)"""
+        from products.models import Product
+
+        chunk, self.chunk = self.chunk, []
+        if not chunk:
+            return
+
+        self.load_products(data["product_id"] for _, data in chunk)
+
+        counts = Counter()
+        for row_num, data in chunk:
+            warning = CSVImportService.check_discrepancy(data, row_num, self.products)
+            if warning:
+                self.add_warning(warning)
+            if self.products[data["product_id"]] is None:
+                self.new_products.setdefault(data["product_id"], Product(
+                    id=data["product_id"],
+                    name=data["product_name"],
+                    category="Без категории",
+                    min_stock=10,
+                    optimal_stock=data["quantity"],
+                ))
+            data["status"] = calculate_status(data["quantity"])
+            counts[(timezone.localdate(data["scanned_at"]), data["status"])] += 1
+
+        # В атомарном режиме файл с ошибками будет отклонён: дальше строки только проверяются
+        if self.atomic and self.total_errors:
+            return
+
+        if self.atomic:
+            self.stage(chunk)
+            self.counts.update(counts)
+        else:
+            with transaction.atomic():
+                self.save_products()
+                CSVImportService.save_rows(data for _, data in chunk)
+                CSVImportService.increment_counters(counts)
+        self.created_count += len(chunk)
+
+    def save_products(self):
+        from products.models import Product
+
+        pending = [p for product_id, p in self.new_products.items() if product_id not in self.created_products]
+        if pending:
+            # Существующие карточки не меняются: конфликт по id пропускается
+            Product.objects.bulk_create(pending, batch_size=self.batch_size, ignore_conflicts=True)
+            self.created_products.update(p.id for p in pending)
+
+    def stage(self, chunk):
+        from inventory.models import CSVImportStaging
+
+        CSVImportStaging.objects.bulk_create(
+            [CSVImportStaging(batch_id=self.batch_id, row_num=row_num, **data) for row_num, data in chunk],
+            batch_size=self.batch_size,
+        )
+
+    def merge(self):
+        """Переносит строки staging в InventoryCSVImport (и наблюдения) одним INSERT ... SELECT в одной транзакции"""
+        from inventory.models import CSVImportStaging, InventoryCSVImport, InventoryObservation
+        from .observations import ObservationService
+
+        target = connection.ops.quote_name(InventoryCSVImport._meta.db_table)
+        staging = connection.ops.quote_name(CSVImportStaging._meta.db_table)
+        columns = 'product_id, product_name, quantity, zone, row_number, shelf_number, scanned_at, status'
+
+        with transaction.atomic():
+            self.save_products()
+            last_id = ObservationService.last_id(InventoryObservation.SOURCE_CSV)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {target} ({columns}, created_at) '
+                    f'SELECT {columns}, %s FROM {staging} WHERE batch_id = %s ORDER BY row_num',
+                    [
+                        InventoryCSVImport._meta.get_field('created_at').get_db_prep_value(timezone.now(), connection),
+                        CSVImportStaging._meta.get_field('batch_id').get_db_prep_value(self.batch_id, connection),
+                    ]
+                )
+            ObservationService.record_after(InventoryObservation.SOURCE_CSV, last_id)
+            CSVImportService.increment_counters(self.counts)
+            self.discard()
+
+    def discard(self):
+        from inventory.models import CSVImportStaging
+
+        CSVImportStaging.objects.filter(batch_id=self.batch_id).delete()
+
+    def finish(self):
+        """Завершает импорт: в атомарном режиме переносит staging или отбрасывает его при ошибках"""
+        if self.atomic:
+            if self.total_errors:
+                self.discard()
+                self.created_count = 0
+            elif self.created_count:
+                self.report(self.PHASE_WRITING)
+                self.merge()
+        return self.result()
+
+    def result(self):
+        return {
+            "rows_processed": self.rows_processed,
+            "created_count": self.created_count,
+            "errors": self.errors,
+            "total_errors": self.total_errors,
+            "warnings": self.warnings,
+            "total_warnings": self.total_warnings,
+        }
+
+
+class CSVImportService:
+    """
+    Импорт CSV инвентаризации потоком: файл декодируется по мере чтения (TextIOWrapper),
+    строки проверяются по одной и пишутся порциями bulk_create, карточки товаров
+    читаются запросом id__in на порцию. Память не зависит от размера файла.
+    """
+
+    REQUIRED_COLUMNS = {"product_id", "product_name", "quantity", "zone", "date", "row", "shelf"}
+
+    ENCODING_ERROR = "Неверная кодировка, требуется UTF-8"
+
+    @staticmethod
+    def batch_size():
+        return getattr(settings, 'CSV_IMPORT_BATCH_SIZE', 2000)
+
+    @staticmethod
+    def missing_columns(fieldnames):
+        return CSVImportService.REQUIRED_COLUMNS - set(fieldnames or [])
+
+    @staticmethod
+    def parse_row(row):
+        """Строка CSV -> данные для сохранения (ValueError при неверных числах)"""
+        scanned_date = parse_date(row["date"])
+        if scanned_date:
+            scanned_at = timezone.make_aware(datetime.combine(scanned_date, datetime.min.time()))
+        else:
+            scanned_at = timezone.now()
+
+        return {
+            "product_id": row["product_id"].strip(),
+            "product_name": row["product_name"].strip(),
+            "quantity": int(row["quantity"]),
+            "zone": row["zone"].strip(),
+            "scanned_at": scanned_at,
+            "row_number": int(row["row"]) if row["row"] else None,
+            "shelf_number": int(row["shelf"]) if row["shelf"] else None,
+        }
+
+    @staticmethod
+    def check_discrepancy(data, row_num, products):
+        """Предупреждение по строке: большое расхождение с optimal_stock или товар не найден (None - всё в порядке)"""
+        product = products.get(data["product_id"])
+        if product is None:
+            return {
+                "row": row_num,
+                "product_id": data["product_id"],
+                "message": f"Продукт '{data['product_name']}' не найден в базе данных. Будет создан с дефолтными значениями."
+            }
+
+        expected = product.optimal_stock
+        discrepancy = data["quantity"] - expected
+        threshold = max(expected * 0.1, 5)
+        if abs(discrepancy) > threshold:
+            return {
+                "row": row_num,
+                "product_id": data["product_id"],
+                "product_name": data["product_name"],
+                "message": f"Большое расхождение: ожидалось {expected}, фактически {data['quantity']} (разница: {discrepancy:+d})"
+            }
+        return None
+
+    @staticmethod
+    def save_rows(rows):
+        from inventory.models import InventoryCSVImport, InventoryObservation
+        from .observations import ObservationService
+
+        created = InventoryCSVImport.objects.bulk_create(
+            [InventoryCSVImport(**data) for data in rows],
+            batch_size=CSVImportService.batch_size(),
+        )
+        ObservationService.record(InventoryObservation.SOURCE_CSV, [item.id for item in created])
+
+    @staticmethod
+    def increment_counters(counts):
+        from warehouse.models import DailyScanCounter
+        from warehouse.services import ScanCounterService
+
+        ScanCounterService.increment(DailyScanCounter.SOURCE_CSV, counts)
+
+    @staticmethod
+    def discard_stale_batches():
+        """Удаляет строки staging, оставшиеся от прерванных импортов (старше суток)"""
+        from inventory.models import CSVImportStaging
+
+        CSVImportStaging.objects.filter(created_at__lt=timezone.now() - timedelta(days=1)).delete()
+
+    @staticmethod
+    def import_file(file, atomic=True, progress=None):
+        """
+        Импортирует загруженный файл (байтовый поток, UTF-8, разделитель ';').
+        ValueError - файл нельзя разобрать (кодировка, нет обязательных колонок).
+        progress - см. CSVImportRun.
+        Возвращает результат CSVImportRun.result().
+        """
+        text = io.TextIOWrapper(file, encoding='utf-8', newline='')
+        try:
+            reader = csv.DictReader(text, delimiter=';')
+            try:
+                fieldnames = reader.fieldnames
+            except UnicodeDecodeError:
+                raise ValueError(CSVImportService.ENCODING_ERROR)
+
+            missing = CSVImportService.missing_columns(fieldnames)
+            if missing:
+                raise ValueError(f"Отсутствуют обязательные колонки: {', '.join(missing)}")
+
+            if atomic:
+                CSVImportService.discard_stale_batches()
+
+            run = CSVImportRun(atomic=atomic, progress=progress)
+            try:
+                run.consume(reader)
+                return run.finish()
+            except UnicodeDecodeError:
+                run.discard()
+                raise ValueError(CSVImportService.ENCODING_ERROR)
+            except Exception:
+                run.discard()
+                raise
+        finally:
+            # Загруженный файл закрывает Django, TextIOWrapper его не закрывает
+            text.detach()
@@ -0,0 +1,70 @@
+import numpy as np
+
+
+def dedupe_timestamps(x):
+    """
+    Разводит совпадающие отметки времени: k-й повтор сдвигается на k * 0.001 с.
+    x должен быть отсортирован по возрастанию.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    if len(x) < 2:
+        return x.copy()
+
+    # Номер точки внутри серии одинаковых значений: 0, 1, 2, ...
+    positions = np.arange(len(x))
+    starts = np.concatenate(([True], x[1:] != x[:-1]))
+    repeat = positions - np.maximum.accumulate(np.where(starts, positions, 0))
+    return x + repeat * 0.001
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets на массивах NumPy.
+
+    x - отметки времени в секундах, y - значения; совпадающие x разводятся
+    как в dedupe_timestamps. Возвращает индексы выбранных точек во входных массивах (по возрастанию x),
+    первая и последняя точки выбираются всегда.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+
+    if n <= threshold:
+        return np.arange(n)
+    if threshold < 3:
+        return np.arange(threshold)
+
+    # Устойчивая сортировка сохраняет порядок повторов, поэтому сдвиг получают те же точки
+    order = np.argsort(x, kind='stable')
+    x = dedupe_timestamps(x[order])
+    y = np.asarray(y, dtype=np.float64)[order]
+
+    selected = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * bucket_size) + 1
+        avg_end = min(int((i + 2) * bucket_size) + 1, n)
+        if avg_start >= avg_end:
+            continue
+
+        # Последовательное суммирование (cumsum), как в поточечном варианте, - те же результаты округления
+        avg_length = avg_end - avg_start
+        avg_x = np.cumsum(x[avg_start:avg_end])[-1] / avg_length
+        avg_y = np.cumsum(y[avg_start:avg_end])[-1] / avg_length
+
+        range_start = int(i * bucket_size) + 1
+        range_end = min(int((i + 1) * bucket_size) + 1, n)
+        if range_start >= range_end:
+            continue
+
+        a = selected[-1]
+        ax, ay = x[a], y[a]
+        area = np.abs(
+            (ax - avg_x) * (y[range_start:range_end] - ay) -
+            (ax - x[range_start:range_end]) * (avg_y - ay)
+        ) * 0.5
+
+        selected.append(range_start + int(np.argmax(area)))
+
+    selected.append(n - 1)
+    return order[np.array(selected)]
@@ -0,0 +1,280 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .inventory_export import InventoryExportService
+from .job_workers import JobWorkerService
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Проверка «есть ли уже такое задание» и его создание не должны перемежаться между потоками процесса
+_submit_lock = threading.Lock()
+
+
+def get_executor():
+    """Общий для процесса пул EXPORT_JOB_WORKERS потоков, выполняющих задания экспорта"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'EXPORT_JOB_WORKERS', 2),
+                    thread_name_prefix='export-job',
+                )
+    return _executor
+
+
+class ExportJobService:
+    """
+    Фоновые выгрузки инвентаризации (таблица export_jobs).
+
+    Задание создаётся по формату и параметрам экспорта и выполняется в пуле потоков:
+    строки читаются порциями (InventoryExportService), файл пишется в EXPORT_JOB_DIR
+    под временным именем и переименовывается по готовности. Повторный запрос с теми же
+    параметрами в течение EXPORT_JOB_DEDUPE_MINUTES возвращает существующее задание.
+    Задания, оставшиеся от остановленного процесса, переводятся в FAILED (JobWorkerService).
+    """
+
+    CONTENT_TYPES = {
+        'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        'pdf': 'application/pdf',
+        'csv': 'text/csv; charset=utf-8',
+        'ndjson': 'application/x-ndjson',
+    }
+
+    # Параметры, от которых зависит содержимое файла
+    PARAM_KEYS = ('all', 'filters', 'selected', 'ordering')
+
+    RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+    @staticmethod
+    def normalize_params(data):
+        params = {key: data[key] for key in ExportJobService.PARAM_KEYS if data.get(key) not in (None, '', [], {})}
+        params.setdefault('ordering', '-scanned_at')
+        return params
+
+    @staticmethod
+    def params_hash(export_format, params):
+        payload = json.dumps({'format': export_format, 'params': params}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def export_dir():
+        path = getattr(settings, 'EXPORT_JOB_DIR', os.path.join(tempfile.gettempdir(), 'smart_warehouse', 'exports'))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @staticmethod
+    def fail_orphaned():
+        """Переводит в FAILED незавершённые задания без живого процесса-владельца. Возвращает их количество."""
+        from inventory.models import ExportJob
+
+        return len(JobWorkerService.fail_orphaned(ExportJob, [ExportJob.STATUS_PENDING, ExportJob.STATUS_RUNNING]))
+
+    @staticmethod
+    def find_reusable(params_hash):
+        """Недавнее задание с теми же параметрами: готовое с файлом на диске или ещё выполняющееся"""
+        from inventory.models import ExportJob
+
+        dedupe_since = timezone.now() - timedelta(minutes=getattr(settings, 'EXPORT_JOB_DEDUPE_MINUTES', 60))
+        jobs = ExportJob.objects.filter(
+            params_hash=params_hash,
+            created_at__gte=dedupe_since,
+            status__in=[ExportJob.STATUS_PENDING, ExportJob.STATUS_RUNNING, ExportJob.STATUS_DONE],
+        ).order_by('-created_at')
+
+        for job in jobs:
+            if job.status != ExportJob.STATUS_DONE or (job.file_path and os.path.exists(job.file_path)):
+                return job
+        return None
+
+    @staticmethod
+    def submit(export_format, data, user=None):
+        """
+        Создаёт задание и ставит его в пул (после коммита транзакции).
+        Возвращает (job, created); created = False, если использовано существующее задание.
+        """
+        from inventory.models import ExportJob
+
+        if export_format not in ExportJobService.CONTENT_TYPES:
+            raise ValueError(f"format должен быть одним из: {', '.join(ExportJobService.CONTENT_TYPES)}")
+
+        params = ExportJobService.normalize_params(data)
+        params_hash = ExportJobService.params_hash(export_format, params)
+
+        with _submit_lock:
+            # Задание от остановленного процесса не должно подхватываться как выполняющееся
+            ExportJobService.fail_orphaned()
+            job = ExportJobService.find_reusable(params_hash)
+            if job:
+                return job, False
+
+            job = ExportJob.objects.create(
+                format=export_format,
+                params=params,
+                params_hash=params_hash,
+                created_by=user if user is not None and user.is_authenticated else None,
+                **JobWorkerService.owner_fields(),
+            )
+
+        def enqueue():
+            JobWorkerService.claim(ExportJob, job.id)
+            get_executor().submit(ExportJobService.run, job.id)
+
+        transaction.on_commit(enqueue)
+        return job, True
+
+    @staticmethod
+    def track_progress(job_id, rows):
+        """Пропускает строки, сохраняя rows_done каждые EXPORT_CHUNK_SIZE строк и в конце"""
+        from inventory.models import ExportJob
+
+        chunk_size = InventoryExportService.chunk_size()
+        done = 0
+        for item in rows:
+            yield item
+            done += 1
+            if done % chunk_size == 0:
+                ExportJob.objects.filter(id=job_id).update(rows_done=done, updated_at=timezone.now())
+        ExportJob.objects.filter(id=job_id).update(rows_done=done, updated_at=timezone.now())
+
+    @staticmethod
+    def write(export_format, rows, file):
+        if export_format == 'xlsx':
+            InventoryExportService.write_xlsx(rows, file)
+        elif export_format == 'pdf':
+            InventoryExportService.write_pdf(rows, file)
+        else:
+            chunks = InventoryExportService.iter_csv(rows) if export_format == 'csv' \
+                else InventoryExportService.iter_ndjson(rows)
+            for chunk in chunks:
+                file.write(chunk)
+
+    @staticmethod
+    def run(job_id):
+        """Выполняет задание в потоке пула: пишет файл и сохраняет статус/прогресс"""
+        from inventory.models import ExportJob
+        from inventory.pagination import estimate_count
+
+        close_old_connections()
+        tmp_path = None
+        try:
+            job = ExportJob.objects.get(id=job_id)
+            qs = InventoryExportService.filtered(job.params)
+            ExportJob.objects.filter(id=job_id).update(
+                status=ExportJob.STATUS_RUNNING,
+                rows_total=estimate_count(qs),
+                updated_at=timezone.now(),
+            )
+
+            path = os.path.join(ExportJobService.export_dir(), f"{job.id}.{job.format}")
+            tmp_path = path + '.part'
+            rows = ExportJobService.track_progress(
+                job.id, InventoryExportService.iter_rows(qs, job.params.get('ordering'))
+            )
+
+            with open(tmp_path, 'wb') as file:
+                ExportJobService.write(job.format, rows, file)
+            os.replace(tmp_path, path)
+            tmp_path = None
+
+            ExportJob.objects.filter(id=job_id).update(
+                status=ExportJob.STATUS_DONE,
+                file_path=path,
+                file_size=os.path.getsize(path),
+                finished_at=timezone.now(),
+            )
+        except Exception as e:
+            ExportJob.objects.filter(id=job_id).update(
+                status=ExportJob.STATUS_FAILED, error=str(e), finished_at=timezone.now()
+            )
+        finally:
+            JobWorkerService.release(ExportJob, job_id)
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            close_old_connections()
+
+    @staticmethod
+    def as_dict(job):
+        return {
+            'id': str(job.id),
+            'format': job.format,
+            'status': job.status,
+            'rows_total': job.rows_total,
+            'rows_done': job.rows_done,
+            'progress': (
+                100.0 if job.status == job.STATUS_DONE
+                else round(min(job.rows_done / job.rows_total, 1) * 100, 1) if job.rows_total
+                else 0.0
+            ),
+            'file_size': job.file_size,
+            'error': job.error or None,
+            'created_at': job.created_at.isoformat(),
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        }
+
+    @staticmethod
+    def parse_range(header, size):
+        """
+        Заголовок Range -> (start, end) включительно; None - отдать файл целиком
+        (заголовка нет или запрошено несколько диапазонов). ValueError - диапазон вне файла (416).
+        """
+        if not header:
+            return None
+        match = ExportJobService.RANGE_RE.match(header.strip())
+        if not match:
+            return None
+
+        first, last = match.groups()
+        if not first and not last:
+            return None
+        if not first:
+            # bytes=-N: последние N байт
+            length = int(last)
+            if length == 0:
+                raise ValueError(header)
+            return max(size - length, 0), size - 1
+
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start >= size or start > end:
+            raise ValueError(header)
+        return start, end
+
+    @staticmethod
+    def iter_file(path, start, length, block_size=64 * 1024):
+        """Читает length байт файла начиная со start блоками по block_size"""
+        with open(path, 'rb') as file:
+            file.seek(start)
+            remaining = length
+            while remaining > 0:
+                data = file.read(min(block_size, remaining))
+                if not data:
+                    break
+                remaining -= len(data)
+                yield data
+
+    @staticmethod
+    def expire(before=None):
+        """Удаляет задания (и их файлы), завершённые раньше before. Возвращает количество заданий."""
+        from inventory.models import ExportJob
+
+        before = before or timezone.now() - timedelta(hours=getattr(settings, 'EXPORT_JOB_TTL_HOURS', 24))
+        jobs = ExportJob.objects.filter(finished_at__lt=before)
+
+        for path in jobs.exclude(file_path='').values_list('file_path', flat=True):
+            if os.path.exists(path):
+                os.remove(path)
+        deleted, _ = jobs.delete()
+        return deleted
@@ -0,0 +1,202 @@
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .csv_import import CSVImportService
+from .job_workers import JobWorkerService
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Общий для процесса пул IMPORT_JOB_WORKERS потоков, выполняющих импорт CSV"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'IMPORT_JOB_WORKERS', 1),
+                    thread_name_prefix='import-job',
+                )
+    return _executor
+
+
+class ImportJobService:
+    """
+    Фоновый импорт CSV (таблица import_jobs).
+
+    Загруженный файл сохраняется в IMPORT_JOB_DIR, задание выполняется в пуле потоков
+    через CSVImportService.import_file. Каждое изменение этапа и прогресс (раз в порцию строк)
+    сохраняются в задании и рассылаются группе dashboard_updates событием import_progress.
+    Файл удаляется после обработки; задания остановленного процесса переводятся в FAILED
+    вместе с удалением файла (fail_orphaned), а файлы без задания удаляет cleanup_orphaned_files.
+    """
+
+    @staticmethod
+    def import_dir():
+        path = getattr(settings, 'IMPORT_JOB_DIR', os.path.join(tempfile.gettempdir(), 'smart_warehouse', 'imports'))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @staticmethod
+    def submit(uploaded_file, atomic=True, user=None):
+        """Сохраняет файл на диск (по частям), создаёт задание и ставит его в пул после коммита"""
+        from inventory.models import ImportJob
+
+        # Задания, прерванные перезапуском процесса, не должны оставаться в обработке
+        ImportJobService.fail_orphaned()
+
+        job = ImportJob(
+            file_name=os.path.basename(uploaded_file.name or 'upload.csv')[:255],
+            atomic=atomic,
+            created_by=user if user is not None and user.is_authenticated else None,
+        )
+        path = os.path.join(ImportJobService.import_dir(), f"{job.id}.csv")
+        with open(path, 'wb') as file:
+            for chunk in uploaded_file.chunks():
+                file.write(chunk)
+        job.file_path = path
+        job.file_size = os.path.getsize(path)
+        for name, value in JobWorkerService.owner_fields().items():
+            setattr(job, name, value)
+        job.save()
+
+        ImportJobService.broadcast(job)
+
+        def enqueue():
+            JobWorkerService.claim(ImportJob, job.id)
+            get_executor().submit(ImportJobService.run, job.id)
+
+        transaction.on_commit(enqueue)
+        return job
+
+    @staticmethod
+    def fail_orphaned():
+        """
+        Переводит в FAILED незавершённые задания без живого процесса-владельца (прерваны перезапуском),
+        удаляет их файлы и рассылает новое состояние. Возвращает количество заданий.
+        """
+        from inventory.models import ImportJob
+
+        orphaned = JobWorkerService.fail_orphaned(
+            ImportJob, [ImportJob.STATUS_QUEUED, ImportJob.STATUS_VALIDATING, ImportJob.STATUS_WRITING]
+        )
+        for job in orphaned:
+            if job.file_path and os.path.exists(job.file_path):
+                os.remove(job.file_path)
+            job.refresh_from_db()
+            ImportJobService.broadcast(job)
+        return len(orphaned)
+
+    @staticmethod
+    def cleanup_orphaned_files(min_age_seconds=None):
+        """
+        Удаляет из IMPORT_JOB_DIR файлы, которые не принадлежат незавершённому заданию
+        и не изменялись дольше min_age_seconds (по умолчанию BACKGROUND_JOB_STALE_SECONDS):
+        свежий файл может принадлежать заданию, которое ещё сохраняется. Возвращает количество файлов.
+        """
+        from inventory.models import ImportJob
+
+        if min_age_seconds is None:
+            min_age_seconds = JobWorkerService.stale_seconds()
+
+        directory = ImportJobService.import_dir()
+        in_use = set(
+            ImportJob.objects.filter(
+                status__in=[ImportJob.STATUS_QUEUED, ImportJob.STATUS_VALIDATING, ImportJob.STATUS_WRITING]
+            ).values_list('file_path', flat=True)
+        )
+        modified_before = timezone.now().timestamp() - min_age_seconds
+
+        removed = 0
+        for entry in os.scandir(directory):
+            if not entry.is_file() or entry.path in in_use:
+                continue
+            if entry.stat().st_mtime < modified_before:
+                os.remove(entry.path)
+                removed += 1
+        return removed
+
+    @staticmethod
+    def update(job, **fields):
+        """Сохраняет поля задания и рассылает его состояние"""
+        from inventory.models import ImportJob
+
+        fields['updated_at'] = timezone.now()
+        ImportJob.objects.filter(id=job.id).update(**fields)
+        for name, value in fields.items():
+            setattr(job, name, value)
+        ImportJobService.broadcast(job)
+
+    @staticmethod
+    def run(job_id):
+        """Выполняет задание в потоке пула"""
+        from inventory.models import ImportJob
+
+        close_old_connections()
+        job = ImportJob.objects.filter(id=job_id).first()
+        if job is None:
+            JobWorkerService.release(ImportJob, job_id)
+            return
+
+        def progress(phase, run):
+            ImportJobService.update(
+                job,
+                status=phase.upper(),
+                rows_processed=run.rows_processed,
+                total_errors=run.total_errors,
+                total_warnings=run.total_warnings,
+            )
+
+        try:
+            ImportJobService.update(job, status=ImportJob.STATUS_VALIDATING if job.atomic else ImportJob.STATUS_WRITING)
+            with open(job.file_path, 'rb') as file:
+                result = CSVImportService.import_file(file, atomic=job.atomic, progress=progress)
+
+            failed = bool(result['total_errors']) and job.atomic
+            ImportJobService.update(
+                job,
+                status=ImportJob.STATUS_FAILED if failed else ImportJob.STATUS_DONE,
+                error="Файл содержит ошибки и не может быть загружен" if failed else '',
+                finished_at=timezone.now(),
+                **result,
+            )
+        except Exception as e:
+            ImportJobService.update(job, status=ImportJob.STATUS_FAILED, error=str(e), finished_at=timezone.now())
+        finally:
+            JobWorkerService.release(ImportJob, job_id)
+            if job.file_path and os.path.exists(job.file_path):
+                os.remove(job.file_path)
+            close_old_connections()
+
+    @staticmethod
+    def as_dict(job):
+        return {
+            'id': str(job.id),
+            'file_name': job.file_name,
+            'file_size': job.file_size,
+            'atomic': job.atomic,
+            'status': job.status,
+            'rows_processed': job.rows_processed,
+            'created_count': job.created_count,
+            'total_errors': job.total_errors,
+            'total_warnings': job.total_warnings,
+            'errors': job.errors,
+            'warnings': job.warnings,
+            'error': job.error or None,
+            'created_at': job.created_at.isoformat() if job.created_at else None,
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        }
+
+    @staticmethod
+    def broadcast(job):
+        from dashboard.broadcast import get_broadcaster
+
+        get_broadcaster().import_progress(ImportJobService.as_dict(job))
@@ -0,0 +1,277 @@
+import csv
+import io
+import json
+import os
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from openpyxl import Workbook
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from .inventory_queries import InventoryQueryService
+
+
+class InventoryExportService:
+    """
+    Выгрузка данных инвентаризации (оба источника) построчно: выборка наблюдений читается
+    серверным курсором порциями EXPORT_CHUNK_SIZE строк, в памяти одновременно только одна порция.
+    """
+
+    HEADERS = [
+        "ID товара",
+        "Дата",
+        "Зона",
+        "Товар",
+        "Кол-во (факт)",
+        "Ожидаемое количество",
+        "Расхождение (+/-)",
+        "Минимальный запас",
+        "Статус",
+        "Источник"
+    ]
+
+    # Колонки потоковой выгрузки CSV/NDJSON (машиночитаемые имена, как в API истории)
+    STREAM_FIELDS = [
+        "id",
+        "source",
+        "product_id",
+        "product_name",
+        "zone",
+        "row_number",
+        "shelf_number",
+        "quantity",
+        "expected_quantity",
+        "discrepancy",
+        "min_stock",
+        "is_discrepancy",
+        "status",
+        "scanned_at",
+    ]
+
+    # Поля сортировки в формате API -> колонки объединённой выборки
+    ORDERING_ALIASES = {'expected_quantity': 'expected_stock'}
+
+    @staticmethod
+    def chunk_size():
+        return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+    @staticmethod
+    def filtered(params):
+        """
+        Наблюдения по параметрам экспорта:
+        {"all": true, "filters": {from, to, zone, search}} или {"selected": [{"id", "source"}, ...]}
+        """
+        from inventory.models import InventoryObservation
+
+        if params.get("all"):
+            filters = params.get("filters") or {}
+            return InventoryQueryService.filtered(
+                filters.get("from"),
+                filters.get("to"),
+                filters.get("zone"),
+                filters.get("search"),
+            )
+
+        # Фильтр по выбранным элементам
+        selected = params.get("selected", [])
+
+        condition = Q(pk__in=[])
+        for source in (InventoryObservation.SOURCE_HISTORY, InventoryObservation.SOURCE_CSV):
+            ids = [item["id"] for item in selected if item["source"] == source]
+            if ids:
+                condition |= Q(source=source, id__in=ids)
+        return InventoryObservation.objects.filter(condition)
+
+    @staticmethod
+    def order_by(ordering):
+        """Сортировка в БД по колонке выборки с добиванием по source/id, как в истории инвентаризации"""
+        ordering = ordering or '-scanned_at'
+        field = ordering.lstrip('-')
+        field = InventoryExportService.ORDERING_ALIASES.get(field, field)
+        if field not in InventoryQueryService.FIELDS:
+            field = 'scanned_at'
+        if ordering.startswith('-'):
+            return [F(field).desc(nulls_last=True), F('source').desc(), F('id').desc()]
+        return [F(field).asc(nulls_first=True), F('source').asc(), F('id').asc()]
+
+    @staticmethod
+    def iter_rows(qs, ordering=None):
+        """Наблюдения в формате API, отсортированные в БД"""
+        rows = InventoryQueryService.rows(qs).order_by(
+            *InventoryExportService.order_by(ordering)
+        )
+        for item in rows.iterator(chunk_size=InventoryExportService.chunk_size()):
+            yield InventoryQueryService.present(item)
+
+    @staticmethod
+    def row_values(item):
+        """Значения колонок HEADERS для одной строки"""
+        return [
+            item["product_id"],
+            item["scanned_at"].strftime("%Y-%m-%d %H:%M:%S") if item["scanned_at"] else "",
+            item["zone"],
+            item["product_name"],
+            item["quantity"],
+            item.get("expected_quantity", ""),
+            item.get("discrepancy", ""),
+            item.get("min_stock", ""),
+            item["status"],
+            item["source"]
+        ]
+
+    @staticmethod
+    def write_xlsx(rows, file, title="Inventory Export"):
+        """
+        Записывает строки в XLSX в режиме write-only: openpyxl сбрасывает каждую строку
+        во временный XML листа и не держит ячейки в памяти. Возвращает количество строк.
+        """
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title)
+        ws.append(InventoryExportService.HEADERS)
+
+        count = 0
+        for item in rows:
+            ws.append(InventoryExportService.row_values(item))
+            count += 1
+
+        wb.save(file)
+        return count
+
+    @staticmethod
+    def iter_csv(rows):
+        """CSV (разделитель ';', как у импорта) кусками по EXPORT_CHUNK_SIZE строк, время - ISO 8601"""
+        fields = InventoryExportService.STREAM_FIELDS
+        chunk_size = InventoryExportService.chunk_size()
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=';')
+        writer.writerow(fields)
+
+        for n, item in enumerate(rows, start=1):
+            if item["scanned_at"]:
+                item["scanned_at"] = item["scanned_at"].isoformat()
+            writer.writerow([item.get(field) for field in fields])
+            if n % chunk_size == 0:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def iter_ndjson(rows):
+        """NDJSON: один JSON-объект на строку, кусками по EXPORT_CHUNK_SIZE строк"""
+        fields = InventoryExportService.STREAM_FIELDS
+        chunk_size = InventoryExportService.chunk_size()
+        lines = []
+
+        for item in rows:
+            lines.append(json.dumps(
+                {field: item.get(field) for field in fields}, cls=DjangoJSONEncoder, ensure_ascii=False
+            ))
+            if len(lines) >= chunk_size:
+                lines.append("")
+                yield "\n".join(lines).encode("utf-8")
+                lines = []
+
+        if lines:
+            lines.append("")
+            yield "\n".join(lines).encode("utf-8")
+
+    @staticmethod
+    def gzip_stream(chunks, level=6):
+        """Сжимает поток байтов в формат gzip на лету, не накапливая его в памяти"""
+        compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+    @staticmethod
+    def iter_file(file, block_size=64 * 1024):
+        """Читает открытый файл с текущей позиции блоками по block_size и закрывает его в конце"""
+        try:
+            while True:
+                data = file.read(block_size)
+                if not data:
+                    break
+                yield data
+        finally:
+            file.close()
+
+    @staticmethod
+    async def async_stream(chunks):
+        """
+        Асинхронный итератор над синхронным потоком порций для StreamingHttpResponse.
+        Под ASGI (daphne) синхронный итератор ответа целиком собирается в список до отправки,
+        здесь же каждая порция читается отдельным sync_to_async - в памяти только она.
+        thread_sensitive: порции читаются в потоке запроса, где открыт серверный курсор.
+        """
+        iterator = iter(chunks)
+        done = object()
+        try:
+            while True:
+                chunk = await sync_to_async(next)(iterator, done)
+                if chunk is done:
+                    break
+                yield chunk
+        finally:
+            # Генератор закрывается и при обрыве соединения: освобождает курсор или файл
+            close = getattr(iterator, "close", None)
+            if close:
+                await sync_to_async(close)()
+
+    @staticmethod
+    def write_pdf(rows, file):
+        """Отчёт в PDF (A4, строка на запись). Возвращает количество строк."""
+        p = canvas.Canvas(file, pagesize=A4)
+        width, height = A4
+        y = height - 50
+
+        font_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "DejaVuSans.ttf")
+        pdfmetrics.registerFont(TTFont("DejaVuSans", font_path))
+        p.setFont("DejaVuSans", 12)
+
+        # Заголовок
+        p.setFont("DejaVuSans", 14)
+        p.drawString(50, y, "Отчёт по инвентаризации")
+        y -= 30
+
+        # Колонки
+        p.setFont("DejaVuSans", 10)
+        headers = [
+            "ID товара",
+            "Дата",
+            "Зона",
+            "Товар",
+            "Кол-во (факт)",
+            "Ожид.",
+            "Δ (+/-)",
+            "Мин.запас",
+            "Статус",
+            "Источник"
+        ]
+        p.drawString(50, y, " | ".join(headers))
+        y -= 20
+
+        count = 0
+        for item in rows:
+            scanned_at = item["scanned_at"].strftime("%Y-%m-%d %H:%M:%S") if item["scanned_at"] else ""
+            line = f"{item['product_id']} | {scanned_at} | {item['zone']} | {item['product_name']} | {item['quantity']} | {item.get('expected_quantity', '')} | {item.get('discrepancy', ''):+} | {item.get('min_stock', '')} | {item['status']} | {item['source']}"
+            p.drawString(50, y, line)
+            y -= 15
+            count += 1
+
+            if y < 50:
+                p.showPage()
+                p.setFont("DejaVuSans", 10)
+                y = height - 50
+
+        p.save()
+        return count
@@ -0,0 +1,205 @@
+from datetime import datetime, time, timedelta
+from itertools import groupby
+from operator import itemgetter
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db.models import (
+    BooleanField, Case, Count, F, FloatField, Func, IntegerField, Max, Min, Q, Sum, Value, When,
+)
+from django.db.models.functions import Abs, Greatest
+from django.db.models.lookups import GreaterThan, LessThan
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+
+class ArrayFirst(Func):
+    """Первый элемент массива: (array_agg(... ORDER BY ...))[1]"""
+    template = '(%(expressions)s)[1]'
+    output_field = IntegerField()
+
+
+class InventoryQueryService:
+    """
+    Общие запросы к данным инвентаризации: сканирования роботов и импорт CSV читаются
+    из единого хранилища InventoryObservation (колонка source, статус рассчитан при записи).
+    Ожидаемое количество, расхождение и признак расхождения считаются в БД.
+    """
+
+    # expected_stock отдаётся в API как expected_quantity (имя занято полем InventoryObservation)
+    ENRICHED_FIELDS = ['expected_stock', 'discrepancy', 'min_stock', 'is_discrepancy']
+
+    # Колонки выборки наблюдений в формате API
+    FIELDS = [
+        'id',
+        'product_id',
+        'product_name',
+        'zone',
+        'status',
+        'quantity',
+        'scanned_at',
+        'row_number',
+        'shelf_number',
+        'created_at',
+        'source',
+        *ENRICHED_FIELDS,
+    ]
+
+    @staticmethod
+    def day_start(value):
+        """Начало локального дня для даты или строки YYYY-MM-DD (None, если дата не задана)"""
+        if not value:
+            return None
+        if isinstance(value, str):
+            try:
+                value = parse_date(value)
+            except ValueError:
+                value = None
+            if value is None:
+                raise ValidationError({'date': 'Ожидается дата в формате YYYY-MM-DD'})
+        return timezone.make_aware(datetime.combine(value, time.min))
+
+    @staticmethod
+    def filtered(from_date=None, to_date=None, zone=None, search=None, since=None):
+        """Наблюдения обоих источников с фильтрами истории инвентаризации"""
+        from inventory.models import InventoryObservation
+
+        qs = InventoryObservation.objects.all()
+
+        if since:
+            qs = qs.filter(scanned_at__gte=since)
+        # Диапазон по самой колонке, а не scanned_at::date: так работает индекс
+        from_start = InventoryQueryService.day_start(from_date)
+        if from_start:
+            qs = qs.filter(scanned_at__gte=from_start)
+        to_start = InventoryQueryService.day_start(to_date)
+        if to_start:
+            qs = qs.filter(scanned_at__lt=to_start + timedelta(days=1))
+        if zone:
+            qs = qs.filter(zone__iexact=zone)
+        if search:
+            qs = qs.filter(Q(product_name__icontains=search) | Q(product__id__icontains=search))
+
+        return qs
+
+    @staticmethod
+    def with_discrepancy(qs, expected, min_stock):
+        """
+        Добавляет expected_stock, min_stock, discrepancy и is_discrepancy.
+        Расхождение считается, если |факт - ожидание| > max(10% ожидания, 5) или факт < min_stock;
+        для товаров без карточки все поля NULL, а is_discrepancy = False.
+        """
+        return qs.annotate(
+            expected_stock=expected,
+            min_stock=min_stock,
+        ).annotate(
+            discrepancy=F('quantity') - F('expected_stock'),
+        ).annotate(
+            is_discrepancy=Case(
+                When(
+                    GreaterThan(
+                        Abs('discrepancy'),
+                        Greatest(F('expected_stock') * Value(0.1), Value(5.0), output_field=FloatField())
+                    ) | LessThan(F('quantity'), F('min_stock')),
+                    then=Value(True)
+                ),
+                default=Value(False),
+                output_field=BooleanField(),
+            )
+        )
+
+    @staticmethod
+    def present(item):
+        """Приводит строку values() к формату API: expected_stock -> expected_quantity"""
+        item["expected_quantity"] = item.pop("expected_stock")
+        return item
+
+    @staticmethod
+    def enriched(qs):
+        """Наблюдения с расхождением по карточке товара (LEFT JOIN products)"""
+        return InventoryQueryService.with_discrepancy(
+            qs,
+            expected=F('product__optimal_stock'),
+            min_stock=F('product__min_stock'),
+        )
+
+    @staticmethod
+    def rows(qs, status_filter=None, position_q=None):
+        """
+        Строки наблюдений с колонками FIELDS одним запросом.
+        Сортировка, LIMIT/OFFSET и COUNT(*) выполняются в БД.
+        position_q - условие по колонкам выборки (курсор keyset-пагинации).
+        """
+        rows = InventoryQueryService.enriched(qs)
+        if status_filter:
+            rows = rows.filter(status__iexact=status_filter)
+        if position_q is not None:
+            rows = rows.filter(position_q)
+        return rows.values(*InventoryQueryService.FIELDS)
+
+    @staticmethod
+    def discrepancies_count(qs):
+        """Количество наблюдений с расхождением"""
+        return InventoryQueryService.enriched(qs).aggregate(
+            n=Count('id', filter=Q(is_discrepancy=True))
+        )['n']
+
+    @staticmethod
+    def unique_products_count(qs, status_filter=None):
+        """Количество различных названий товаров"""
+        if status_filter:
+            qs = qs.filter(status__iexact=status_filter)
+        return qs.exclude(product_name='').values('product_name').distinct().count()
+
+    @staticmethod
+    def trend_series(qs, chunk_size=5000):
+        """
+        Ряды (product_id, [(scanned_at, quantity), ...]) по одному товару за раз.
+
+        Наблюдения читаются одним потоковым запросом values_list, упорядоченным по (product_id, scanned_at, id),
+        и группируются по товару, поэтому в памяти одновременно только ряд текущего товара.
+        """
+        rows = (
+            qs.order_by('product_id', 'scanned_at', 'id')
+            .values_list('product_id', 'scanned_at', 'quantity')
+            .iterator(chunk_size=chunk_size)
+        )
+        for product_id, series in groupby(rows, key=itemgetter(0)):
+            yield str(product_id), [(scanned_at, quantity) for _, scanned_at, quantity in series]
+
+    @staticmethod
+    def trend_time_range(qs):
+        """(min, max) scanned_at или (None, None), если строк нет"""
+        bounds = qs.aggregate(first=Min('scanned_at'), last=Max('scanned_at'))
+        return bounds['first'], bounds['last']
+
+    @staticmethod
+    def trend_buckets(qs, bucket, origin):
+        """
+        Тренд, агрегированный в БД по интервалам bucket (отсчёт от origin) для каждого товара:
+        min/max/avg и последнее значение в интервале. Возвращает {product_id: [точка, ...]} по возрастанию времени.
+        Один GROUP BY (product_id, интервал).
+        """
+        from warehouse.services.robot_activity import DateBin
+
+        grouped = qs.annotate(
+            interval=DateBin(Value(bucket), 'scanned_at', Value(origin))
+        ).values('product_id', 'interval').annotate(
+            min_quantity=Min('quantity'),
+            max_quantity=Max('quantity'),
+            sum_quantity=Sum('quantity'),
+            points=Count('id'),
+            last_quantity=ArrayFirst(ArrayAgg('quantity', order_by=('-scanned_at', '-id'))),
+        ).order_by('product_id', 'interval')
+
+        data = {}
+        for row in grouped.iterator(chunk_size=5000):
+            data.setdefault(str(row['product_id']), []).append({
+                'scanned_at': row['interval'].isoformat(),
+                'quantity': row['last_quantity'],
+                'min': row['min_quantity'],
+                'max': row['max_quantity'],
+                'avg': round(row['sum_quantity'] / row['points'], 2),
+                'points': row['points'],
+            })
+        return data
@@ -0,0 +1,129 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+
+_worker_id = None
+_worker_pid = None
+
+# {модель: множество id заданий}, выполняющихся или ждущих в пулах этого процесса
+_active = {}
+_active_lock = threading.Lock()
+_heartbeat_thread = None
+
+
+class JobWorkerService:
+    """
+    Владение фоновыми заданиями (ExportJob, ImportJob) процессом, в пуле которого они выполняются.
+
+    Задание при постановке в пул помечается идентификатором процесса (host:pid:случайный суффикс),
+    пока оно в пуле, поток процесса раз в BACKGROUND_JOB_HEARTBEAT_SECONDS обновляет его heartbeat_at.
+    Незавершённые задания без живого владельца - процесс на этом хосте завершён или
+    heartbeat старше BACKGROUND_JOB_STALE_SECONDS - переводятся в FAILED (fail_orphaned).
+    """
+
+    @staticmethod
+    def worker_id():
+        global _worker_id, _worker_pid
+        # Пересчитывается после fork: у дочернего процесса свои задания
+        if _worker_pid != os.getpid():
+            _worker_pid = os.getpid()
+            _worker_id = f"{socket.gethostname()}:{_worker_pid}:{uuid.uuid4().hex[:8]}"
+        return _worker_id
+
+    @staticmethod
+    def heartbeat_seconds():
+        return getattr(settings, 'BACKGROUND_JOB_HEARTBEAT_SECONDS', 30)
+
+    @staticmethod
+    def stale_seconds():
+        return getattr(settings, 'BACKGROUND_JOB_STALE_SECONDS', 120)
+
+    @staticmethod
+    def owner_fields():
+        """Поля нового задания: владелец - текущий процесс"""
+        return {'worker': JobWorkerService.worker_id(), 'heartbeat_at': timezone.now()}
+
+    @staticmethod
+    def claim(model, job_id):
+        """Задание поставлено в пул процесса: heartbeat обновляется до release"""
+        global _heartbeat_thread
+        with _active_lock:
+            _active.setdefault(model, set()).add(job_id)
+            if _heartbeat_thread is None or not _heartbeat_thread.is_alive():
+                _heartbeat_thread = threading.Thread(
+                    target=JobWorkerService.heartbeat_loop, name='job-heartbeat', daemon=True
+                )
+                _heartbeat_thread.start()
+
+    @staticmethod
+    def release(model, job_id):
+        with _active_lock:
+            _active.get(model, set()).discard(job_id)
+
+    @staticmethod
+    def beat():
+        """Обновляет heartbeat_at заданий процесса одним UPDATE на модель"""
+        with _active_lock:
+            active = {model: list(ids) for model, ids in _active.items() if ids}
+        now = timezone.now()
+        for model, ids in active.items():
+            model.objects.filter(id__in=ids).update(heartbeat_at=now)
+
+    @staticmethod
+    def heartbeat_loop():
+        while True:
+            time.sleep(JobWorkerService.heartbeat_seconds())
+            try:
+                JobWorkerService.beat()
+            except Exception:
+                # Недоступность БД не должна останавливать поток: следующий heartbeat повторит запись
+                pass
+            finally:
+                close_old_connections()
+
+    @staticmethod
+    def is_dead(worker):
+        """True, если владелец задания - завершённый процесс на этом хосте"""
+        if worker == JobWorkerService.worker_id():
+            return False
+        host, _, rest = worker.partition(':')
+        pid = rest.split(':', 1)[0]
+        if host != socket.gethostname() or not pid.isdigit():
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            return False
+        return False
+
+    @staticmethod
+    def fail_orphaned(model, active_statuses):
+        """
+        Переводит в FAILED незавершённые задания модели без живого владельца.
+        Возвращает список таких заданий (со статусом до изменения).
+        """
+        stale_before = timezone.now() - timedelta(seconds=JobWorkerService.stale_seconds())
+        candidates = model.objects.filter(status__in=active_statuses).exclude(worker=JobWorkerService.worker_id())
+
+        orphaned = [
+            job for job in candidates
+            if job.heartbeat_at is None or job.heartbeat_at < stale_before or JobWorkerService.is_dead(job.worker)
+        ]
+        if orphaned:
+            # Условие по статусу повторяется: задание могло завершиться между выборкой и обновлением
+            model.objects.filter(id__in=[job.id for job in orphaned], status__in=active_statuses).update(
+                status=model.STATUS_FAILED,
+                error='Задание прервано: процесс, выполнявший его, остановлен',
+                finished_at=timezone.now(),
+            )
+        return orphaned
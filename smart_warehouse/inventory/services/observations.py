@@ -0,0 +1,96 @@
+from django.db import connection, transaction
+from django.db.models import Max
+
+
+class ObservationService:
+    """
+    Запись в единое хранилище наблюдений (InventoryObservation).
+
+    Источники по-прежнему пишутся в InventoryHistory и InventoryCSVImport; после каждой записи
+    её строки копируются в inventory_observations одним INSERT ... SELECT: название товара берётся
+    из карточки (для сканирований). Статус сканирования копируется из строки источника, статус строки
+    импорта CSV вычисляется по количеству (calculate_status_sql): у старых строк в status записано 'OK'.
+    Повторная копия строки пропускается по уникальности (source, source_id, scanned_at) - scanned_at
+    входит в ключ, потому что таблица секционирована по нему (HistoryPartitionService), - поэтому
+    record_after можно вызывать с запасом по id.
+    """
+
+    COLUMNS = (
+        'source', 'source_id', 'robot_id', 'product_id', 'product_name', 'zone', 'row_number',
+        'shelf_number', 'quantity', 'expected_quantity', 'status', 'scanned_at', 'created_at',
+    )
+
+    @staticmethod
+    def source_model(source):
+        from inventory.models import InventoryCSVImport, InventoryObservation
+        from warehouse.models import InventoryHistory
+
+        return InventoryHistory if source == InventoryObservation.SOURCE_HISTORY else InventoryCSVImport
+
+    @staticmethod
+    def select_sql(source):
+        """SELECT строк источника (алиас t) в порядке колонок COLUMNS"""
+        from inventory.models import InventoryObservation
+        from inventory.services.csv_import import calculate_status_sql
+        from products.models import Product
+
+        table = connection.ops.quote_name(ObservationService.source_model(source)._meta.db_table)
+        if source == InventoryObservation.SOURCE_HISTORY:
+            return (
+                f"SELECT 'history', t.id, t.robot_id, t.product_id, COALESCE(p.name, ''), t.zone, t.row_number, "
+                f"t.shelf_number, t.quantity, t.expected_quantity, t.status, t.scanned_at, t.created_at "
+                f"FROM {table} t LEFT JOIN {connection.ops.quote_name(Product._meta.db_table)} p ON p.id = t.product_id"
+            )
+        return (
+            f"SELECT 'csv', t.id, NULL, t.product_id, t.product_name, t.zone, t.row_number, "
+            f"t.shelf_number, t.quantity, NULL, {calculate_status_sql('t.quantity')}, t.scanned_at, t.created_at "
+            f"FROM {table} t"
+        )
+
+    @staticmethod
+    def copy(source, condition, params):
+        """Копирует строки источника, подходящие под condition (SQL по алиасу t). Возвращает количество новых строк."""
+        from inventory.models import InventoryObservation
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {connection.ops.quote_name(InventoryObservation._meta.db_table)} "
+                f"({', '.join(ObservationService.COLUMNS)}) "
+                f"{ObservationService.select_sql(source)} WHERE {condition} "
+                f"ON CONFLICT (source, source_id, scanned_at) DO NOTHING",
+                params
+            )
+            return cursor.rowcount
+
+    @staticmethod
+    def record(source, ids):
+        """Копирует строки источника с указанными id (после bulk_create)"""
+        ids = [pk for pk in ids if pk is not None]
+        if not ids:
+            return 0
+        return ObservationService.copy(source, f"t.id IN ({', '.join(['%s'] * len(ids))})", ids)
+
+    @staticmethod
+    def last_id(source):
+        """Наибольший id в таблице источника - отметка перед массовой записью (INSERT ... SELECT, COPY)"""
+        return ObservationService.source_model(source).objects.aggregate(last=Max('id'))['last'] or 0
+
+    @staticmethod
+    def record_after(source, after_id):
+        """Копирует строки источника с id больше after_id (после массовой записи)"""
+        return ObservationService.copy(source, "t.id > %s", [after_id])
+
+    @staticmethod
+    def rebuild():
+        """
+        Пересобирает inventory_observations по обоим источникам (после прямой записи мимо сервисов).
+        Возвращает количество строк.
+        """
+        from inventory.models import InventoryObservation
+
+        with transaction.atomic():
+            InventoryObservation.objects.all().delete()
+            return sum(
+                ObservationService.copy(source, "1 = 1", [])
+                for source in (InventoryObservation.SOURCE_HISTORY, InventoryObservation.SOURCE_CSV)
+            )
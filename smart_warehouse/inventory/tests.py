@@ -1,3 +1,246 @@
-from django.test import TestCase
+import importlib
+import io
+import os
+import tempfile
+from datetime import date, datetime, timezone as dt_timezone
 
-# Create your tests here.
+from django.apps import apps
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from inventory.models import InventoryCSVImport, InventoryObservation
+from inventory.services import CSVImportService, ObservationService
+from products.models import Product
+from robots.models import Robot
+from robots.services import ScanIngestService
+from warehouse.models import DailyScanCounter
+from warehouse.services import HistoryLoadService, HistoryPartitionService, ScanCounterService
+from warehouse.services.synthetic_data import SyntheticDataService
+
+
+COMPARED_FIELDS = (
+    'product_id', 'zone', 'row_number', 'shelf_number', 'quantity', 'status', 'scanned_at', 'created_at',
+)
+
+CSV_HEADER = "product_id;product_name;quantity;zone;date;row;shelf\n"
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    DASHBOARD_BROADCAST_TICK=0,
+)
+class ObservationWritersTests(TestCase):
+    """Каждый путь записи в InventoryHistory / InventoryCSVImport копирует те же строки в inventory_observations"""
+
+    def setUp(self):
+        self.robot = Robot.objects.create(
+            id='RB-001', battery_level=90, last_update=datetime(2025, 1, 1, tzinfo=dt_timezone.utc),
+            current_zone='A', current_row=1, current_shelf=1,
+        )
+        self.product = Product.objects.create(id='TEL-4567', name='Роутер RT-AC68U', category='Сеть', optimal_stock=50)
+
+    def assertObservationsMatch(self, source):
+        rows = sorted(ObservationService.source_model(source).objects.values_list('id', *COMPARED_FIELDS))
+        observations = sorted(
+            InventoryObservation.objects.filter(source=source).values_list('source_id', *COMPARED_FIELDS)
+        )
+        self.assertTrue(rows)
+        self.assertEqual(rows, observations)
+
+    def report(self, timestamp, quantity=12):
+        return ScanIngestService.parse_report({
+            "robot_id": self.robot.id,
+            "timestamp": timestamp,
+            "location": {"zone": "A", "row": 3, "shelf": 2},
+            "battery_level": 80,
+            "scan_results": [
+                {"product_id": self.product.id, "quantity": quantity, "status": "LOW_STOCK"},
+                {"product_id": "TEL-NEW", "quantity": 40, "status": "OK"},
+            ],
+        })
+
+    def import_csv(self, content, atomic):
+        return CSVImportService.import_file(io.BytesIO((CSV_HEADER + content).encode('utf-8')), atomic=atomic)
+
+    def test_robot_ingest(self):
+        ScanIngestService.ingest_reports([
+            self.report("2025-01-15T10:00:00Z"),
+            self.report("2025-01-15T10:05:00Z", quantity=3),
+        ])
+
+        self.assertEqual(InventoryObservation.objects.filter(source=InventoryObservation.SOURCE_HISTORY).count(), 4)
+        self.assertObservationsMatch(InventoryObservation.SOURCE_HISTORY)
+        self.assertEqual(
+            set(InventoryObservation.objects.filter(product=self.product).values_list('product_name', flat=True)),
+            {'Роутер RT-AC68U'},
+        )
+
+    def test_csv_import_partial(self):
+        result = self.import_csv(
+            "TEL-4567;Роутер;10;A;2025-01-15;1;1\n"
+            "TEL-4567;Роутер;abc;A;2025-01-15;1;1\n"
+            "TEL-9999;Новый товар;3;B;2025-01-16;;\n",
+            atomic=False,
+        )
+
+        self.assertEqual(result['created_count'], 2)
+        self.assertObservationsMatch(InventoryObservation.SOURCE_CSV)
+
+    def test_csv_import_staged(self):
+        result = self.import_csv(
+            "TEL-4567;Роутер;10;A;2025-01-15;1;1\n"
+            "TEL-9999;Новый товар;3;B;2025-01-16;;\n",
+            atomic=True,
+        )
+
+        self.assertEqual(result['created_count'], 2)
+        self.assertObservationsMatch(InventoryObservation.SOURCE_CSV)
+
+    def test_csv_import_staged_with_errors_writes_nothing(self):
+        self.import_csv(
+            "TEL-4567;Роутер;10;A;2025-01-15;1;1\n"
+            "TEL-4567;Роутер;abc;A;2025-01-15;1;1\n",
+            atomic=True,
+        )
+
+        self.assertFalse(InventoryObservation.objects.exists())
+
+    def load_file(self, content, target):
+        file = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8')
+        self.addCleanup(os.remove, file.name)
+        with file:
+            file.write(content)
+        return HistoryLoadService.load(file.name, target=target)
+
+    def test_load_history(self):
+        result = self.load_file(
+            "robot_id;product_id;product_name;quantity;zone;row;shelf;scanned_at\n"
+            "RB-001;TEL-4567;;15;A;1;1;2025-01-15T10:00:00Z\n"
+            "RB-001;TEL-LOAD;Загруженный товар;4;B;2;;2025-02-03T08:30:00Z\n",
+            HistoryLoadService.TARGET_HISTORY,
+        )
+
+        self.assertEqual(result['rows'], 2)
+        self.assertObservationsMatch(InventoryObservation.SOURCE_HISTORY)
+
+    def test_load_history_csv_target(self):
+        self.load_file(
+            "product_id;product_name;quantity;zone;row;shelf;scanned_at\n"
+            "TEL-4567;Роутер;15;A;1;1;2025-01-15T10:00:00Z\n"
+            "TEL-LOAD;Загруженный товар;4;B;;;2025-02-03T08:30:00Z\n",
+            HistoryLoadService.TARGET_CSV,
+        )
+
+        self.assertObservationsMatch(InventoryObservation.SOURCE_CSV)
+
+    def test_seeders(self):
+        SyntheticDataService.seed_history(50)
+        SyntheticDataService.seed_csv(50)
+
+        self.assertObservationsMatch(InventoryObservation.SOURCE_HISTORY)
+        self.assertObservationsMatch(InventoryObservation.SOURCE_CSV)
+
+
+class LegacyCSVStatusTests(TestCase):
+    """Старые импорты CSV сохраняли status='OK' для любого остатка: статус берётся по количеству"""
+
+    def setUp(self):
+        InventoryCSVImport.objects.create(
+            product_id='TEL-4567', product_name='Роутер', quantity=3, zone='A', row_number=1, shelf_number=1,
+            scanned_at=datetime(2025, 1, 15, 10, tzinfo=dt_timezone.utc), status='OK',
+        )
+
+    def test_migration_copies_status_by_quantity(self):
+        migration = importlib.import_module('inventory.migrations.0009_inventory_observations')
+        with connection.schema_editor() as schema_editor:
+            migration.copy_observations(apps, schema_editor)
+
+        self.assertEqual(list(InventoryObservation.objects.values_list('status', flat=True)), ['CRITICAL'])
+
+    def test_rebuilds_use_status_by_quantity(self):
+        ObservationService.rebuild()
+        ScanCounterService.rebuild()
+
+        self.assertEqual(list(InventoryObservation.objects.values_list('status', flat=True)), ['CRITICAL'])
+        self.assertEqual(
+            list(DailyScanCounter.objects.filter(source=DailyScanCounter.SOURCE_CSV).values_list('status', 'count')),
+            [('CRITICAL', 1)],
+        )
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    DASHBOARD_BROADCAST_TICK=0,
+)
+class ObservationRetentionTests(TestCase):
+    def setUp(self):
+        Robot.objects.create(
+            id='RB-001', battery_level=90, last_update=datetime(2020, 1, 1, tzinfo=dt_timezone.utc),
+            current_zone='A', current_row=1, current_shelf=1,
+        )
+        Product.objects.create(id='TEL-4567', name='Роутер RT-AC68U', category='Сеть')
+
+    def ingest(self, timestamps):
+        ScanIngestService.ingest_reports([
+            ScanIngestService.parse_report({
+                "robot_id": "RB-001",
+                "timestamp": timestamp,
+                "location": {"zone": "A", "row": 1, "shelf": 1},
+                "battery_level": 80,
+                "scan_results": [{"product_id": "TEL-4567", "quantity": 10, "status": "LOW_STOCK"}],
+            })
+            for timestamp in timestamps
+        ])
+
+    def count(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {table}")
+            return cursor.fetchone()[0]
+
+    def test_create_partition_moves_observations_out_of_default(self):
+        self.ingest(["2021-03-10T10:00:00Z", "2021-03-20T10:00:00Z"])
+        self.assertEqual(self.count('inventory_observations_history_default'), 2)
+
+        created = HistoryPartitionService.create_partition(date(2021, 3, 1))
+
+        self.assertEqual(created, ['inventory_history_p202103', 'inventory_observations_history_p202103'])
+        self.assertEqual(self.count('inventory_observations_history_default'), 0)
+        self.assertEqual(self.count('inventory_observations_history_p202103'), 2)
+        self.assertEqual(HistoryPartitionService.create_partition(date(2021, 3, 1)), [])
+
+    def test_apply_retention_drops_observation_partitions_of_expired_months(self):
+        for month in (date(2021, 3, 1), date(2021, 4, 1)):
+            HistoryPartitionService.create_partition(month)
+        self.ingest(["2021-03-10T10:00:00Z", "2021-03-20T10:00:00Z", "2021-04-10T10:00:00Z"])
+        csv_row = InventoryCSVImport.objects.create(
+            product_id='TEL-4567', product_name='Роутер', quantity=10, zone='A',
+            scanned_at=datetime(2021, 3, 10, tzinfo=dt_timezone.utc), status='LOW_STOCK',
+        )
+        ObservationService.record(InventoryObservation.SOURCE_CSV, [csv_row.id])
+        # Отложенные проверки внешних ключей не дают удалить партицию в транзакции теста
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+        processed = HistoryPartitionService.apply_retention(
+            retention_months=1, drop=True, now=datetime(2021, 5, 15, tzinfo=dt_timezone.utc)
+        )
+
+        self.assertEqual(processed, ['inventory_history_p202103', 'inventory_observations_history_p202103'])
+        self.assertEqual(
+            sorted(InventoryObservation.objects.values_list('source', 'scanned_at')),
+            [
+                (InventoryObservation.SOURCE_CSV, datetime(2021, 3, 10, tzinfo=dt_timezone.utc)),
+                (InventoryObservation.SOURCE_HISTORY, datetime(2021, 4, 10, 10, tzinfo=dt_timezone.utc)),
+            ],
+        )
+
+    def test_apply_retention_detaches_observation_partitions(self):
+        HistoryPartitionService.create_partition(date(2021, 3, 1))
+        self.ingest(["2021-03-10T10:00:00Z"])
+
+        HistoryPartitionService.apply_retention(
+            retention_months=1, now=datetime(2021, 5, 15, tzinfo=dt_timezone.utc)
+        )
+
+        self.assertFalse(InventoryObservation.objects.exists())
+        self.assertEqual(self.count('inventory_observations_history_p202103'), 1)
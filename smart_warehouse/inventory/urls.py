@@ -1,11 +1,21 @@
 from django.contrib import admin
 from django.urls import path, include
-from .views import InventoryHistoryView, InventoryTrendView, InventoryExportPDFView, InventoryExportExcelView, InventoryUploadView
+from .views import InventoryHistoryView, InventoryTrendView, InventoryExportPDFView, InventoryExportExcelView, InventoryUploadView, \
+    InventoryExportCSVView, InventoryExportNDJSONView, ExportJobCreateView, ExportJobDetailView, ExportJobDownloadView, \
+    ImportJobCreateView, ImportJobDetailView
 
 urlpatterns = [
     path('history/', InventoryHistoryView.as_view(), name='history'),
     path('trend/', InventoryTrendView.as_view(), name='trend'),
     path("export/excel/", InventoryExportExcelView.as_view(), name="inventory_export_excel"),
     path("export/pdf/", InventoryExportPDFView.as_view(), name="inventory_export_pdf"),
-    path('upload/', InventoryUploadView.as_view(), name='inventory_upload')
+    path("export/csv/", InventoryExportCSVView.as_view(), name="inventory_export_csv"),
+    path("export/ndjson/", InventoryExportNDJSONView.as_view(), name="inventory_export_ndjson"),
+    path("export/jobs/", ExportJobCreateView.as_view(), name="inventory_export_jobs"),
+    path("export/jobs/<uuid:job_id>/", ExportJobDetailView.as_view(), name="inventory_export_job"),
+    path("export/jobs/<uuid:job_id>/download/", ExportJobDownloadView.as_view(),
+         name="inventory_export_job_download"),
+    path('upload/', InventoryUploadView.as_view(), name='inventory_upload'),
+    path("import/jobs/", ImportJobCreateView.as_view(), name="inventory_import_jobs"),
+    path("import/jobs/<uuid:job_id>/", ImportJobDetailView.as_view(), name="inventory_import_job"),
 ]
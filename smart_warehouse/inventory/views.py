@@ -1,29 +1,27 @@
-import csv
 import io
 import os
+import tempfile
 
-from django.db.models import F, Q
+from django.conf import settings
+from django.db.models import F
 from django.utils import timezone
-from django.utils.dateparse import parse_date
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from warehouse.models import InventoryHistory
+from warehouse.services import RobotActivityService
 from .serializers import InventoryItemSerializer
 from rest_framework.pagination import PageNumberPagination
-from openpyxl import Workbook
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 import numpy as np
-from products.models import Product
-from .models import InventoryCSVImport
+from .models import ExportJob, ImportJob
+from .pagination import KeysetPagination, estimate_count
+from .services import (
+    CSVImportService, ExportJobService, ImportJobService, InventoryExportService, InventoryQueryService,
+    lttb_indices,
+)
 
 from datetime import datetime, timedelta
-from itertools import chain
 from operator import attrgetter
 
 
@@ -34,33 +32,6 @@ class InventoryPagination(PageNumberPagination):
     max_page_size = 100
 
 
-# Функция для расчета статуса товара по количеству
-def calculate_status(quantity):
-    if quantity is None:
-        return "-"
-    if quantity <= 5:
-        return "CRITICAL"
-    if quantity <= 20:
-        return "LOW_STOCK"
-    return "OK"
-
-
-# Универсальное сериализованное представление элемента для обеих моделей
-def serialize_item(item, source):
-    return {
-        "product_id": item.get("product_id"),
-        "product_name": item.get("product_name") or item.get("product__name"),
-        "zone": item.get("zone"),
-        "quantity": item.get("quantity"),
-        "scanned_at": item.get("scanned_at"),
-        "status": item.get("status") or calculate_status(item.get("quantity")),
-        "source": source,
-        "row_number": item.get("row_number"),
-        "shelf_number": item.get("shelf_number"),
-        "created_at": item.get("created_at"),
-    }
-
-
 class InventoryHistoryView(APIView):
     """Возвращает историю инвентаризации с фильтрацией, поиском, пагинацией и подсчетом расхождений"""
     def get(self, request):
@@ -74,135 +45,54 @@ class InventoryHistoryView(APIView):
         now = timezone.now()
         last_24_hours = now - timedelta(hours=24)
 
-        qs1 = InventoryHistory.objects.filter(scanned_at__gte=last_24_hours)
-        qs2 = InventoryCSVImport.objects.filter(scanned_at__gte=last_24_hours)
-
-        if from_date:
-            qs1 = qs1.filter(scanned_at__date__gte=from_date)
-            qs2 = qs2.filter(scanned_at__date__gte=from_date)
-        if to_date:
-            qs1 = qs1.filter(scanned_at__date__lte=to_date)
-            qs2 = qs2.filter(scanned_at__date__lte=to_date)
-        if zone:
-            qs1 = qs1.filter(zone__iexact=zone)
-            qs2 = qs2.filter(zone__iexact=zone)
-        if search:
-            qs1 = qs1.filter(
-                Q(product__name__icontains=search) | Q(product__id__icontains=search)
-            )
-            qs2 = qs2.filter(
-                Q(product_name__icontains=search) | Q(product_id__icontains=search)
-            )
-
-        # Преобразуем QuerySet в список словарей
-        qs1_values = list(
-            qs1.values(
-                'id',
-                "product_id",
-                "product__name",
-                "zone",
-                "status",
-                "quantity",
-                "scanned_at",
-            )
-        )
-        for item in qs1_values:
-            item["product_name"] = item.pop("product__name")
-            item["source"] = "history"
-
-        qs2_values = list(
-            qs2.values(
-                'id',
-                "product_id",
-                "product_name",
-                "quantity",
-                "zone",
-                "row_number",
-                "shelf_number",
-                "scanned_at",
-                "created_at",
-            )
+        qs = InventoryQueryService.filtered(
+            from_date, to_date, zone, search, since=last_24_hours
         )
-        for item in qs2_values:
-            qty = item.get("quantity")
-            if qty is None:
-                item["status"] = "-"
-            elif qty <= 5:
-                item["status"] = "CRITICAL"
-            elif qty <= 20:
-                item["status"] = "LOW_STOCK"
-            else:
-                item["status"] = "OK"
-            item["source"] = "csv"
-
-        combined = list(chain(qs1_values, qs2_values))
-
-        # Подсчет расхождений
-        discrepancies_count = 0
-        products_cache = {}
-
-        for item in combined:
-            product_id = item.get("product_id")
-            actual_qty = item.get("quantity", 0)
-
-            if product_id not in products_cache:
-                try:
-                    product = Product.objects.get(id=product_id)
-                    products_cache[product_id] = {
-                        'optimal_stock': product.optimal_stock,
-                        'min_stock': product.min_stock
-                    }
-                except Product.DoesNotExist:
-                    products_cache[product_id] = None
-
-            product_data = products_cache[product_id]
-
-            if product_data:
-                expected_qty = product_data['optimal_stock']
-                min_stock = product_data['min_stock']
-
-                discrepancy = actual_qty - expected_qty
-                threshold = max(expected_qty * 0.1, 5)
-
-                if abs(discrepancy) > threshold or actual_qty < min_stock:
-                    discrepancies_count += 1
-
-                item["expected_quantity"] = expected_qty
-                item["discrepancy"] = discrepancy
-                item["min_stock"] = min_stock
-            else:
-                item["expected_quantity"] = None
-                item["discrepancy"] = None
-                item["min_stock"] = None
-
-        if status_filter and status_filter.lower() != "all":
-            combined = [
-                i for i in combined if i.get("status", "").lower() == status_filter.lower()
-            ]
 
-        # Сортировка
-        reverse = ordering.startswith("-")
+        if status_filter and status_filter.lower() == "all":
+            status_filter = None
+
+        if KeysetPagination.is_requested(request):
+            return self.get_cursor_page(request, qs, status_filter, ordering)
+
+        # Сортировка: только по колонкам выборки, с детерминированным добиванием по source/id
         field = ordering.lstrip("-")
-        combined.sort(key=lambda x: x.get(field) if x.get(field) is not None else "", reverse=reverse)
+        if field not in InventoryQueryService.FIELDS:
+            field = "scanned_at"
+        if ordering.startswith("-"):
+            order_by = [F(field).desc(nulls_last=True), F("source").desc(), F("id").desc()]
+        else:
+            order_by = [F(field).asc(nulls_first=True), F("source").asc(), F("id").asc()]
 
-        # Пагинация
+        rows = InventoryQueryService.rows(qs, status_filter).order_by(*order_by)
+
+        # Пагинация (COUNT(*) и LIMIT/OFFSET в БД)
         paginator = InventoryPagination()
-        page = paginator.paginate_queryset(combined, request)
+        page = paginator.paginate_queryset(rows, request)
+
+        items = []
+        for item in page:
+            InventoryQueryService.present(item)
+            item.pop("is_discrepancy")
+            items.append(item)
+
+        total = paginator.page.paginator.count
 
         response_data = {
-            "total": len(combined),
-            "items": page,
+            "total": total,
+            "items": items,
             "summary": {
-                "total_checks": len(combined),
-                "unique_products": len({item["product_name"] for item in combined if item["product_name"]}),
-                "discrepancies": discrepancies_count,
-                "avg_time_per_zone": round(len(combined) / 60, 2) if combined else 0
+                "total_checks": total,
+                "unique_products": InventoryQueryService.unique_products_count(qs, status_filter),
+                # Расхождения считаются без учета фильтра по статусу
+                "discrepancies": InventoryQueryService.discrepancies_count(qs),
+                "avg_time_per_zone": round(total / 60, 2) if total else 0
             },
             "pagination": {
                 "page": paginator.page.number,
                 "page_size": paginator.page.paginator.per_page,
                 "total_pages": paginator.page.paginator.num_pages,
-                "total_items": paginator.page.paginator.count,
+                "total_items": total,
                 "has_next": paginator.page.has_next(),
                 "has_previous": paginator.page.has_previous(),
             },
@@ -210,12 +100,41 @@ class InventoryHistoryView(APIView):
 
         return Response(response_data)
 
+    def get_cursor_page(self, request, qs, status_filter, ordering):
+        """
+        Курсорный режим (?pagination=cursor): страница по ключу (scanned_at, source, id)
+        без OFFSET и точного COUNT(*); total - оценка планировщика.
+        """
+        direction = "" if ordering == "scanned_at" else "-"
+        paginator = KeysetPagination([f"{direction}scanned_at", f"{direction}source", f"{direction}id"])
+
+        page = paginator.paginate(
+            request,
+            lambda position_q, order_by: InventoryQueryService.rows(
+                qs, status_filter, position_q
+            ).order_by(*order_by)
+        )
+
+        items = []
+        for item in page:
+            InventoryQueryService.present(item)
+            item.pop("is_discrepancy")
+            items.append(item)
+
+        return Response({
+            "total": estimate_count(InventoryQueryService.rows(qs, status_filter)),
+            "total_is_estimate": True,
+            "items": items,
+            "pagination": paginator.get_pagination_data(),
+        })
+
 
 def lttb_downsample(data, threshold):
     """
     LTTB downsampling - уменьшает количество точек на графике для трендов
     data: список словарей [{'scanned_at': '...', 'quantity': ...}, ...]
     threshold: целевое количество точек
+    Сам алгоритм - lttb_indices на массивах NumPy.
     """
     # Если точек меньше или равно threshold, возвращаем как есть
     if len(data) <= threshold:
@@ -225,396 +144,288 @@ def lttb_downsample(data, threshold):
     if threshold < 3:
         return data[:threshold] if len(data) >= threshold else data
 
-    points = []
-    seen_timestamps = set()
+    x = np.fromiter(
+        (datetime.fromisoformat(d['scanned_at'].replace('Z', '+00:00')).timestamp() for d in data),
+        dtype=np.float64,
+        count=len(data)
+    )
+    # Защита от None в quantity
+    y = np.fromiter(
+        (float(d['quantity']) if d['quantity'] is not None else 0.0 for d in data),
+        dtype=np.float64,
+        count=len(data)
+    )
 
-    for d in data:
-        timestamp = datetime.fromisoformat(d['scanned_at'].replace('Z', '+00:00')).timestamp()
+    return [data[i] for i in lttb_indices(x, y, threshold)]
 
-        # Обработка дубликатов timestamp
-        original_timestamp = timestamp
-        counter = 0
-        while timestamp in seen_timestamps:
-            counter += 1
-            timestamp = original_timestamp + (counter * 0.001)
 
-        seen_timestamps.add(timestamp)
-
-        # Защита от None в quantity
-        y = float(d['quantity']) if d['quantity'] is not None else 0.0
-        points.append({'x': timestamp, 'y': y, 'original': d})
+class InventoryTrendView(APIView):
+    """
+    Возвращает тренд изменения количества товаров во времени с возможностью downsampling.
 
-    # Сортируем по времени (на всякий случай)
-    points.sort(key=lambda p: p['x'])
+    Параметры: products, from/to (YYYY-MM-DD), max_points,
+    mode=raw (сырые точки + LTTB) | bucket (min/max/avg/last по интервалам в SQL) | auto (по умолчанию),
+    bucket (например 15m, 1h, 1d) - шаг для mode=bucket, по умолчанию диапазон / max_points.
+    В режиме auto интервалы выбираются, если оценка количества строк больше TREND_RAW_MAX_POINTS.
+    """
+    MODES = ('auto', 'raw', 'bucket')
 
-    # Всегда берём первую точку
-    sampled = [points[0]]
+    def get(self, request):
+        max_points = int(request.GET.get('max_points', 200))
+        mode = request.GET.get('mode', 'auto')
+        if mode not in self.MODES:
+            return Response({'error': f"mode должен быть одним из: {', '.join(self.MODES)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-    # Размер бакета
-    bucket_size = (len(points) - 2) / (threshold - 2)
+        from_date = request.GET.get('from')
+        to_date = request.GET.get('to')
+        qs = InventoryQueryService.filtered(from_date, to_date)
 
-    for i in range(threshold - 2):
-        # Вычисляем среднюю точку для следующего бакета
-        avg_range_start = int((i + 1) * bucket_size) + 1
-        avg_range_end = int((i + 2) * bucket_size) + 1
-        avg_range_end = min(avg_range_end, len(points))
+        product_filter = request.GET.get('products')
+        if product_filter:
+            products = [p.strip() for p in product_filter.split(',')]
+            qs = qs.filter(product_id__in=products)
 
-        # Защита от пустого диапазона
-        if avg_range_start >= avg_range_end:
-            continue
+        meta = {'max_points_per_product': max_points}
 
-        avg_x = 0
-        avg_y = 0
-        avg_range_length = avg_range_end - avg_range_start
+        if mode == 'auto':
+            estimated = estimate_count(qs)
+            mode = 'bucket' if estimated > getattr(settings, 'TREND_RAW_MAX_POINTS', 200000) else 'raw'
+            meta['estimated_points'] = estimated
 
-        for j in range(avg_range_start, avg_range_end):
-            avg_x += points[j]['x']
-            avg_y += points[j]['y']
+        if mode == 'bucket':
+            try:
+                data, bucket = self.get_bucketed(request, qs, from_date, to_date, max_points)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            meta['bucket_seconds'] = int(bucket.total_seconds()) if bucket else None
+        else:
+            data = self.get_raw(qs, max_points)
 
-        avg_x /= avg_range_length
-        avg_y /= avg_range_length
+        meta['mode'] = mode
+        meta['total_products'] = len(data)
 
-        # Диапазон текущего бакета
-        range_start = int(i * bucket_size) + 1
-        range_end = int((i + 1) * bucket_size) + 1
+        response = {
+            'products': list(data),
+            'data': data,
+            'meta': meta
+        }
+        return Response(response)
 
-        # Защита от выхода за границы
-        range_end = min(range_end, len(points))
+    def get_raw(self, qs, max_points):
+        """Сырые точки, прореженные LTTB до max_points на товар"""
+        data = {}
+        for product, series in InventoryQueryService.trend_series(qs):
+            if len(series) > max_points:
+                # Прореживание сразу по ряду товара, ISO-строки строятся только для выбранных точек
+                x = np.fromiter((scanned_at.timestamp() for scanned_at, _ in series), dtype=np.float64, count=len(series))
+                y = np.fromiter((quantity for _, quantity in series), dtype=np.float64, count=len(series))
+                series = [series[i] for i in lttb_indices(x, y, max_points)]
+
+            data[product] = [
+                {'scanned_at': scanned_at.isoformat(), 'quantity': quantity}
+                for scanned_at, quantity in series
+            ]
+        return data
 
-        if range_start >= range_end:
-            continue
+    def get_bucketed(self, request, qs, from_date, to_date, max_points):
+        """Агрегаты по интервалам; интервалы отсчитываются от начала диапазона"""
+        first, last = InventoryQueryService.trend_time_range(qs)
+        if first is None:
+            return {}, None
 
-        max_area = -1
-        max_area_point = None
+        start = InventoryQueryService.day_start(from_date) or first
+        to_start = InventoryQueryService.day_start(to_date)
+        end = to_start + timedelta(days=1) if to_start else last + timedelta(microseconds=1)
 
-        point_a = sampled[-1]
+        bucket = RobotActivityService.parse_duration(request.GET.get('bucket'), None)
+        if bucket is None:
+            # Шаг в целых минутах, чтобы на товар пришлось не больше max_points интервалов
+            minutes = -(-(end - start) // (timedelta(minutes=1) * max(max_points, 1)))
+            bucket = timedelta(minutes=max(minutes, 1))
 
-        for j in range(range_start, range_end):
-            # Вычисляем площадь треугольника
-            area = abs(
-                (point_a['x'] - avg_x) * (points[j]['y'] - point_a['y']) -
-                (point_a['x'] - points[j]['x']) * (avg_y - point_a['y'])
-            ) * 0.5
+        max_buckets = getattr(settings, 'TREND_MAX_BUCKETS', 5000)
+        if (end - start) / bucket > max_buckets:
+            raise ValueError(f"Слишком мелкий интервал: не больше {max_buckets} интервалов на товар")
 
-            if area > max_area:
-                max_area = area
-                max_area_point = points[j]
+        return InventoryQueryService.trend_buckets(qs, bucket, origin=start), bucket
 
-        # Добавляем точку с максимальной площадью
-        if max_area_point is not None:
-            sampled.append(max_area_point)
 
-    # Всегда берём последнюю точку
-    sampled.append(points[-1])
+class InventoryExportMixin:
+    """Миксин для фильтрации и подготовки данных для экспорта (Excel/PDF) из единого хранилища наблюдений"""
+    def get_filtered_queryset(self, request):
+        return InventoryExportService.filtered(request.data)
 
-    return [p['original'] for p in sampled]
+    def iter_filtered_data(self, request):
+        """
+        Строки для экспорта, отсортированные в БД и читаемые порциями.
+        None, если по фильтру нет данных.
+        """
+        qs = self.get_filtered_queryset(request)
+        if not qs.exists():
+            return None
+        return InventoryExportService.iter_rows(qs, request.data.get("ordering", "-scanned_at"))
 
 
-class InventoryTrendView(APIView):
-    """Возвращает тренд изменения количества товаров во времени с возможностью downsampling"""
-    def get(self, request):
-        max_points = int(request.GET.get('max_points', 200))
+class InventoryExportExcelView(InventoryExportMixin, APIView):
+    """
+    Экспорт данных инвентаризации в Excel.
 
-        product_filter = request.GET.get('products')
-        if product_filter:
-            products = [p.strip() for p in product_filter.split(',')]
-            qs1 = InventoryHistory.objects.filter(product_id__in=products)
-            qs2 = InventoryCSVImport.objects.filter(product_id__in=products)
-        else:
-            qs1 = InventoryHistory.objects.all()
-            qs2 = InventoryCSVImport.objects.all()
+    Книга пишется в режиме write-only во временный файл и отдаётся потоком блоками
+    через асинхронный итератор, поэтому память ограничена порцией строк, а не размером выгрузки.
+    """
+    def post(self, request):
+        rows = self.iter_filtered_data(request)
+        if rows is None:
+            return Response({"error": "Нет данных для экспорта"}, status=status.HTTP_400_BAD_REQUEST)
 
-        data = {}
-        all_products = set(qs1.values_list('product_id', flat=True)) | \
-                       set(qs2.values_list('product_id', flat=True))
+        # Файл удаляется при закрытии, а iter_file закрывает его после отправки
+        file = tempfile.TemporaryFile()
+        try:
+            InventoryExportService.write_xlsx(rows, file)
+        except Exception:
+            file.close()
+            raise
+        size = file.seek(0, os.SEEK_END)
+        file.seek(0)
+
+        response = StreamingHttpResponse(
+            InventoryExportService.async_stream(InventoryExportService.iter_file(file)),
+            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+        response["Content-Length"] = str(size)
+        response["Content-Disposition"] = 'attachment; filename="inventory_export.xlsx"'
+        return response
 
-        for product in all_products:
-            records = []
 
-            for r in qs1.filter(product_id=product).order_by('scanned_at'):
-                if r.quantity is not None:
-                    records.append({
-                        'scanned_at': r.scanned_at.isoformat(),
-                        'quantity': r.quantity
-                    })
+class InventoryExportStreamView(InventoryExportMixin, APIView):
+    """
+    Потоковая выгрузка для BI: строки читаются серверным курсором и отправляются по мере готовности.
+    Фильтры - как у экспорта Excel/PDF; {"gzip": true} в теле или ?gzip=1 - сжатие на лету (файл .gz).
+    Подклассы задают extension, content_type и renderer - генератор байтов по строкам выборки.
+    """
+    extension = None
+    content_type = None
+    renderer = None
 
-            for r in qs2.filter(product_id=product).order_by('scanned_at'):
-                if r.quantity is not None:
-                    records.append({
-                        'scanned_at': r.scanned_at.isoformat(),
-                        'quantity': r.quantity
-                    })
+    def post(self, request):
+        rows = self.iter_filtered_data(request)
+        if rows is None:
+            return Response({"error": "Нет данных для экспорта"}, status=status.HTTP_400_BAD_REQUEST)
 
-            records.sort(key=lambda x: x['scanned_at'])
+        filename = f"inventory_export.{self.extension}"
+        content_type = self.content_type
+        chunks = self.renderer(rows)
 
-            if len(records) > max_points:
-                records = lttb_downsample(records, max_points)
+        if request_flag(request, "gzip", default=False):
+            chunks = InventoryExportService.gzip_stream(chunks)
+            filename += ".gz"
+            content_type = "application/gzip"
 
-            data[str(product)] = records
+        response = StreamingHttpResponse(InventoryExportService.async_stream(chunks), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
 
-        response = {
-            'products': [str(p) for p in all_products],
-            'data': data,
-            'meta': {
-                'max_points_per_product': max_points,
-                'total_products': len(all_products)
-            }
-        }
-        return Response(response)
 
+class InventoryExportCSVView(InventoryExportStreamView):
+    """Экспорт данных инвентаризации в CSV (разделитель ';')"""
+    extension = "csv"
+    content_type = "text/csv; charset=utf-8"
+    renderer = staticmethod(InventoryExportService.iter_csv)
 
-class InventoryExportMixin:
-    """Миксин для фильтрации и подготовки данных для экспорта (Excel/PDF) из InventoryHistory и InventoryCSVImport"""
-    def get_filtered_data(self, request):
-        if request.data.get("all"):
-            filters = request.data.get("filters", {})
-            from_date = filters.get("from")
-            to_date = filters.get("to")
-            zone = filters.get("zone")
-            status_filter = filters.get("status")
-            search = filters.get("search")
-
-            qs1 = InventoryHistory.objects.all()
-            qs2 = InventoryCSVImport.objects.all()
-
-            if from_date:
-                qs1 = qs1.filter(scanned_at__date__gte=from_date)
-                qs2 = qs2.filter(scanned_at__date__gte=from_date)
-            if to_date:
-                qs1 = qs1.filter(scanned_at__date__lte=to_date)
-                qs2 = qs2.filter(scanned_at__date__lte=to_date)
-            if zone:
-                qs1 = qs1.filter(zone__iexact=zone)
-                qs2 = qs2.filter(zone__iexact=zone)
-            if search:
-                qs1 = qs1.filter(
-                    Q(product__name__icontains=search) | Q(product__id__icontains=search)
-                )
-                qs2 = qs2.filter(
-                    Q(product_name__icontains=search) | Q(product_id__icontains=search)
-                )
-
-            data = []
-            for item in qs1:
-                data.append({
-                    "product_id": item.product_id,
-                    "product_name": item.product.name if item.product else "",
-                    "zone": item.zone,
-                    "quantity": item.quantity,
-                    "status": item.status,
-                    "scanned_at": item.scanned_at,
-                    "source": "history",
-                })
-            for item in qs2:
-                qty = item.quantity
-                if qty is None:
-                    status = "-"
-                elif qty <= 5:
-                    status = "CRITICAL"
-                elif qty <= 20:
-                    status = "LOW_STOCK"
-                else:
-                    status = "OK"
-
-                data.append({
-                    "product_id": item.product_id,
-                    "product_name": item.product_name,
-                    "zone": item.zone,
-                    "quantity": item.quantity,
-                    "status": status,
-                    "scanned_at": item.scanned_at,
-                    "source": "csv",
-                })
-        else:
-            # Фильтр по выбранным элементам
-            selected = request.data.get("selected", [])
-            data = []
-
-            history_ids = [item["id"] for item in selected if item["source"] == "history"]
-            csv_ids = [item["id"] for item in selected if item["source"] == "csv"]
-
-            if history_ids:
-                qs_history = InventoryHistory.objects.filter(id__in=history_ids)
-                for item in qs_history:
-                    data.append({
-                        "product_id": item.product_id,
-                        "product_name": item.product.name if item.product else "",
-                        "zone": item.zone,
-                        "quantity": item.quantity,
-                        "status": item.status,
-                        "scanned_at": item.scanned_at,
-                        "source": "history",
-                    })
-
-            if csv_ids:
-                qs_csv = InventoryCSVImport.objects.filter(id__in=csv_ids)
-                for item in qs_csv:
-                    qty = item.quantity
-                    if qty is None:
-                        status = "-"
-                    elif qty <= 5:
-                        status = "CRITICAL"
-                    elif qty <= 20:
-                        status = "LOW_STOCK"
-                    else:
-                        status = "OK"
-
-                    data.append({
-                        "product_id": item.product_id,
-                        "product_name": item.product_name,
-                        "zone": item.zone,
-                        "quantity": item.quantity,
-                        "status": status,
-                        "scanned_at": item.scanned_at,
-                        "source": "csv",
-                    })
-
-        # Сортировка
-        ordering = request.data.get("ordering", "-scanned_at")
-        reverse = ordering.startswith("-")
-        field = ordering.lstrip("-")
-        data.sort(key=lambda x: x.get(field), reverse=reverse)
-
-        # Расчет расхождений
-        products_cache = {}
-        discrepancies_count = 0
-
-        for item in data:
-            product_id = item.get("product_id")
-            actual_qty = item.get("quantity", 0)
-
-            if product_id not in products_cache:
-                try:
-                    product = Product.objects.get(id=product_id)
-                    products_cache[product_id] = {
-                        'optimal_stock': product.optimal_stock,
-                        'min_stock': product.min_stock
-                    }
-                except Product.DoesNotExist:
-                    products_cache[product_id] = None
-
-            product_data = products_cache[product_id]
-
-            if product_data:
-                expected_qty = product_data['optimal_stock']
-                discrepancy = actual_qty - expected_qty
-                threshold = max(expected_qty * 0.1, 5)
-
-                if abs(discrepancy) > threshold or actual_qty < product_data['min_stock']:
-                    discrepancies_count += 1
-
-                item["expected_quantity"] = expected_qty
-                item["discrepancy"] = discrepancy
-                item["min_stock"] = product_data["min_stock"]
-            else:
-                item["expected_quantity"] = None
-                item["discrepancy"] = None
-                item["min_stock"] = None
 
-        return data
+class InventoryExportNDJSONView(InventoryExportStreamView):
+    """Экспорт данных инвентаризации в NDJSON (один JSON-объект на строку)"""
+    extension = "ndjson"
+    content_type = "application/x-ndjson"
+    renderer = staticmethod(InventoryExportService.iter_ndjson)
 
 
-class InventoryExportExcelView(InventoryExportMixin, APIView):
-    """Экспорт данных инвентаризации в Excel"""
+class ExportJobCreateView(APIView):
+    """
+    Фоновый экспорт: {"format": "xlsx|pdf|csv|ndjson", ...параметры экспорта Excel/PDF} -> задание (202).
+    Одинаковые запросы за EXPORT_JOB_DEDUPE_MINUTES получают уже существующее задание.
+    """
     def post(self, request):
-        data = self.get_filtered_data(request)
-        if not data:
+        export_format = request.data.get("format", "xlsx")
+        if export_format not in ExportJobService.CONTENT_TYPES:
+            return Response(
+                {"error": f"format должен быть одним из: {', '.join(ExportJobService.CONTENT_TYPES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if not InventoryExportService.filtered(request.data).exists():
             return Response({"error": "Нет данных для экспорта"}, status=status.HTTP_400_BAD_REQUEST)
 
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Inventory Export"
-
-        headers = [
-            "ID товара",
-            "Дата",
-            "Зона",
-            "Товар",
-            "Кол-во (факт)",
-            "Ожидаемое количество",
-            "Расхождение (+/-)",
-            "Минимальный запас",
-            "Статус",
-            "Источник"
-        ]
-        ws.append(headers)
-
-        for item in data:
-            ws.append([
-                item["product_id"],
-                item["scanned_at"].strftime("%Y-%m-%d %H:%M:%S") if item["scanned_at"] else "",
-                item["zone"],
-                item["product_name"],
-                item["quantity"],
-                item.get("expected_quantity", ""),
-                item.get("discrepancy", ""),
-                item.get("min_stock", ""),
-                item["status"],
-                item["source"]
-            ])
+        job, created = ExportJobService.submit(export_format, request.data, request.user)
+        return Response(
+            dict(ExportJobService.as_dict(job), deduplicated=not created),
+            status=status.HTTP_202_ACCEPTED
+        )
 
-        buffer = io.BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
 
-        response = HttpResponse(
-            buffer.getvalue(),
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+class ExportJobDetailView(APIView):
+    """Статус и прогресс задания экспорта"""
+    def get(self, request, job_id):
+        job = ExportJob.objects.filter(id=job_id).first()
+        if not job:
+            return Response({"error": "Задание не найдено"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(ExportJobService.as_dict(job))
+
+
+class ExportJobDownloadView(APIView):
+    """
+    Скачивание готового файла задания с поддержкой Range (докачка): bytes=start-end, bytes=start-, bytes=-N.
+    If-Range с устаревшим ETag отдаёт файл целиком.
+    """
+    def get(self, request, job_id):
+        job = ExportJob.objects.filter(id=job_id).first()
+        if not job:
+            return Response({"error": "Задание не найдено"}, status=status.HTTP_404_NOT_FOUND)
+        if job.status != ExportJob.STATUS_DONE:
+            return Response({"error": "Файл ещё не готов", "status": job.status}, status=status.HTTP_409_CONFLICT)
+        if not job.file_path or not os.path.exists(job.file_path):
+            return Response({"error": "Файл удалён, создайте задание заново"}, status=status.HTTP_410_GONE)
+
+        size = os.path.getsize(job.file_path)
+        etag = f'"{job.id}-{size}"'
+
+        range_header = request.META.get("HTTP_RANGE")
+        if_range = request.META.get("HTTP_IF_RANGE")
+        if if_range and if_range != etag:
+            range_header = None
+
+        try:
+            byte_range = ExportJobService.parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+        start, end = byte_range or (0, size - 1)
+        response = StreamingHttpResponse(
+            InventoryExportService.async_stream(ExportJobService.iter_file(job.file_path, start, end - start + 1)),
+            status=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK,
+            content_type=ExportJobService.CONTENT_TYPES[job.format],
         )
-        response["Content-Disposition"] = 'attachment; filename="inventory_export.xlsx"'
+        if byte_range:
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(end - start + 1)
+        response["Accept-Ranges"] = "bytes"
+        response["ETag"] = etag
+        response["Content-Disposition"] = f'attachment; filename="inventory_export.{job.format}"'
         return response
 
 
 class InventoryExportPDFView(InventoryExportMixin, APIView):
     """Экспорт данных инвентаризации в PDF"""
     def post(self, request):
-        data = self.get_filtered_data(request)
-        if not data:
+        data = self.iter_filtered_data(request)
+        if data is None:
             return Response({"error": "Нет данных для экспорта"}, status=status.HTTP_400_BAD_REQUEST)
 
         buffer = io.BytesIO()
-        p = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4
-        y = height - 50
-
-        font_path = os.path.join(os.path.dirname(__file__), "DejaVuSans.ttf")
-        pdfmetrics.registerFont(TTFont("DejaVuSans", font_path))
-        p.setFont("DejaVuSans", 12)
-
-        # Заголовок
-        p.setFont("DejaVuSans", 14)
-        p.drawString(50, y, "Отчёт по инвентаризации")
-        y -= 30
-
-        # Колонки
-        p.setFont("DejaVuSans", 10)
-        headers = [
-            "ID товара",
-            "Дата",
-            "Зона",
-            "Товар",
-            "Кол-во (факт)",
-            "Ожид.",
-            "Δ (+/-)",
-            "Мин.запас",
-            "Статус",
-            "Источник"
-        ]
-        p.drawString(50, y, " | ".join(headers))
-        y -= 20
-
-        for item in data:
-            scanned_at = item["scanned_at"].strftime("%Y-%m-%d %H:%M:%S") if item["scanned_at"] else ""
-            line = f"{item['product_id']} | {scanned_at} | {item['zone']} | {item['product_name']} | {item['quantity']} | {item.get('expected_quantity', '')} | {item.get('discrepancy', ''):+} | {item.get('min_stock', '')} | {item['status']} | {item['source']}"
-            p.drawString(50, y, line)
-            y -= 15
-
-            if y < 50:
-                p.showPage()
-                p.setFont("DejaVuSans", 10)
-                y = height - 50
-
-        p.save()
+        InventoryExportService.write_pdf(data, buffer)
         pdf = buffer.getvalue()
         buffer.close()
 
@@ -623,141 +434,88 @@ class InventoryExportPDFView(InventoryExportMixin, APIView):
         return response
 
 
+def request_flag(request, name, default):
+    """Флаг из тела или строки запроса: 1/true/yes - включён, 0/false/no - выключен, иначе default"""
+    value = request.data.get(name, request.query_params.get(name))
+    if value is None:
+        return default
+    value = str(value).lower()
+    if value in ('1', 'true', 'yes'):
+        return True
+    if value in ('0', 'false', 'no'):
+        return False
+    return default
+
+
+def is_atomic_import(request):
+    """Режим импорта «всё или ничего» (по умолчанию); atomic=0 в форме или строке запроса - построчный"""
+    return request_flag(request, 'atomic', default=True)
+
+
 class InventoryUploadView(APIView):
-    """Загрузка CSV-файла с данными инвентаризации, валидация, создание/обновление записей и предупреждения по расхождениям"""
+    """
+    Загрузка CSV-файла с данными инвентаризации, валидация, создание/обновление записей и предупреждения по расхождениям.
+
+    Файл разбирается потоком. По умолчанию импорт «всё или ничего»: при ошибке в любой строке
+    ничего не сохраняется. atomic=0 (в форме или в строке запроса) сохраняет корректные строки,
+    а строки с ошибками пропускает и возвращает в errors.
+    """
     def post(self, request):
         file = request.FILES.get('file')
         if not file:
             return Response({'error': 'Файл не предоставлен'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            decoded_file = file.read().decode('utf-8')
-        except UnicodeDecodeError:
-            return Response({'error': "Неверная кодировка, требуется UTF-8"}, status=status.HTTP_400_BAD_REQUEST)
-
-        reader = csv.DictReader(io.StringIO(decoded_file), delimiter=';')
+        atomic = is_atomic_import(request)
 
-        # Проверяем наличие обязательных колонок
-        required_columns = {"product_id", "product_name", "quantity", "zone", "date", "row", "shelf"}
-        if not required_columns.issubset(reader.fieldnames):
-            missing = required_columns - set(reader.fieldnames)
-            return Response({"error": f"Отсутствуют обязательные колонки: {', '.join(missing)}"},
-                            status=status.HTTP_400_BAD_REQUEST)
-
-        errors = []
-        warnings = []
-        validated_data = []
-
-        # Валидация всех строк
-        for row_num, row in enumerate(reader, start=2):
-            try:
-                product_id = row["product_id"].strip()
-                product_name = row["product_name"].strip()
-                quantity = int(row["quantity"])
-                zone = row["zone"].strip()
-                row_number = int(row["row"]) if row["row"] else None
-                shelf_number = int(row["shelf"]) if row["shelf"] else None
-
-                try:
-                    product = Product.objects.get(id=product_id)
-                    expected = product.optimal_stock
-                    discrepancy = quantity - expected
-                    threshold = max(expected * 0.1, 5)
-
-                    if abs(discrepancy) > threshold:
-                        warnings.append({
-                            "row": row_num,
-                            "product_id": product_id,
-                            "product_name": product_name,
-                            "message": f"Большое расхождение: ожидалось {expected}, фактически {quantity} (разница: {discrepancy:+d})"
-                        })
-
-                except Product.DoesNotExist:
-                    warnings.append({
-                        "row": row_num,
-                        "product_id": product_id,
-                        "message": f"Продукт '{product_name}' не найден в базе данных. Будет создан с дефолтными значениями."
-                    })
-
-                scanned_date = parse_date(row["date"])
-                if scanned_date:
-                    scanned_at = datetime.combine(scanned_date, datetime.min.time())
-                    scanned_at = timezone.make_aware(scanned_at)
-                else:
-                    scanned_at = timezone.now()
-
-                validated_data.append({
-                    "product_id": product_id,
-                    "product_name": product_name,
-                    "quantity": quantity,
-                    "zone": zone,
-                    "scanned_at": scanned_at,
-                    "row_number": row_number,
-                    "shelf_number": shelf_number
-                })
+        try:
+            result = CSVImportService.import_file(file, atomic=atomic)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-            except ValueError as e:
-                errors.append({
-                    "row": row_num,
-                    "data": row,
-                    "error": f"Ошибка преобразования данных: {str(e)}"
-                })
-                continue
-            except Exception as e:
-                errors.append({
-                    "row": row_num,
-                    "data": row,
-                    "error": str(e)
-                })
-                continue
-
-        if errors:
+        if result["total_errors"] and atomic:
             return Response({
                 "error": "Файл содержит ошибки и не может быть загружен",
-                "errors": errors[:10],
-                "total_errors": len(errors),
-                "message": f"Обнаружено ошибок: {len(errors)}. Исправьте файл и загрузите заново."
+                "errors": result["errors"],
+                "total_errors": result["total_errors"],
+                "message": f"Обнаружено ошибок: {result['total_errors']}. Исправьте файл и загрузите заново."
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        created_count = 0
-
-        for data in validated_data:
-            try:
-                # Создаем/получаем продукт, если его нет
-                product, created = Product.objects.get_or_create(
-                    id=data["product_id"],
-                    defaults={
-                        "name": data["product_name"],
-                        "category": "Без категории",
-                        "min_stock": 10,
-                        "optimal_stock": data["quantity"]
-                    }
-                )
-
-                InventoryCSVImport.objects.create(
-                    product_id=data["product_id"],
-                    product_name=data["product_name"],
-                    quantity=data["quantity"],
-                    zone=data["zone"],
-                    scanned_at=data["scanned_at"],
-                    row_number=data["row_number"],
-                    shelf_number=data["shelf_number"],
-                    status='OK'
-                )
-
-                created_count += 1
-
-            except Exception as e:
-                print(f"Unexpected error during save: {str(e)}")
-                continue
-
+        created_count = result["created_count"]
         response = {
             "message": f"Успешно загружено {created_count} записей",
             "created_count": created_count,
         }
 
-        if warnings:
-            response["warnings"] = warnings[:10]
-            response["total_warnings"] = len(warnings)
+        if result["total_errors"]:
+            response["errors"] = result["errors"]
+            response["total_errors"] = result["total_errors"]
+
+        if result["total_warnings"]:
+            response["warnings"] = result["warnings"]
+            response["total_warnings"] = result["total_warnings"]
 
         return Response(response, status=status.HTTP_200_OK)
+
+
+class ImportJobCreateView(APIView):
+    """
+    Фоновая загрузка CSV: файл сохраняется на диск и обрабатывается в пуле потоков.
+    Возвращает задание (202); прогресс - GET /import/jobs/<id>/ и события import_progress
+    в WebSocket дашборда. Параметры - как у синхронной загрузки (file, atomic).
+    """
+    def post(self, request):
+        file = request.FILES.get('file')
+        if not file:
+            return Response({'error': 'Файл не предоставлен'}, status=status.HTTP_400_BAD_REQUEST)
+
+        job = ImportJobService.submit(file, atomic=is_atomic_import(request), user=request.user)
+        return Response(ImportJobService.as_dict(job), status=status.HTTP_202_ACCEPTED)
+
+
+class ImportJobDetailView(APIView):
+    """Этап, прогресс и итог задания импорта CSV"""
+    def get(self, request, job_id):
+        job = ImportJob.objects.filter(id=job_id).first()
+        if not job:
+            return Response({"error": "Задание не найдено"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(ImportJobService.as_dict(job))
@@ -10,7 +10,9 @@ django.setup()
 from django.contrib.auth import get_user_model
 from products.models import Product
 from robots.models import Robot
+from inventory.services import ObservationService
 from warehouse.models import InventoryHistory
+from warehouse.services import CellStateService, ScanCounterService, ScanRollupService
 
 User = get_user_model()
 
@@ -158,6 +160,13 @@ def create_initial_data():
         scans_created += 1
 
     print(f"Создано сканирований: {scans_created}")
+
+    # Счётчики «за сегодня», состояние ячеек, агрегаты активности и наблюдения ведутся инкрементально,
+    # поэтому после прямой записи в историю пересчитываем их
+    ObservationService.rebuild()
+    ScanCounterService.rebuild()
+    CellStateService.rebuild()
+    ScanRollupService.rebuild()
     print(f"\nСтатистика:")
     print(f"   - Зоны с данными: ~{int(cells_to_fill / rows)} зон")
     print(f"   - Ячеек заполнено: ~{cells_to_fill + 50}")
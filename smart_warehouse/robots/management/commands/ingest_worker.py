@@ -0,0 +1,165 @@
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import InterfaceError, OperationalError, close_old_connections
+
+from dashboard.broadcast import get_broadcaster
+from robots.services import IngestQueue, ScanIngestService
+
+
+class Command(BaseCommand):
+    help = (
+        "Воркер асинхронного приёма данных роботов: читает отчёты из Redis Stream пачками, "
+        "пишет их в БД, рассылает события дашборда и публикует метрику отставания"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Максимум отчётов в одной пачке')
+        parser.add_argument('--block-ms', type=int, default=1000, help='Сколько ждать новых записей, мс')
+        parser.add_argument(
+            '--claim-idle-ms',
+            type=int,
+            default=60000,
+            help='Через сколько мс забирать неподтверждённые записи упавших воркеров'
+        )
+        parser.add_argument('--consumer', default=None, help='Имя потребителя в группе (по умолчанию host-pid)')
+
+    def handle(self, *args, **options):
+        consumer = options['consumer'] or f"{socket.gethostname()}-{os.getpid()}"
+        batch_size = options['batch_size']
+
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        IngestQueue.ensure_group()
+        self.consumer = consumer
+        self.processed_total = 0
+        self.stdout.write(f"ingest_worker {consumer}: поток {IngestQueue.stream_name()}, пачка {batch_size}")
+
+        # Сначала дочитываем то, что было выдано этому потребителю до перезапуска
+        pending = True
+        last_claim = 0.0
+
+        while self.running:
+            if pending:
+                entries = IngestQueue.read(consumer, batch_size, options['block_ms'], pending=True)
+                pending = bool(entries)
+            elif time.monotonic() - last_claim > options['claim_idle_ms'] / 1000:
+                entries = IngestQueue.claim_stale(consumer, options['claim_idle_ms'], batch_size)
+                last_claim = time.monotonic()
+                pending = bool(entries)
+            else:
+                entries = IngestQueue.read(consumer, batch_size, options['block_ms'])
+
+            if entries:
+                if not self.process(entries):
+                    pending = True
+            else:
+                self.publish_metrics(lag_seconds=0.0, batch_size=0, duration=0.0)
+
+        get_broadcaster().flush()
+        self.stdout.write(f"ingest_worker {consumer}: остановлен, обработано {self.processed_total}")
+
+    def stop(self, signum, frame):
+        self.running = False
+
+    def process(self, entries):
+        """
+        Записывает пачку одной транзакцией. Если пачка упала, она повторяется по одному отчёту,
+        чтобы одна ошибочная запись не блокировала остальные: успешные подтверждаются,
+        упавшие остаются в потоке до исчерпания попыток (dead_letter_exhausted).
+        Возвращает False, если в потоке остались неподтверждённые записи для повтора.
+        """
+        started = time.monotonic()
+        lag_seconds = max(IngestQueue.entry_age_seconds(entry_id) for entry_id, _ in entries)
+
+        parsed = []
+        for entry_id, raw in entries:
+            try:
+                parsed.append((entry_id, raw, ScanIngestService.parse_report(raw)))
+            except ValueError as e:
+                self.stderr.write(f"Отброшена запись {entry_id!r}: {e}")
+
+        close_old_connections()
+        failed = []
+        try:
+            if parsed:
+                # skip_existing делает повторную доставку после сбоя идемпотентной
+                ScanIngestService.ingest_reports([report for _, _, report in parsed], skip_existing=True)
+        except Exception as e:
+            if len(parsed) > 1:
+                self.stderr.write(f"Ошибка записи пачки из {len(parsed)} отчётов, повтор по одному: {e}")
+                failed = self.ingest_each(parsed)
+            else:
+                entry_id, raw, _ = parsed[0]
+                self.stderr.write(f"Ошибка записи отчёта {entry_id!r}: {e}")
+                failed = [(entry_id, raw, e)]
+
+        failed_ids = {entry_id for entry_id, _, _ in failed}
+        IngestQueue.ack([entry_id for entry_id, _ in entries if entry_id not in failed_ids])
+        self.processed_total += len(entries) - len(failed)
+
+        retry = self.dead_letter_exhausted(failed)
+        self.publish_metrics(lag_seconds, len(entries), time.monotonic() - started)
+        if retry:
+            # Записи остаются неподтверждёнными и будут прочитаны снова
+            time.sleep(1)
+            return False
+        return True
+
+    def ingest_each(self, parsed):
+        """Записывает отчёты по одному; возвращает упавшие [(entry_id, raw, error)]"""
+        failed = []
+        for entry_id, raw, report in parsed:
+            close_old_connections()
+            try:
+                ScanIngestService.ingest_reports([report], skip_existing=True)
+            except Exception as e:
+                self.stderr.write(f"Ошибка записи отчёта {entry_id!r}: {e}")
+                failed.append((entry_id, raw, e))
+        return failed
+
+    def dead_letter_exhausted(self, failed):
+        """
+        Переносит в поток недоставляемых записи, выданные ROBOT_INGEST_MAX_DELIVERIES раз и больше.
+        Ошибки соединения с БД не считаются ошибкой записи: такие отчёты повторяются без ограничения.
+        Возвращает записи, оставленные для повтора.
+        """
+        if not failed:
+            return []
+
+        counts = IngestQueue.delivery_counts([entry_id for entry_id, _, _ in failed])
+        exhausted, retry = [], []
+        for entry_id, raw, error in failed:
+            if (
+                not isinstance(error, (InterfaceError, OperationalError))
+                and counts.get(entry_id, 0) >= IngestQueue.max_deliveries()
+            ):
+                exhausted.append((entry_id, raw, error))
+            else:
+                retry.append((entry_id, raw, error))
+
+        if exhausted:
+            IngestQueue.dead_letter(exhausted)
+            self.stderr.write(
+                f"В {IngestQueue.dead_letter_name()} перенесено записей: {len(exhausted)} "
+                f"(не записаны за {IngestQueue.max_deliveries()} попыток)"
+            )
+        return retry
+
+    def publish_metrics(self, lag_seconds, batch_size, duration):
+        try:
+            IngestQueue.write_metrics({
+                'consumer': self.consumer,
+                'lag_seconds': round(lag_seconds, 3),
+                'last_batch_size': batch_size,
+                'last_batch_seconds': round(duration, 3),
+                'processed_total': self.processed_total,
+                'updated_at': time.time(),
+            })
+        except Exception as e:
+            self.stderr.write(f"Не удалось записать метрики: {e}")
@@ -0,0 +1,7 @@
+from .ingest_queue import IngestQueue
+from .scan_ingest import ScanIngestService
+
+__all__ = [
+    'IngestQueue',
+    'ScanIngestService',
+]
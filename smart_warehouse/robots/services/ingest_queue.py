@@ -0,0 +1,167 @@
+import json
+import time
+
+import redis
+from django.conf import settings
+
+
+class IngestQueue:
+    """
+    Очередь отчётов роботов на Redis Stream.
+
+    View только валидирует отчёт и добавляет его в поток (XADD),
+    запись в БД и рассылку на дашборд выполняет команда ingest_worker.
+    Обработанные записи удаляются из потока, поэтому его длина - это отставание воркера.
+    Записи, которые не удалось записать за ROBOT_INGEST_MAX_DELIVERIES попыток,
+    переносятся в поток недоставляемых (<stream>:dead) и подтверждаются.
+    """
+
+    GROUP = 'ingest-workers'
+    METRICS_KEY_SUFFIX = ':metrics'
+    DEAD_LETTER_SUFFIX = ':dead'
+
+    _client = None
+
+    @classmethod
+    def get_client(cls):
+        if cls._client is None:
+            cls._client = redis.Redis.from_url(settings.REDIS_URL)
+        return cls._client
+
+    @staticmethod
+    def is_enabled():
+        return getattr(settings, 'ROBOT_INGEST_MODE', 'sync') == 'stream'
+
+    @staticmethod
+    def stream_name():
+        return getattr(settings, 'ROBOT_INGEST_STREAM', 'robot_ingest')
+
+    @classmethod
+    def metrics_key(cls):
+        return cls.stream_name() + cls.METRICS_KEY_SUFFIX
+
+    @classmethod
+    def dead_letter_name(cls):
+        return cls.stream_name() + cls.DEAD_LETTER_SUFFIX
+
+    @staticmethod
+    def max_deliveries():
+        return getattr(settings, 'ROBOT_INGEST_MAX_DELIVERIES', 5)
+
+    @classmethod
+    def enqueue(cls, reports):
+        """Добавляет сырые (уже провалидированные) отчёты в поток одним round-trip"""
+        pipe = cls.get_client().pipeline(transaction=False)
+        for report in reports:
+            pipe.xadd(cls.stream_name(), {'report': json.dumps(report, ensure_ascii=False)})
+        return pipe.execute()
+
+    @classmethod
+    def ensure_group(cls):
+        try:
+            cls.get_client().xgroup_create(cls.stream_name(), cls.GROUP, id='0', mkstream=True)
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    @classmethod
+    def read(cls, consumer, count, block_ms, pending=False):
+        """
+        Читает пачку записей для consumer.
+        pending=True - перечитать свои неподтверждённые записи (после перезапуска воркера).
+        Возвращает список (entry_id, report_dict | None).
+        """
+        response = cls.get_client().xreadgroup(
+            cls.GROUP,
+            consumer,
+            {cls.stream_name(): '0' if pending else '>'},
+            count=count,
+            block=None if pending else block_ms,
+        )
+        return cls._decode(response[0][1] if response else [])
+
+    @classmethod
+    def claim_stale(cls, consumer, min_idle_ms, count):
+        """Забирает записи, зависшие у упавших воркеров"""
+        response = cls.get_client().xautoclaim(
+            cls.stream_name(), cls.GROUP, consumer, min_idle_ms, start_id='0-0', count=count
+        )
+        return cls._decode(response[1])
+
+    @classmethod
+    def ack(cls, entry_ids):
+        if not entry_ids:
+            return
+        pipe = cls.get_client().pipeline(transaction=False)
+        pipe.xack(cls.stream_name(), cls.GROUP, *entry_ids)
+        pipe.xdel(cls.stream_name(), *entry_ids)
+        pipe.execute()
+
+    @classmethod
+    def delivery_counts(cls, entry_ids):
+        """Сколько раз неподтверждённые записи выдавались потребителям (XPENDING): {entry_id: количество}"""
+        pipe = cls.get_client().pipeline(transaction=False)
+        for entry_id in entry_ids:
+            pipe.xpending_range(cls.stream_name(), cls.GROUP, min=entry_id, max=entry_id, count=1)
+        return {
+            entry_id: pending[0]['times_delivered'] if pending else 0
+            for entry_id, pending in zip(entry_ids, pipe.execute())
+        }
+
+    @classmethod
+    def dead_letter(cls, entries):
+        """
+        Переносит записи [(entry_id, report_dict, error)] в поток недоставляемых
+        и подтверждает их в основном потоке, чтобы они не блокировали приём.
+        """
+        if not entries:
+            return
+        pipe = cls.get_client().pipeline(transaction=True)
+        for entry_id, report, error in entries:
+            pipe.xadd(cls.dead_letter_name(), {
+                'entry_id': entry_id,
+                'report': json.dumps(report, ensure_ascii=False),
+                'error': str(error)[:1000],
+            })
+        entry_ids = [entry_id for entry_id, _, _ in entries]
+        pipe.xack(cls.stream_name(), cls.GROUP, *entry_ids)
+        pipe.xdel(cls.stream_name(), *entry_ids)
+        pipe.execute()
+
+    @classmethod
+    def write_metrics(cls, metrics):
+        cls.get_client().hset(cls.metrics_key(), mapping=metrics)
+
+    @classmethod
+    def get_metrics(cls):
+        client = cls.get_client()
+        pipe = client.pipeline(transaction=False)
+        pipe.xlen(cls.stream_name())
+        pipe.xlen(cls.dead_letter_name())
+        pipe.hgetall(cls.metrics_key())
+        length, dead_length, metrics = pipe.execute()
+
+        result = {key.decode(): value.decode() for key, value in metrics.items()}
+        result['queue_length'] = length
+        result['dead_letter_length'] = dead_length
+        return result
+
+    @staticmethod
+    def entry_age_seconds(entry_id, now=None):
+        """Возраст записи по её ID (миллисекунды Redis в первой части ID)"""
+        if isinstance(entry_id, bytes):
+            entry_id = entry_id.decode()
+        millis = int(entry_id.split('-')[0])
+        return max(0.0, (now or time.time()) - millis / 1000)
+
+    @staticmethod
+    def _decode(entries):
+        result = []
+        for entry_id, fields in entries:
+            raw = fields.get(b'report') if fields else None
+            try:
+                report = json.loads(raw) if raw else None
+            except ValueError:
+                report = None
+            result.append((entry_id, report))
+        return result
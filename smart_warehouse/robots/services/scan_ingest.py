@@ -0,0 +1,277 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import transaction
+
+
+class ScanIngestService:
+    """Сервис записи данных сканирования, присланных роботами"""
+
+    ROBOT_UPDATE_FIELDS = [
+        "battery_level",
+        "last_update",
+        "current_zone",
+        "current_row",
+        "current_shelf",
+        "is_active",
+        "status",
+    ]
+
+    @staticmethod
+    def is_integer(value):
+        # bool - подкласс int, но True/False не являются номером ряда или количеством
+        return isinstance(value, int) and not isinstance(value, bool)
+
+    @staticmethod
+    def is_number(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+    @staticmethod
+    def parse_report(data):
+        """
+        Валидирует отчёт робота и приводит его к внутреннему виду.
+        При ошибке выбрасывает ValueError с текстом для ответа API.
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Invalid data")
+
+        robot_id = data.get("robot_id")
+        location = data.get('location')
+        battery = data.get('battery_level')
+        scans = data.get('scan_results') or []
+        timestamp = data.get('timestamp')
+
+        if not robot_id or not isinstance(location, dict) or not timestamp:
+            raise ValueError("Invalid data")
+
+        if not ScanIngestService.is_number(battery) or not isinstance(scans, list):
+            raise ValueError("Invalid data")
+
+        # Колонки положения робота и истории NOT NULL: отчёт без них не должен доходить до записи
+        zone = location.get("zone")
+        if not isinstance(zone, str) or not zone.strip() or len(zone) > 10:
+            raise ValueError("Invalid location: zone")
+        for key in ("row", "shelf"):
+            if not ScanIngestService.is_integer(location.get(key)):
+                raise ValueError(f"Invalid location: {key}")
+
+        try:
+            last_update = datetime.fromisoformat(str(timestamp).replace("Z", "")).replace(tzinfo=dt_timezone.utc)
+        except ValueError:
+            raise ValueError("Invalid timestamp format")
+
+        return {
+            "robot_id": str(robot_id),
+            "location": {"zone": zone, "row": location["row"], "shelf": location["shelf"]},
+            "battery": battery,
+            "scans": [
+                scan for scan in scans
+                if isinstance(scan, dict) and scan.get("product_id")
+                and ScanIngestService.is_integer(scan.get("quantity"))
+            ],
+            "last_update": last_update,
+        }
+
+    @staticmethod
+    def ingest_reports(reports, skip_existing=False):
+        """
+        Сохраняет пачку отчётов (возможно, от разных роботов) за одну транзакцию.
+
+        Отчёты дедуплицируются по (robot_id, last_update) и применяются по времени.
+        Состояние каждого робота обновляется одним upsert по его самому свежему отчёту;
+        продукты резолвятся одним запросом, история вставляется одним bulk_create.
+        При skip_existing отбрасываются отчёты, уже записанные в историю ранее
+        (повторная отправка буфера после обрыва связи).
+
+        Возвращает (accepted_reports, duplicates_count).
+        """
+        from inventory.models import InventoryObservation
+        from inventory.services import ObservationService
+        from robots.models import Robot
+        from warehouse.models import DailyScanCounter, InventoryHistory
+        from warehouse.services import CellStateService, ScanCounterService, ScanRollupService
+
+        unique = {}
+        for report in reports:
+            unique.setdefault((report["robot_id"], report["last_update"]), report)
+        duplicates = len(reports) - len(unique)
+
+        if skip_existing and unique:
+            existing = set(
+                InventoryHistory.objects.filter(
+                    robot_id__in={robot_id for robot_id, _ in unique},
+                    scanned_at__in={last_update for _, last_update in unique},
+                ).values_list("robot_id", "scanned_at").distinct()
+            )
+            for key in existing & unique.keys():
+                del unique[key]
+                duplicates += 1
+
+        accepted = sorted(unique.values(), key=lambda r: r["last_update"])
+        if not accepted:
+            return [], duplicates
+
+        latest = {}
+        for report in accepted:
+            latest[report["robot_id"]] = report
+
+        with transaction.atomic():
+            # Устаревшие отчёты из буфера не должны откатывать состояние робота назад
+            current = Robot.objects.in_bulk(list(latest))
+            robots = [
+                Robot(
+                    id=robot_id,
+                    battery_level=report["battery"],
+                    last_update=report["last_update"],
+                    current_zone=report["location"].get("zone"),
+                    current_row=report["location"].get("row"),
+                    current_shelf=report["location"].get("shelf"),
+                    is_active=True,
+                    status="active" if report["battery"] > 20 else "low_battery",
+                )
+                for robot_id, report in latest.items()
+                if robot_id not in current or current[robot_id].last_update is None
+                or current[robot_id].last_update <= report["last_update"]
+            ]
+            if robots:
+                Robot.objects.bulk_create(
+                    robots,
+                    update_conflicts=True,
+                    unique_fields=["id"],
+                    update_fields=ScanIngestService.ROBOT_UPDATE_FIELDS,
+                )
+
+            products = ScanIngestService.resolve_products(
+                [scan for report in accepted for scan in report["scans"]]
+            )
+
+            history = InventoryHistory.objects.bulk_create([
+                InventoryHistory(
+                    robot_id=report["robot_id"],
+                    product_id=str(scan["product_id"]),
+                    quantity=scan["quantity"],
+                    zone=report["location"].get("zone"),
+                    row_number=report["location"].get("row"),
+                    shelf_number=report["location"].get("shelf"),
+                    status=scan.get("status"),
+                    scanned_at=report["last_update"]
+                )
+                for report in accepted
+                for scan in report["scans"]
+            ])
+
+            ObservationService.record(InventoryObservation.SOURCE_HISTORY, [item.id for item in history])
+
+            CellStateService.record(
+                {
+                    "zone": item.zone,
+                    "row_number": item.row_number,
+                    "robot_id": item.robot_id,
+                    "product_id": item.product_id,
+                    "quantity": item.quantity,
+                    "status": item.status,
+                    "scanned_at": item.scanned_at,
+                }
+                for item in history
+            )
+
+            ScanCounterService.increment(
+                DailyScanCounter.SOURCE_ROBOT,
+                ScanCounterService.count_by_day(
+                    (report["last_update"], scan.get("status"))
+                    for report in accepted
+                    for scan in report["scans"]
+                )
+            )
+
+            ScanRollupService.increment(
+                (item.scanned_at, item.robot_id, item.zone, item.status) for item in history
+            )
+
+            statistics = ScanCounterService.get_day_statistics()
+
+        ScanIngestService.broadcast(robots, accepted, products, statistics)
+        return accepted, duplicates
+
+    @staticmethod
+    def resolve_products(scans):
+        """
+        Возвращает словарь {product_id: Product} для всех товаров из сканов.
+        Отсутствующие товары создаются одним bulk_create.
+        """
+        from products.models import Product
+
+        names = {}
+        for scan in scans:
+            names.setdefault(str(scan["product_id"]), scan.get("product_name", ""))
+
+        if not names:
+            return {}
+
+        products = Product.objects.in_bulk(list(names))
+        missing = [pid for pid in names if pid not in products]
+
+        if missing:
+            Product.objects.bulk_create(
+                [Product(id=pid, name=names[pid]) for pid in missing],
+                ignore_conflicts=True
+            )
+            # Перечитываем: часть товаров могла быть создана параллельным запросом
+            products.update(Product.objects.in_bulk(missing))
+
+        return products
+
+    @staticmethod
+    def broadcast(robots, reports, products, statistics):
+        """Передаёт обновления роботов и сканов агрегатору событий дашборда"""
+        from dashboard.broadcast import get_broadcaster
+
+        broadcaster = get_broadcaster()
+
+        for robot in robots:
+            broadcaster.robot_update({
+                'id': robot.id,
+                'battery': robot.battery_level,
+                'zone': robot.current_zone,
+                'row': robot.current_row,
+                'shelf': robot.current_shelf,
+                'status': ScanIngestService.get_robot_status(robot),
+                'last_update': robot.last_update.isoformat()
+            })
+
+        for report in reports:
+            location = report["location"]
+            last_update = report["last_update"].isoformat()
+
+            for scan in report["scans"]:
+                product_id = scan["product_id"]
+                product = products.get(str(product_id))
+                product_name = product.name if product else scan.get("product_name", "")
+
+                broadcaster.new_scan({
+                    'time': last_update,
+                    'robot_id': report["robot_id"],
+                    'zone': location.get("zone"),
+                    'row': location.get("row"),
+                    'product': product_name,
+                    'product_id': product_id,
+                    'quantity': scan["quantity"],
+                    'status': scan.get("status"),
+                    'statistics': statistics,
+                })
+
+                if scan.get("status") == "CRITICAL":
+                    broadcaster.inventory_alert({
+                        'product_id': product_id,
+                        'product_name': product_name,
+                        'quantity': scan["quantity"],
+                        'zone': location.get("zone"),
+                        'timestamp': last_update
+                    })
+
+    @staticmethod
+    def get_robot_status(robot):
+        if robot.battery_level <= 20:
+            return "low_battery"
+        if not robot.is_active:
+            return "offline"
+        return "active"
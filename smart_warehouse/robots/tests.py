@@ -1,3 +1,50 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from robots.services import ScanIngestService
+
+
+class ParseReportTests(SimpleTestCase):
+    def report(self, **overrides):
+        data = {
+            "robot_id": "RB-001",
+            "timestamp": "2025-01-15T10:00:00Z",
+            "location": {"zone": "A", "row": 3, "shelf": 2},
+            "battery_level": 87.5,
+            "scan_results": [{"product_id": "TEL-4567", "quantity": 12, "status": "OK"}],
+        }
+        data.update(overrides)
+        return data
+
+    def test_valid_report(self):
+        report = ScanIngestService.parse_report(self.report())
+
+        self.assertEqual(report["robot_id"], "RB-001")
+        self.assertEqual(report["location"], {"zone": "A", "row": 3, "shelf": 2})
+        self.assertEqual(len(report["scans"]), 1)
+
+    def test_invalid_location(self):
+        for location in (
+            {},
+            {"zone": "", "row": 1, "shelf": 1},
+            {"zone": 5, "row": 1, "shelf": 1},
+            {"zone": "A", "row": "1", "shelf": 1},
+            {"zone": "A", "row": 1, "shelf": None},
+            {"zone": "A", "row": True, "shelf": 1},
+        ):
+            with self.subTest(location=location), self.assertRaises(ValueError):
+                ScanIngestService.parse_report(self.report(location=location))
+
+    def test_invalid_battery(self):
+        for battery in (True, "87", None):
+            with self.subTest(battery=battery), self.assertRaises(ValueError):
+                ScanIngestService.parse_report(self.report(battery_level=battery))
+
+    def test_skips_scans_without_integer_quantity(self):
+        report = ScanIngestService.parse_report(self.report(scan_results=[
+            {"product_id": "TEL-4567", "quantity": 12},
+            {"product_id": "TEL-4568", "quantity": "12"},
+            {"product_id": "TEL-4569", "quantity": None},
+            {"quantity": 3},
+        ]))
+
+        self.assertEqual([scan["product_id"] for scan in report["scans"]], ["TEL-4567"])
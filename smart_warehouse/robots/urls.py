@@ -1,8 +1,10 @@
 from django.contrib import admin
 from django.urls import path, include
-from .views import RobotScanView
+from .views import RobotScanView, RobotScanBatchView, IngestStatusView
 
 urlpatterns = [
     path('data/', RobotScanView.as_view()),
+    path('data/batch/', RobotScanBatchView.as_view()),
+    path('ingest/status/', IngestStatusView.as_view()),
     # path('token/', RobotTokenView.as_view(), name='robot_token')
 ]
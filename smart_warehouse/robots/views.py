@@ -1,17 +1,15 @@
-from datetime import datetime, timezone as dt_timezone, time
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.parsers import JSONParser
 from rest_framework_simplejwt.tokens import RefreshToken
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 
 from .models import Robot
-from warehouse.models import InventoryHistory
-from products.models import Product
+from .parsers import NDJSONParser
+from .services import IngestQueue, ScanIngestService
 
 
 class RobotTokenView(APIView):
@@ -40,134 +38,100 @@ class RobotScanView(APIView):
     authentication_classes = []
 
     def post(self, request):
-        data = request.data
+        try:
+            report = ScanIngestService.parse_report(request.data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        robot_id = data.get("robot_id")
-        location = data.get('location')
-        battery = data.get('battery_level')
-        scans = data.get('scan_results', [])
-        timestamp = data.get('timestamp')
+        if IngestQueue.is_enabled():
+            IngestQueue.enqueue([request.data])
+            return Response({"status": "queued"}, status=status.HTTP_202_ACCEPTED)
 
-        if not robot_id or not location or not timestamp:
-            return Response({"error": "Invalid data"}, status=status.HTTP_400_BAD_REQUEST)
+        ScanIngestService.ingest_reports([report])
 
-        try:
-            last_update = datetime.fromisoformat(timestamp.replace("Z", "")).replace(tzinfo=dt_timezone.utc)
-        except ValueError:
-            return Response({"error": "Invalid timestamp format"}, status=status.HTTP_400_BAD_REQUEST)
-
-        robot, created = Robot.objects.update_or_create(
-            id=robot_id,
-            defaults={
-                "battery_level": battery,
-                "last_update": last_update,
-                "current_zone": location.get("zone"),
-                "current_row": location.get("row"),
-                "current_shelf": location.get("shelf"),
-                "is_active": True,
-                "status": "active" if battery > 20 else "low_battery",
-            }
-        )
-
-        channel_layer = get_channel_layer()
-        if channel_layer:
-            async_to_sync(channel_layer.group_send)(
-                'dashboard_updates',
-                {
-                    'type': 'robot_update',
-                    'data': {
-                        'id': robot.id,
-                        'battery': robot.battery_level,
-                        'zone': robot.current_zone,
-                        'row': robot.current_row,
-                        'shelf': robot.current_shelf,
-                        'status': self.get_robot_status(robot),
-                        'last_update': last_update.isoformat()
-                    }
-                }
-            )
+        return Response({"status": "received"}, status=status.HTTP_200_OK)
 
-        # Получаем актуальную статистику один раз перед циклом
-        today_start = timezone.make_aware(
-            datetime.combine(timezone.now().date(), time.min)
-        )
-        today_scans = InventoryHistory.objects.filter(scanned_at__gte=today_start)
+    @staticmethod
+    def get_robot_status(robot):
+        return ScanIngestService.get_robot_status(robot)
 
-        for scan in scans:
-            product_id = scan.get("product_id")
-            quantity = scan.get("quantity")
-            status_text = scan.get("status")
-            product_name = scan.get("product_name", "")
 
-            if not product_id or quantity is None:
-                continue
+class RobotScanBatchView(APIView):
+    """
+    Пакетный приём отчётов роботов (JSON-массив или NDJSON).
+    Используется для досылки буфера, накопленного роботами без связи.
+    """
+    permission_classes = []
+    authentication_classes = []
+    parser_classes = [JSONParser, NDJSONParser]
 
-            product, _ = Product.objects.get_or_create(
-                id=product_id,
-                defaults={"name": product_name}
-            )
+    def post(self, request):
+        data = request.data
+        if isinstance(data, dict):
+            data = data.get("reports")
+
+        if not isinstance(data, list):
+            return Response({"error": "Expected a list of reports"}, status=status.HTTP_400_BAD_REQUEST)
 
-            inventory = InventoryHistory.objects.create(
-                robot_id=robot.id,
-                product_id=product.id,
-                quantity=quantity,
-                zone=robot.current_zone,
-                row_number=robot.current_row,
-                shelf_number=robot.current_shelf,
-                status=status_text,
-                scanned_at=last_update
+        max_reports = getattr(settings, 'ROBOT_BATCH_MAX_REPORTS', 5000)
+        if len(data) > max_reports:
+            return Response(
+                {"error": f"Too many reports in one batch (max {max_reports})"},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
             )
 
-            # Пересчитываем статистику после создания записи
-            today_scans_count = today_scans.count() + 1  # +1 за только что созданную запись
-            critical_count = today_scans.filter(status="CRITICAL").count()
-            if status_text == "CRITICAL":
-                critical_count += 1  # +1 если текущая запись критическая
-
-            if channel_layer:
-                async_to_sync(channel_layer.group_send)(
-                    'dashboard_updates',
-                    {
-                        'type': 'new_scan',
-                        'data': {
-                            'time': last_update.isoformat(),
-                            'robot_id': robot.id,
-                            'zone': robot.current_zone,
-                            'row': robot.current_row,
-                            'product': product.name,
-                            'product_id': product_id,
-                            'quantity': quantity,
-                            'status': status_text,
-                            # ✅ ДОБАВЛЯЕМ: Актуальную статистику
-                            'statistics': {
-                                'checked_today': today_scans_count,
-                                'critical_stock': critical_count,
-                            }
-                        }
-                    }
-                )
-
-            if status_text == "CRITICAL" and channel_layer:
-                async_to_sync(channel_layer.group_send)(
-                    'dashboard_updates',
-                    {
-                        'type': 'inventory_alert',
-                        'data': {
-                            'product_id': product_id,
-                            'product_name': product.name,
-                            'quantity': quantity,
-                            'zone': robot.current_zone,
-                            'timestamp': last_update.isoformat()
-                        }
-                    }
-                )
+        reports = []
+        raw_reports = []
+        errors = []
+        for index, item in enumerate(data):
+            try:
+                reports.append(ScanIngestService.parse_report(item))
+                raw_reports.append(item)
+            except ValueError as e:
+                errors.append({"index": index, "error": str(e)})
+
+        if not reports:
+            return Response({
+                "error": "Invalid data",
+                "errors": errors[:10],
+                "total_errors": len(errors),
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if IngestQueue.is_enabled():
+            IngestQueue.enqueue(raw_reports)
+            response = {
+                "status": "queued",
+                "received": len(data),
+                "queued": len(raw_reports),
+            }
+            if errors:
+                response["errors"] = errors[:10]
+                response["total_errors"] = len(errors)
+            return Response(response, status=status.HTTP_202_ACCEPTED)
 
-        return Response({"status": "received"}, status=status.HTTP_200_OK)
+        accepted, duplicates = ScanIngestService.ingest_reports(reports, skip_existing=True)
 
-    @staticmethod
-    def get_robot_status(robot):
-        if robot.battery_level <= 20:
-            return "low_battery"
-        if not robot.is_active:
-            return "offline"
-        return "active"
\ No newline at end of file
+        response = {
+            "status": "received",
+            "received": len(data),
+            "accepted": len(accepted),
+            "duplicates": duplicates,
+            "robots": len({report["robot_id"] for report in accepted}),
+        }
+        if errors:
+            response["errors"] = errors[:10]
+            response["total_errors"] = len(errors)
+
+        return Response(response, status=status.HTTP_200_OK)
+
+
+class IngestStatusView(APIView):
+    """Состояние асинхронного приёма: длина очереди и отставание воркера"""
+
+    def get(self, request):
+        if not IngestQueue.is_enabled():
+            return Response({"mode": "sync"})
+
+        metrics = IngestQueue.get_metrics()
+        metrics["mode"] = "stream"
+        return Response(metrics)
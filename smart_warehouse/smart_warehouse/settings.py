@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from datetime import timedelta
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -90,17 +91,21 @@ TEMPLATES = [
 WSGI_APPLICATION = 'smart_warehouse.wsgi.application'
 
 PREDICTION_PROVIDER = 'mock'
+
+# Максимальное число отчётов в одном запросе /api/robots/data/batch/
+ROBOT_BATCH_MAX_REPORTS = 5000
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'smartwarehouse',
-        'USER': 'postgres',
-        'PASSWORD': 'admin',
-        'HOST': 'db',
-        'PORT': '5432',
+        'NAME': os.getenv('DB_NAME', 'smartwarehouse'),
+        'USER': os.getenv('DB_USER', 'postgres'),
+        'PASSWORD': os.getenv('DB_PASSWORD', 'admin'),
+        'HOST': os.getenv('DB_HOST', 'db'),
+        'PORT': os.getenv('DB_PORT', '5432'),
     }
 }
 
@@ -229,3 +234,67 @@ CHANNEL_LAYERS = {
 
     },
 }
+
+# Период (сек) буферизации robot_update/new_scan перед отправкой в dashboard_updates; 0 - без буферизации
+DASHBOARD_BROADCAST_TICK = 0.25
+# Сколько последних сканов попадает в одно сообщение dashboard_batch
+DASHBOARD_BROADCAST_MAX_SCANS = 50
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379/0')
+
+# Режим приёма данных роботов: 'sync' - запись в БД в запросе,
+# 'stream' - отчёт кладётся в Redis Stream (ответ 202), запись делает manage.py ingest_worker
+ROBOT_INGEST_MODE = os.getenv('ROBOT_INGEST_MODE', 'sync')
+ROBOT_INGEST_STREAM = 'robot_ingest'
+# Сколько раз ingest_worker пытается записать отчёт, прежде чем перенести его в поток robot_ingest:dead
+ROBOT_INGEST_MAX_DELIVERIES = 5
+
+# Помесячные партиции inventory_history и наблюдений роботов (manage.py manage_history_partitions):
+# сколько месяцев создавать заранее и сколько полных месяцев хранить
+HISTORY_PARTITION_AHEAD_MONTHS = 3
+HISTORY_RETENTION_MONTHS = 12
+
+# Сетка склада для карты зон: буквы зон и количество рядов в каждой зоне
+WAREHOUSE_ZONES = os.getenv('WAREHOUSE_ZONES', 'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+WAREHOUSE_ROWS = int(os.getenv('WAREHOUSE_ROWS', 50))
+# Откуда карта склада берёт последний скан ячейки: 'cells' (таблица cell_states),
+# 'distinct_on' или 'window' (запрос к inventory_history)
+ZONE_STATUS_STRATEGY = os.getenv('ZONE_STATUS_STRATEGY', 'cells')
+
+# Ограничения гистограммы активности роботов (?window=24h&bucket=15m)
+ROBOT_ACTIVITY_MAX_WINDOW_DAYS = 30
+ROBOT_ACTIVITY_MAX_BUCKETS = 1440
+# Окна длиннее этого считаются по агрегатам scan_rollups, а не по inventory_history
+ROBOT_ACTIVITY_RAW_MAX_HOURS = 6
+# Сколько часов хранить минутные агрегаты (manage.py compact_scan_rollups)
+SCAN_ROLLUP_MINUTE_RETENTION_HOURS = 48
+
+# /api/inventory/trend/?mode=auto: выше этой оценки количества строк тренд агрегируется по интервалам в SQL
+TREND_RAW_MAX_POINTS = 200000
+TREND_MAX_BUCKETS = 5000
+
+# Экспорт инвентаризации: сколько строк читать из БД за одну порцию серверного курсора
+EXPORT_CHUNK_SIZE = 2000
+
+# Каталог файлов фоновых заданий - вне каталога проекта, чтобы выгрузки и загрузки не попадали в репозиторий
+JOB_FILES_DIR = os.getenv('JOB_FILES_DIR', os.path.join(tempfile.gettempdir(), 'smart_warehouse'))
+
+# Процесс обновляет heartbeat своих фоновых заданий с этим периодом; незавершённое задание
+# без heartbeat дольше BACKGROUND_JOB_STALE_SECONDS считается прерванным
+BACKGROUND_JOB_HEARTBEAT_SECONDS = 30
+BACKGROUND_JOB_STALE_SECONDS = 120
+
+# Фоновые задания экспорта (/api/inventory/export/jobs/)
+EXPORT_JOB_DIR = os.getenv('EXPORT_JOB_DIR', os.path.join(JOB_FILES_DIR, 'exports'))
+# Сколько выгрузок выполняется одновременно в процессе
+EXPORT_JOB_WORKERS = 2
+# Повторный запрос с теми же параметрами в течение этого времени получает существующее задание
+EXPORT_JOB_DEDUPE_MINUTES = 60
+# Сколько часов хранить готовые файлы (manage.py cleanup_export_jobs)
+EXPORT_JOB_TTL_HOURS = 24
+
+# Импорт CSV (/api/inventory/upload/): размер порции проверки и bulk_create
+CSV_IMPORT_BATCH_SIZE = 2000
+# Фоновый импорт CSV (/api/inventory/import/jobs/): каталог загруженных файлов и число одновременных импортов
+IMPORT_JOB_DIR = os.getenv('IMPORT_JOB_DIR', os.path.join(JOB_FILES_DIR, 'imports'))
+IMPORT_JOB_WORKERS = 1
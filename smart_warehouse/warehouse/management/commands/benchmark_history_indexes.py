@@ -0,0 +1,145 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from inventory.models import InventoryCSVImport
+from warehouse.models import InventoryHistory
+from warehouse.services import SyntheticDataService
+
+
+class Rollback(Exception):
+    """Откат транзакции, в которой индексы были временно удалены"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает планы запросов дашборда к inventory_history и импорту CSV "
+        "без индексов и с индексами (EXPLAIN ANALYZE). Только PostgreSQL; "
+        "удаление индексов выполняется в транзакции и откатывается, но на время замера "
+        "блокирует таблицы - запускать на копии БД."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Сначала добавить N синтетических сканирований в inventory_history (например 10000000)'
+        )
+        parser.add_argument(
+            '--seed-csv',
+            type=int,
+            default=0,
+            help='Сначала добавить N синтетических строк импорта CSV'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Бенчмарк индексов работает только на PostgreSQL')
+
+        if options['seed']:
+            self.stdout.write(f"Генерация {options['seed']} сканирований...")
+            try:
+                SyntheticDataService.seed_history(options['seed'])
+            except ValueError as e:
+                raise CommandError(str(e))
+        if options['seed_csv']:
+            self.stdout.write(f"Генерация {options['seed_csv']} строк импорта CSV...")
+            SyntheticDataService.seed_csv(options['seed_csv'])
+
+        queries = self.get_queries()
+        index_names = [
+            index.name
+            for model in (InventoryHistory, InventoryCSVImport)
+            for index in model._meta.indexes
+        ]
+
+        with_indexes = {name: self.explain(qs) for name, qs in queries}
+
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for index_name in index_names:
+                        cursor.execute(f'DROP INDEX IF EXISTS "{index_name}"')
+                without_indexes = {name: self.explain(qs) for name, qs in queries}
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(
+            f"inventory_history: {InventoryHistory.objects.count()} строк, "
+            f"импорт CSV: {InventoryCSVImport.objects.count()} строк"
+        )
+        for name, _ in queries:
+            before, after = without_indexes[name], with_indexes[name]
+            self.stdout.write(f"\n{name}")
+            self.stdout.write(f"  без индексов: {before['scans']} - {before['time']:.1f} мс")
+            self.stdout.write(self.style.SUCCESS(f"  с индексами:  {after['scans']} - {after['time']:.1f} мс"))
+
+    def get_queries(self):
+        now = timezone.now()
+        hour_ago = now - timedelta(hours=1)
+        midnight = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+        week_ago = now - timedelta(days=7)
+
+        product_id = InventoryHistory.objects.values_list('product_id', flat=True).first()
+        csv_product_id = InventoryCSVImport.objects.values_list('product_id', flat=True).first()
+
+        return [
+            (
+                'Активность роботов за час',
+                InventoryHistory.objects.filter(scanned_at__gte=hour_ago).values('scanned_at'),
+            ),
+            (
+                'Последние 20 сканирований',
+                InventoryHistory.objects.order_by('-scanned_at')[:20],
+            ),
+            (
+                'Критические остатки с полуночи',
+                InventoryHistory.objects.filter(status='CRITICAL', scanned_at__gte=midnight).values('product_id'),
+            ),
+            (
+                'Последнее сканирование ячейки A1',
+                InventoryHistory.objects.filter(zone='A', row_number=1).order_by('-scanned_at')[:1],
+            ),
+            (
+                'Тренд товара за неделю',
+                InventoryHistory.objects.filter(
+                    product_id=product_id, scanned_at__gte=week_ago
+                ).order_by('-scanned_at').values('scanned_at', 'quantity'),
+            ),
+            (
+                'Импорт CSV за сутки',
+                InventoryCSVImport.objects.filter(scanned_at__gte=now - timedelta(days=1)).order_by('-scanned_at'),
+            ),
+            (
+                'Последний импорт ячейки A1',
+                InventoryCSVImport.objects.filter(zone='A', row_number=1).order_by('-scanned_at')[:1],
+            ),
+            (
+                'Тренд товара по импорту CSV',
+                InventoryCSVImport.objects.filter(
+                    product_id=csv_product_id
+                ).order_by('-scanned_at').values('scanned_at', 'quantity'),
+            ),
+        ]
+
+    def explain(self, queryset):
+        plan = json.loads(queryset.explain(format='json', analyze=True))[0]
+        return {
+            'scans': ', '.join(self.collect_scans(plan['Plan'])) or '-',
+            'time': plan['Execution Time'],
+        }
+
+    def collect_scans(self, node):
+        """Типы сканирования таблиц в плане: Seq Scan / Index Scan <индекс> и т.п."""
+        scans = []
+        if node['Node Type'].endswith('Scan'):
+            target = node.get('Index Name') or node.get('Relation Name', '')
+            scans.append(f"{node['Node Type']} {target}".strip())
+        for child in node.get('Plans', []):
+            scans.extend(self.collect_scans(child))
+        return scans
@@ -0,0 +1,117 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from rest_framework.renderers import JSONRenderer
+
+from warehouse.models import InventoryHistory
+from warehouse.services import CellStateService, SyntheticDataService, ZoneStatusService
+
+
+def legacy_zone_status():
+    """
+    Исходная реализация ZoneStatusAPIView: все сканирования зон в Python с выбором последнего.
+    Оставлена как эталон ответа; iterator() - чтобы замер на больших объёмах не упирался в память.
+    """
+    zones, rows_count = ZoneStatusService.get_grid()
+    zone_status = {}
+
+    all_scans = InventoryHistory.objects.select_related('product').filter(
+        zone__in=zones,
+        row_number__isnull=False
+    ).order_by('zone', 'row_number', '-scanned_at')
+
+    latest_scans = {}
+    for scan in all_scans.iterator(chunk_size=10000):
+        key = (scan.zone, scan.row_number)
+        if key not in latest_scans:
+            latest_scans[key] = scan
+
+    for zone in zones:
+        for row in range(1, rows_count + 1):
+            cell_key = f"{zone}{row}"
+            scan = latest_scans.get((zone, row))
+
+            if scan:
+                zone_status[cell_key] = {
+                    'time': scan.scanned_at.isoformat() if scan.scanned_at else None,
+                    'status': scan.status,
+                    'quantity': scan.quantity,
+                    'product': scan.product.name if scan.product else None,
+                    'product_id': str(scan.product.id) if scan.product else None,
+                    'robot_id': str(scan.robot_id),
+                    'zone': zone,
+                    'row': row,
+                }
+            else:
+                zone_status[cell_key] = None
+
+    return zone_status
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает стратегии карты склада (исходная выборка в Python, DISTINCT ON, ROW_NUMBER(), "
+        "таблица cell_states) на нескольких объёмах истории и проверяет, что ответы побайтно совпадают. "
+        "Недостающие строки истории генерируются синтетически - запускать на копии БД (PostgreSQL)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1_000_000, 10_000_000, 50_000_000],
+            help='Объёмы inventory_history для замеров (таблица дополняется до каждого объёма)'
+        )
+        parser.add_argument('--repeat', type=int, default=3, help='Сколько раз выполнять каждую стратегию')
+        parser.add_argument(
+            '--legacy-max-rows',
+            type=int,
+            default=10_000_000,
+            help='Не запускать исходную реализацию на истории больше этого объёма'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Бенчмарк карты склада работает только на PostgreSQL (DISTINCT ON)')
+
+        for size in sorted(options['sizes']):
+            current = InventoryHistory.objects.count()
+            if current < size:
+                self.stdout.write(f"Генерация {size - current} сканирований...")
+                try:
+                    SyntheticDataService.seed_history(size - current)
+                except ValueError as e:
+                    raise CommandError(str(e))
+                CellStateService.rebuild()
+
+            strategies = [(name, lambda name=name: ZoneStatusService.get_zone_status(name))
+                          for name in ZoneStatusService.STRATEGIES]
+            if max(current, size) <= options['legacy_max_rows']:
+                strategies.insert(0, ('legacy', legacy_zone_status))
+
+            self.stdout.write(f"\ninventory_history: {max(current, size)} строк")
+            reference = None
+            for name, run in strategies:
+                timings, body = self.measure(run, options['repeat'])
+                if reference is None:
+                    reference = body
+                identical = body == reference
+                line = (
+                    f"  {name:<12} медиана {statistics.median(timings):8.1f} мс, "
+                    f"мин {min(timings):8.1f} мс, ответ {len(body)} байт, "
+                    f"{'совпадает' if identical else 'ОТЛИЧАЕТСЯ'}"
+                )
+                self.stdout.write(self.style.SUCCESS(line) if identical else self.style.ERROR(line))
+
+    def measure(self, run, repeat):
+        timings = []
+        body = None
+        for _ in range(max(repeat, 1)):
+            reset_queries()
+            started = time.perf_counter()
+            body = JSONRenderer().render(run())
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings, body
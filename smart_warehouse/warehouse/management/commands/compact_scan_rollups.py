@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from warehouse.services import ScanRollupService
+
+
+class Command(BaseCommand):
+    help = (
+        "Обслуживание агрегатов активности (scan_rollups): удаляет минутные агрегаты старше срока хранения "
+        "и при необходимости пересчитывает агрегаты по inventory_history. Запускать по расписанию."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild-hours',
+            type=int,
+            default=None,
+            help='Пересчитать агрегаты за последние N часов по истории (0 - за всю историю)'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild_hours'] is not None:
+            since = None
+            if options['rebuild_hours'] > 0:
+                since = timezone.now() - timedelta(hours=options['rebuild_hours'])
+            rows = ScanRollupService.rebuild(since=since)
+            scope = f"за последние {options['rebuild_hours']} ч" if since else "за всю историю"
+            self.stdout.write(f"Агрегаты пересчитаны {scope}: {rows} строк")
+
+        deleted = ScanRollupService.prune_minutes()
+        self.stdout.write(self.style.SUCCESS(f"Удалено минутных агрегатов: {deleted}"))
@@ -0,0 +1,94 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from warehouse.services import HistoryLoadService
+
+
+class Command(BaseCommand):
+    help = (
+        "Массовая загрузка исторических сканирований через COPY (только PostgreSQL): "
+        "CSV или NDJSON (можно .gz) -> staging -> inventory_history или импорты CSV. "
+        "Недостающие товары создаются автоматически, роботы должны существовать."
+    )
+
+    PHASES = {
+        'copy': 'COPY в staging',
+        'prepare': 'Товары и партиции',
+        'merge': 'Перенос в таблицу',
+        'indexes': 'Построение индексов',
+        'observations': 'Копирование в наблюдения',
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help='Файлы .csv, .ndjson или .jsonl (можно .gz)')
+        parser.add_argument(
+            '--target',
+            choices=[HistoryLoadService.TARGET_HISTORY, HistoryLoadService.TARGET_CSV],
+            default=HistoryLoadService.TARGET_HISTORY,
+            help='Куда загружать: history - inventory_history (сканирования роботов), csv - импорты CSV'
+        )
+        parser.add_argument('--delimiter', default=';', help='Разделитель CSV (по умолчанию ";")')
+        parser.add_argument(
+            '--defer-indexes',
+            action='store_true',
+            help='Удалить индексы таблицы на время переноса и построить заново (таблица заблокирована до конца)'
+        )
+        parser.add_argument(
+            '--skip-derived',
+            action='store_true',
+            help='Не пересчитывать счётчики, агрегаты и состояния ячеек (например, перед загрузкой следующих файлов)'
+        )
+
+    def report(self, phase, rows, seconds):
+        line = f"  {self.PHASES.get(phase, phase)}: {seconds:.1f} с"
+        if rows is not None:
+            line += f", {rows} строк ({rows / seconds if seconds else rows:.0f} строк/с)"
+        self.stdout.write(line)
+
+    def handle(self, *args, **options):
+        total_rows = 0
+        first = None
+        started = time.monotonic()
+
+        for path in options['files']:
+            self.stdout.write(f"Загрузка {path}")
+            file_started = time.monotonic()
+            try:
+                result = HistoryLoadService.load(
+                    path,
+                    target=options['target'],
+                    delimiter=options['delimiter'],
+                    defer_indexes=options['defer_indexes'],
+                    report=self.report,
+                )
+            except (ValueError, OSError, DatabaseError) as e:
+                raise CommandError(f"{path}: {e}")
+
+            seconds = time.monotonic() - file_started
+            for name in result['partitions_created']:
+                self.stdout.write(f"  Создана партиция {name}")
+            self.stdout.write(
+                f"  Загружено {result['rows']} строк за {seconds:.1f} с "
+                f"({result['rows'] / seconds if seconds else result['rows']:.0f} строк/с), "
+                f"создано товаров: {result['products_created']}"
+            )
+
+            total_rows += result['rows']
+            if result['first_scanned_at'] and (first is None or result['first_scanned_at'] < first):
+                first = result['first_scanned_at']
+
+        if first is not None and not options['skip_derived']:
+            derived_started = time.monotonic()
+            derived = HistoryLoadService.rebuild_derived(options['target'], first)
+            self.stdout.write(
+                f"Производные таблицы пересчитаны с {first:%Y-%m-%d} за {time.monotonic() - derived_started:.1f} с: "
+                + ', '.join(f"{name} - {rows}" for name, rows in derived.items())
+            )
+
+        seconds = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Всего загружено {total_rows} строк за {seconds:.1f} с "
+            f"({total_rows / seconds if seconds else total_rows:.0f} строк/с)"
+        ))
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from warehouse.services import HistoryPartitionService
+
+
+class Command(BaseCommand):
+    help = (
+        "Ведёт помесячные партиции inventory_history и наблюдений роботов (inventory_observations): создаёт их "
+        "заранее и отсоединяет (или удаляет) месяцы старше срока хранения. Запускать по расписанию, например раз в сутки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=getattr(settings, 'HISTORY_PARTITION_AHEAD_MONTHS', 3),
+            help='На сколько месяцев вперёд создавать партиции'
+        )
+        parser.add_argument(
+            '--retention',
+            type=int,
+            default=getattr(settings, 'HISTORY_RETENTION_MONTHS', 12),
+            help='Сколько полных месяцев истории хранить (0 - не применять срок хранения)'
+        )
+        parser.add_argument(
+            '--drop',
+            action='store_true',
+            help='Удалять старые партиции вместо отсоединения (DETACH оставляет таблицу для архивации)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, какие партиции будут отсоединены'
+        )
+
+    def handle(self, *args, **options):
+        if not HistoryPartitionService.is_partitioned():
+            raise CommandError('inventory_history не секционирована (нужен PostgreSQL и миграция warehouse 0010)')
+
+        if options['dry_run']:
+            expired = HistoryPartitionService.expired_partitions(options['retention']) if options['retention'] else []
+            for _, name in expired:
+                self.stdout.write(f"Будет {'удалена' if options['drop'] else 'отсоединена'}: {name}")
+            self.stdout.write(f"Партиций к обработке: {len(expired)}")
+            return
+
+        for name in HistoryPartitionService.ensure_partitions(options['ahead']):
+            self.stdout.write(f"Создана партиция {name}")
+
+        if options['retention']:
+            processed = HistoryPartitionService.apply_retention(options['retention'], drop=options['drop'])
+            for name in processed:
+                self.stdout.write(f"{'Удалена' if options['drop'] else 'Отсоединена'} партиция {name}")
+
+        partitions = HistoryPartitionService.list_partitions()
+        scope = f"{partitions[0][0]:%Y-%m} - {partitions[-1][0]:%Y-%m}" if partitions else "нет"
+        self.stdout.write(self.style.SUCCESS(f"Партиции inventory_history: {len(partitions)} ({scope})"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from warehouse.services import CellStateService
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает последнее сканирование каждой ячейки (cell_states) по inventory_history"
+
+    def handle(self, *args, **options):
+        cells = CellStateService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Состояние ячеек пересчитано: {cells} ячеек"))
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from warehouse.services import ScanCounterService
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает дневные счётчики сканирований (daily_scan_counters) по истории и импортам CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Пересчитать только последние N дней (по умолчанию - всю историю)'
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['days'] is not None:
+            since = timezone.localdate() - timedelta(days=max(options['days'] - 1, 0))
+
+        rows = ScanCounterService.rebuild(since=since)
+
+        scope = f"с {since}" if since else "за всю историю"
+        self.stdout.write(self.style.SUCCESS(f"Счётчики пересчитаны {scope}: {rows} строк"))
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:36
+
+from django.db import migrations, models
+from django.db.models import Case, CharField, Count, Value, When
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def fill_counters(apps, schema_editor):
+    InventoryHistory = apps.get_model('warehouse', 'InventoryHistory')
+    InventoryCSVImport = apps.get_model('inventory', 'InventoryCSVImport')
+    DailyScanCounter = apps.get_model('warehouse', 'DailyScanCounter')
+
+    sources = [
+        ('robot', InventoryHistory.objects.filter(scanned_at__isnull=False).annotate(
+            bucket_status=Coalesce('status', Value(''))
+        )),
+        ('csv', InventoryCSVImport.objects.annotate(bucket_status=Case(
+            When(quantity__lte=5, then=Value('CRITICAL')),
+            When(quantity__lte=20, then=Value('LOW_STOCK')),
+            default=Value('OK'),
+            output_field=CharField(),
+        ))),
+    ]
+
+    rows = []
+    for source, qs in sources:
+        grouped = qs.annotate(day=TruncDate('scanned_at')).values('day', 'bucket_status').annotate(n=Count('id'))
+        for item in grouped:
+            rows.append(DailyScanCounter(day=item['day'], source=source, status=item['bucket_status'], count=item['n']))
+
+    DailyScanCounter.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_inventorycsvimport_status'),
+        ('warehouse', '0007_aiprediction_ai_predicti_is_acti_c5f3ef_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyScanCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('source', models.CharField(choices=[('robot', 'Робот'), ('csv', 'Импорт CSV')], max_length=20)),
+                ('status', models.CharField(blank=True, default='', max_length=50)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Счётчик сканирований',
+                'verbose_name_plural': 'Счётчики сканирований',
+                'db_table': 'daily_scan_counters',
+                'constraints': [models.UniqueConstraint(fields=('day', 'source', 'status'), name='daily_scan_counter_key')],
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
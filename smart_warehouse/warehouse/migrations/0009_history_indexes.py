@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:43
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY не блокирует запись сканирований, но не работает в транзакции
+    atomic = False
+
+    dependencies = [
+        ('products', '0002_product_optimal_stock_alter_product_min_stock'),
+        ('robots', '0004_remove_robot_secret'),
+        ('warehouse', '0008_dailyscancounter'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='inventoryhistory',
+            index=models.Index(fields=['-scanned_at'], name='inv_hist_scanned_at_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='inventoryhistory',
+            index=models.Index(condition=models.Q(('status', 'CRITICAL')), fields=['-scanned_at'], name='inv_hist_critical_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='inventoryhistory',
+            index=models.Index(condition=models.Q(('row_number__isnull', False)), fields=['zone', 'row_number', '-scanned_at'], name='inv_hist_cell_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='inventoryhistory',
+            index=models.Index(fields=['product', '-scanned_at'], name='inv_hist_product_idx'),
+        ),
+    ]
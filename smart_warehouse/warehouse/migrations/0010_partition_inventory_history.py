@@ -0,0 +1,120 @@
+from datetime import date
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+# Сколько месяцев вперёд создать партиций при миграции (дальше их ведёт manage_history_partitions)
+AHEAD_MONTHS = 3
+
+
+def fill_scanned_at(apps, schema_editor):
+    InventoryHistory = apps.get_model('warehouse', 'InventoryHistory')
+    InventoryHistory.objects.filter(scanned_at__isnull=True).update(scanned_at=F('created_at'))
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def restore_constraints(schema_editor, model, primary_key):
+    """
+    Первичный ключ, внешние ключи и индексы новой таблицы inventory_history.
+    SQL и имена - от schema_editor, как при создании таблицы Django, чтобы последующие миграции их находили.
+    """
+    table = model._meta.db_table
+
+    schema_editor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY ({primary_key})")
+    for field in model._meta.local_fields:
+        if field.remote_field and field.db_constraint:
+            schema_editor.execute(schema_editor._create_fk_sql(model, field, "_fk_%(to_table)s_%(to_column)s"))
+        # У product db_index=False: индекс по product_id покрывает inv_hist_product_idx
+        for sql in schema_editor._field_indexes_sql(model, field):
+            schema_editor.execute(sql)
+    for index in model._meta.indexes:
+        schema_editor.add_index(model, index)
+
+
+def partition_history(apps, schema_editor):
+    """
+    Пересоздаёт inventory_history как PARTITION BY RANGE (scanned_at) с помесячными партициями
+    и переносит строки. Выполняется в транзакции миграции: при ошибке таблица остаётся прежней.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    model = apps.get_model('warehouse', 'InventoryHistory')
+    table = model._meta.db_table
+    legacy = f"{table}_legacy"
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"SELECT MIN(scanned_at), MAX(id), now() FROM {table}")
+        first_scan, max_id, now = cursor.fetchone()
+
+    schema_editor.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+    # LIKE без INCLUDING: копируются колонки и NOT NULL, но не identity, ключи и индексы старой таблицы
+    schema_editor.execute(f"CREATE TABLE {table} (LIKE {legacy}) PARTITION BY RANGE (scanned_at)")
+
+    current = date(now.year, now.month, 1)
+    month = date(first_scan.year, first_scan.month, 1) if first_scan else current
+    while month <= add_months(current, AHEAD_MONTHS):
+        schema_editor.execute(
+            f"CREATE TABLE {table}_p{month:%Y%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+        )
+        month = add_months(month, 1)
+    schema_editor.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+    schema_editor.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+    schema_editor.execute(f"DROP TABLE {legacy}")
+
+    schema_editor.execute(f"CREATE SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    schema_editor.execute(f"SELECT setval('{table}_id_seq', {(max_id or 0) + 1}, false)")
+    schema_editor.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{table}_id_seq')")
+
+    restore_constraints(schema_editor, model, 'id, scanned_at')
+
+
+def unpartition_history(apps, schema_editor):
+    """Обратная миграция: обычная таблица с первичным ключом id"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    model = apps.get_model('warehouse', 'InventoryHistory')
+    table = model._meta.db_table
+    legacy = f"{table}_partitioned"
+
+    schema_editor.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+    schema_editor.execute(f"CREATE TABLE {table} (LIKE {legacy})")
+    schema_editor.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+    schema_editor.execute(f"DROP TABLE {legacy} CASCADE")
+
+    schema_editor.execute(f"ALTER TABLE {table} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY")
+    schema_editor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+    )
+
+    restore_constraints(schema_editor, model, 'id')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('warehouse', '0009_history_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_scanned_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='inventoryhistory',
+            name='scanned_at',
+            field=models.DateTimeField(),
+        ),
+        migrations.AlterField(
+            model_name='inventoryhistory',
+            name='product',
+            field=models.ForeignKey(db_column='product_id', db_index=False, on_delete=django.db.models.deletion.CASCADE, to='products.product'),
+        ),
+        migrations.RunPython(partition_history, unpartition_history),
+    ]
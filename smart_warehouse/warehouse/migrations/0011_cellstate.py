@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_cell_states(apps, schema_editor):
+    InventoryHistory = apps.get_model('warehouse', 'InventoryHistory')
+    CellState = apps.get_model('warehouse', 'CellState')
+
+    latest = InventoryHistory.objects.filter(row_number__isnull=False).order_by(
+        'zone', 'row_number', '-scanned_at', '-id'
+    ).distinct('zone', 'row_number').values(
+        'zone', 'row_number', 'robot_id', 'product_id', 'quantity', 'status', 'scanned_at'
+    )
+    CellState.objects.bulk_create([CellState(**row) for row in latest], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_product_optimal_stock_alter_product_min_stock'),
+        ('robots', '0004_remove_robot_secret'),
+        ('warehouse', '0010_partition_inventory_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CellState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zone', models.CharField(max_length=10)),
+                ('row_number', models.IntegerField()),
+                ('quantity', models.IntegerField()),
+                ('status', models.CharField(blank=True, max_length=50, null=True)),
+                ('scanned_at', models.DateTimeField()),
+                ('product', models.ForeignKey(db_column='product_id', on_delete=django.db.models.deletion.CASCADE, to='products.product')),
+                ('robot', models.ForeignKey(db_column='robot_id', on_delete=django.db.models.deletion.CASCADE, to='robots.robot')),
+            ],
+            options={
+                'verbose_name': 'Состояние ячейки',
+                'verbose_name_plural': 'Состояния ячеек',
+                'db_table': 'cell_states',
+                'constraints': [models.UniqueConstraint(fields=('zone', 'row_number'), name='cell_state_key')],
+            },
+        ),
+        migrations.RunPython(fill_cell_states, migrations.RunPython.noop),
+    ]
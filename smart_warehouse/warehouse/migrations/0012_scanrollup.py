@@ -0,0 +1,69 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:50
+
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncHour, TruncMinute
+from django.utils import timezone
+
+
+def fill_rollups(apps, schema_editor):
+    InventoryHistory = apps.get_model('warehouse', 'InventoryHistory')
+    ScanRollup = apps.get_model('warehouse', 'ScanRollup')
+
+    # Часовые агрегаты - за всю историю, минутные - за последние 48 часов
+    tiers = [
+        ('hour', TruncHour, InventoryHistory.objects.all()),
+        ('minute', TruncMinute, InventoryHistory.objects.filter(scanned_at__gte=timezone.now() - timedelta(hours=48))),
+    ]
+    for resolution, trunc, history in tiers:
+        grouped = history.annotate(
+            rollup_bucket=trunc('scanned_at', tzinfo=dt_timezone.utc)
+        ).values('rollup_bucket', 'robot_id', 'zone').annotate(
+            total=Count('id'),
+            critical_total=Count('id', filter=Q(status='CRITICAL')),
+        )
+        ScanRollup.objects.bulk_create(
+            [
+                ScanRollup(
+                    resolution=resolution,
+                    bucket=item['rollup_bucket'],
+                    robot_id=item['robot_id'],
+                    zone=item['zone'] or '',
+                    scans=item['total'],
+                    critical=item['critical_total'],
+                )
+                for item in grouped.iterator(chunk_size=5000)
+            ],
+            batch_size=2000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('warehouse', '0011_cellstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('minute', 'Минута'), ('hour', 'Час')], max_length=10)),
+                ('bucket', models.DateTimeField()),
+                ('robot_id', models.CharField(max_length=50)),
+                ('zone', models.CharField(max_length=10)),
+                ('scans', models.IntegerField(default=0)),
+                ('critical', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Агрегат сканирований',
+                'verbose_name_plural': 'Агрегаты сканирований',
+                'db_table': 'scan_rollups',
+                'constraints': [models.UniqueConstraint(fields=('resolution', 'bucket', 'robot_id', 'zone'), name='scan_rollup_key')],
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
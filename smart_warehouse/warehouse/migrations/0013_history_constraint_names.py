@@ -0,0 +1,58 @@
+from django.db import migrations
+
+
+def rename_history_constraints(apps, schema_editor):
+    """
+    Прежняя версия 0010 создавала внешние ключи и индекс robot_id inventory_history под выбранными вручную
+    именами ({table}_robot_id_fk, {table}_product_id_fk, {table}_robot_id_idx). Переименовывает их в имена,
+    которые дал бы Django, и создаёт недостающие индексы полей. На базах, где 0010 уже создала их
+    под именами Django, ничего не делает.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    model = apps.get_model('warehouse', 'InventoryHistory')
+    table = model._meta.db_table
+    quote = schema_editor.quote_name
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass "
+            "UNION SELECT indexname FROM pg_indexes WHERE tablename = %s AND schemaname = 'public'",
+            [table, table]
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+
+    for field in model._meta.local_fields:
+        if field.remote_field and field.db_constraint:
+            to_table = field.target_field.model._meta.db_table
+            name = schema_editor._create_index_name(
+                table, [field.column], suffix=f"_fk_{to_table}_{field.target_field.column}"
+            )
+            legacy = f"{table}_{field.column}_fk"
+            if legacy in existing and name not in existing:
+                schema_editor.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {legacy} TO {quote(name)}")
+
+        if field.db_index:
+            name = schema_editor._create_index_name(table, [field.column])
+            legacy = f"{table}_{field.column}_idx"
+            if legacy in existing and name not in existing:
+                schema_editor.execute(f"ALTER INDEX {legacy} RENAME TO {quote(name)}")
+            elif name not in existing:
+                schema_editor.execute(schema_editor._create_index_sql(model, fields=[field]))
+
+            like_name = schema_editor._create_index_name(table, [field.column], suffix='_like')
+            like_sql = schema_editor._create_like_index_sql(model, field)
+            if like_sql is not None and like_name not in existing:
+                schema_editor.execute(like_sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('warehouse', '0012_scanrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_history_constraints, migrations.RunPython.noop),
+    ]
@@ -12,10 +12,12 @@ class InventoryHistory(models.Model):
         db_column='robot_id'
     )
 
+    # Отдельный индекс по product_id не нужен: его покрывает inv_hist_product_idx (product_id, scanned_at)
     product = models.ForeignKey(
         'products.Product',
         on_delete=models.CASCADE,
-        db_column='product_id'
+        db_column='product_id',
+        db_index=False
     )
     expected_quantity = models.IntegerField(null=True, blank=True)
     quantity = models.IntegerField(null=False)
@@ -30,7 +32,8 @@ class InventoryHistory(models.Model):
         choices=[('OK', 'OK'), ('LOW_STOCK', 'LOW_STOCK'), ('CRITICAL', 'CRITICAL')]
     )
 
-    scanned_at = models.DateTimeField(null=True)
+    # Ключ партиционирования inventory_history (помесячные RANGE-партиции), поэтому NOT NULL
+    scanned_at = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
 
     @property
@@ -51,13 +54,119 @@ class InventoryHistory(models.Model):
 
 
     class Meta:
+        # В PostgreSQL таблица секционирована по scanned_at, первичный ключ в БД - (id, scanned_at);
+        # id по-прежнему уникален за счёт общей последовательности
         db_table = 'inventory_history'
+        indexes = [
+            # Окна по времени: активность роботов, последние сканирования, история
+            models.Index(fields=['-scanned_at'], name='inv_hist_scanned_at_idx'),
+            # Критические остатки за период - только малая доля строк
+            models.Index(
+                fields=['-scanned_at'],
+                name='inv_hist_critical_idx',
+                condition=models.Q(status='CRITICAL'),
+            ),
+            # Последнее сканирование ячейки (зона, ряд) для карты склада
+            models.Index(
+                fields=['zone', 'row_number', '-scanned_at'],
+                name='inv_hist_cell_idx',
+                condition=models.Q(row_number__isnull=False),
+            ),
+            # Тренд и история по товару
+            models.Index(fields=['product', '-scanned_at'], name='inv_hist_product_idx'),
+        ]
 
     def __str__(self):
         return f'{self.product} - {self.robot} at {self.scanned_at}'
 
 
 
+class DailyScanCounter(models.Model):
+    """
+    Счётчики сканирований за день в разрезе источника и статуса.
+    Обновляются инкрементально при записи сканов и импорте CSV,
+    чтобы статистика «за сегодня» не требовала COUNT(*) по истории.
+    """
+    SOURCE_ROBOT = 'robot'
+    SOURCE_CSV = 'csv'
+
+    day = models.DateField()
+    source = models.CharField(
+        max_length=20,
+        choices=[(SOURCE_ROBOT, 'Робот'), (SOURCE_CSV, 'Импорт CSV')]
+    )
+    status = models.CharField(max_length=50, blank=True, default='')
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'daily_scan_counters'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'source', 'status'], name='daily_scan_counter_key'),
+        ]
+        verbose_name = 'Счётчик сканирований'
+        verbose_name_plural = 'Счётчики сканирований'
+
+    def __str__(self):
+        return f'{self.day} {self.source} {self.status or "-"}: {self.count}'
+
+
+class ScanRollup(models.Model):
+    """
+    Агрегаты сканирований роботов по минутам и по часам в разрезе робота и зоны.
+    Обновляются инкрементально при приёме данных; длинные графики активности
+    читают их вместо inventory_history.
+    """
+    RESOLUTION_MINUTE = 'minute'
+    RESOLUTION_HOUR = 'hour'
+
+    resolution = models.CharField(
+        max_length=10,
+        choices=[(RESOLUTION_MINUTE, 'Минута'), (RESOLUTION_HOUR, 'Час')]
+    )
+    bucket = models.DateTimeField()
+    robot_id = models.CharField(max_length=50)
+    zone = models.CharField(max_length=10)
+    scans = models.IntegerField(default=0)
+    critical = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'scan_rollups'
+        constraints = [
+            models.UniqueConstraint(fields=['resolution', 'bucket', 'robot_id', 'zone'], name='scan_rollup_key'),
+        ]
+        verbose_name = 'Агрегат сканирований'
+        verbose_name_plural = 'Агрегаты сканирований'
+
+    def __str__(self):
+        return f'{self.resolution} {self.bucket} {self.robot_id}/{self.zone}: {self.scans}'
+
+
+class CellState(models.Model):
+    """
+    Последнее сканирование каждой ячейки склада (зона, ряд).
+    Обновляется upsert-ом при записи сканов, поэтому карта склада читает
+    по одной строке на ячейку, а не всю историю.
+    """
+    zone = models.CharField(max_length=10)
+    row_number = models.IntegerField()
+    robot = models.ForeignKey('robots.Robot', on_delete=models.CASCADE, db_column='robot_id')
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, db_column='product_id')
+    quantity = models.IntegerField()
+    status = models.CharField(max_length=50, null=True, blank=True)
+    scanned_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'cell_states'
+        constraints = [
+            models.UniqueConstraint(fields=['zone', 'row_number'], name='cell_state_key'),
+        ]
+        verbose_name = 'Состояние ячейки'
+        verbose_name_plural = 'Состояния ячеек'
+
+    def __str__(self):
+        return f'{self.zone}{self.row_number}: {self.product_id} ({self.scanned_at})'
+
+
 class AIPrediction(models.Model):
     product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='ai_prediction')
     prediction_date = models.DateTimeField(auto_now_add=True)
@@ -1,4 +1,12 @@
 from .prediction_service import AIPredictionService
+from .scan_counters import ScanCounterService
+from .history_partitions import HistoryPartitionService
+from .cell_state import CellStateService
+from .zone_status import ZoneStatusService
+from .scan_rollups import ScanRollupService
+from .robot_activity import RobotActivityService
+from .synthetic_data import SyntheticDataService
+from .history_loader import HistoryLoadService
 from .prediction_providers import (
     PredictionProvider,
     MockPredictionProvider,
@@ -7,6 +15,14 @@ from .prediction_providers import (
 
 __all__ = [
     'AIPredictionService',
+    'ScanCounterService',
+    'HistoryPartitionService',
+    'CellStateService',
+    'ZoneStatusService',
+    'ScanRollupService',
+    'RobotActivityService',
+    'SyntheticDataService',
+    'HistoryLoadService',
     'PredictionProvider',
     'MockPredictionProvider',
     'PredictionProviderFactory'
@@ -0,0 +1,72 @@
+from django.db import connection, transaction
+
+
+class CellStateService:
+    """Сервис таблицы cell_states: последнее сканирование каждой ячейки (зона, ряд), см. ZoneStatusService"""
+
+    COLUMNS = ['zone', 'row_number', 'robot_id', 'product_id', 'quantity', 'status', 'scanned_at']
+
+    @staticmethod
+    def latest_by_cell(scans):
+        """
+        Оставляет по одному скану на ячейку - самый поздний (при равном времени - последний в списке).
+        scans - словари с ключами COLUMNS; сканы без ряда пропускаются.
+        """
+        latest = {}
+        for scan in scans:
+            if scan['row_number'] is None or scan['zone'] is None:
+                continue
+            key = (scan['zone'], scan['row_number'])
+            if key not in latest or latest[key]['scanned_at'] <= scan['scanned_at']:
+                latest[key] = scan
+        return list(latest.values())
+
+    @staticmethod
+    def record(scans):
+        """
+        Обновляет состояние ячеек по новым сканам одним INSERT ... ON CONFLICT DO UPDATE.
+        Запись заменяется только более свежим сканом, поэтому устаревшие отчёты
+        (повторная отправка буфера) не откатывают карту склада назад.
+        """
+        from warehouse.models import CellState
+
+        cells = CellStateService.latest_by_cell(scans)
+        if not cells:
+            return
+
+        table = connection.ops.quote_name(CellState._meta.db_table)
+        columns = CellStateService.COLUMNS
+        row_placeholder = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        placeholders = ', '.join([row_placeholder] * len(cells))
+        params = [cell[column] for cell in cells for column in columns]
+        updates = ', '.join(
+            f'{column} = EXCLUDED.{column}' for column in columns if column not in ('zone', 'row_number')
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} ({", ".join(columns)}) VALUES {placeholders} '
+                f'ON CONFLICT (zone, row_number) DO UPDATE SET {updates} '
+                f'WHERE {table}.scanned_at <= EXCLUDED.scanned_at',
+                params
+            )
+
+    @staticmethod
+    def rebuild():
+        """
+        Пересчитывает cell_states по inventory_history (DISTINCT ON по ячейке).
+        Возвращает количество ячеек.
+        """
+        from warehouse.models import CellState, InventoryHistory
+
+        latest = InventoryHistory.objects.filter(row_number__isnull=False).order_by(
+            'zone', 'row_number', '-scanned_at', '-id'
+        ).distinct('zone', 'row_number').values(*CellStateService.COLUMNS)
+
+        states = [CellState(**row) for row in latest.iterator(chunk_size=2000)]
+
+        with transaction.atomic():
+            CellState.objects.all().delete()
+            CellState.objects.bulk_create(states, batch_size=2000)
+
+        return len(states)
@@ -0,0 +1,379 @@
+import csv
+import gzip
+import io
+import json
+import re
+import time
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+
+class _ChunkReader:
+    """Файлоподобный объект поверх итератора кусков bytes - источник данных для copy_expert"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = b''
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer += chunk
+        if size < 0:
+            data, self.buffer = self.buffer, b''
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+class HistoryLoadService:
+    """
+    Массовая загрузка исторических сканирований (только PostgreSQL, psycopg2).
+
+    Файл (CSV или NDJSON, в т.ч. .gz) передаётся потоком через COPY FROM STDIN во временную
+    staging-таблицу с текстовыми колонками, затем в одной транзакции: создаются недостающие
+    карточки товаров, при необходимости - помесячные партиции, и строки переносятся в целевую
+    таблицу одним INSERT ... SELECT с приведением типов и расчётом статуса, а затем
+    копируются в единое хранилище наблюдений (ObservationService).
+    С defer_indexes индексы целевой таблицы (Meta.indexes) удаляются на время переноса
+    и строятся заново в той же транзакции - на больших объёмах это быстрее поддержки
+    индексов построчно, но таблица заблокирована до конца загрузки.
+    """
+
+    STAGING_TABLE = 'history_load_staging'
+
+    TARGET_HISTORY = 'history'
+    TARGET_CSV = 'csv'
+
+    # Колонки целевой таблицы -> (тип, обязательная)
+    COLUMNS = {
+        TARGET_HISTORY: {
+            'robot_id': ('text', True),
+            'product_id': ('text', True),
+            'quantity': ('integer', True),
+            'expected_quantity': ('integer', False),
+            'zone': ('text', True),
+            'row_number': ('integer', False),
+            'shelf_number': ('integer', False),
+            'status': ('text', False),
+            'scanned_at': ('timestamptz', True),
+        },
+        TARGET_CSV: {
+            'product_id': ('text', True),
+            'product_name': ('text', True),
+            'quantity': ('integer', True),
+            'zone': ('text', True),
+            'row_number': ('integer', False),
+            'shelf_number': ('integer', False),
+            'status': ('text', False),
+            'scanned_at': ('timestamptz', True),
+        },
+    }
+
+    # Имена колонок файла импорта CSV (см. CSVImportService) -> колонки таблиц
+    ALIASES = {'row': 'row_number', 'shelf': 'shelf_number', 'date': 'scanned_at'}
+
+    COLUMN_RE = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+    @staticmethod
+    def chunk_size():
+        return getattr(settings, 'HISTORY_LOAD_CHUNK_SIZE', 10000)
+
+    @staticmethod
+    def target_model(target):
+        from inventory.models import InventoryCSVImport
+        from warehouse.models import InventoryHistory
+
+        return InventoryHistory if target == HistoryLoadService.TARGET_HISTORY else InventoryCSVImport
+
+    @staticmethod
+    def input_format(path):
+        name = path[:-3] if path.endswith('.gz') else path
+        if name.endswith('.csv'):
+            return 'csv'
+        if name.endswith(('.ndjson', '.jsonl')):
+            return 'ndjson'
+        raise ValueError(f"Неподдерживаемый формат файла {path}: нужен .csv или .ndjson/.jsonl (можно .gz)")
+
+    @staticmethod
+    def open_input(path):
+        return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+    @staticmethod
+    def normalize_columns(names):
+        """Заголовок файла -> имена колонок staging (с учётом ALIASES). ValueError - недопустимое имя или повтор."""
+        columns = []
+        for name in names:
+            column = name.strip().lower()
+            column = HistoryLoadService.ALIASES.get(column, column)
+            if not HistoryLoadService.COLUMN_RE.match(column):
+                raise ValueError(f"Недопустимое имя колонки: {name!r}")
+            if column in columns:
+                raise ValueError(f"Колонка {column} указана в файле дважды")
+            columns.append(column)
+        return columns
+
+    @staticmethod
+    def ndjson_chunks(file, columns):
+        """Строки NDJSON -> CSV (разделитель ',') кусками по HISTORY_LOAD_CHUNK_SIZE строк"""
+        aliases = HistoryLoadService.ALIASES
+        chunk_size = HistoryLoadService.chunk_size()
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        for n, line in enumerate(io.TextIOWrapper(file, encoding='utf-8'), start=1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Строка {n}: неверный JSON ({e})")
+            item = {aliases.get(key, key): value for key, value in item.items()}
+            # None и пустая строка без кавычек -> NULL в COPY
+            writer.writerow(['' if item.get(column) is None else item[column] for column in columns])
+            if n % chunk_size == 0:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue().encode('utf-8')
+
+    @staticmethod
+    def copy_to_staging(cursor, path, target, delimiter=';'):
+        """
+        Создаёт временную staging-таблицу (удаляется при коммите) и заливает в неё файл через COPY.
+        Возвращает (колонки staging, количество строк).
+        """
+        staging = HistoryLoadService.STAGING_TABLE
+        file = HistoryLoadService.open_input(path)
+        try:
+            if HistoryLoadService.input_format(path) == 'csv':
+                header = file.readline().decode('utf-8-sig')
+                columns = HistoryLoadService.normalize_columns(next(csv.reader([header], delimiter=delimiter), []))
+                source = file
+            else:
+                delimiter = ','
+                columns = list(HistoryLoadService.COLUMNS[target])
+                if target == HistoryLoadService.TARGET_HISTORY:
+                    columns.append('product_name')
+                source = _ChunkReader(HistoryLoadService.ndjson_chunks(file, columns))
+
+            missing = [
+                column for column, (_, required) in HistoryLoadService.COLUMNS[target].items()
+                if required and column not in columns
+            ]
+            if missing:
+                raise ValueError(f"Отсутствуют обязательные колонки: {', '.join(missing)}")
+
+            column_list = ', '.join(connection.ops.quote_name(column) for column in columns)
+            cursor.execute(
+                f"CREATE TEMP TABLE {staging} ("
+                + ', '.join(f"{connection.ops.quote_name(column)} text" for column in columns)
+                + ") ON COMMIT DROP"
+            )
+            quoted_delimiter = delimiter.replace("'", "''")
+            cursor.copy_expert(
+                f"COPY {staging} ({column_list}) FROM STDIN "
+                f"WITH (FORMAT csv, DELIMITER '{quoted_delimiter}', ENCODING 'UTF8')",
+                source,
+                size=64 * 1024,
+            )
+            rows = cursor.rowcount
+            if rows < 0:
+                cursor.execute(f"SELECT count(*) FROM {staging}")
+                rows = cursor.fetchone()[0]
+            return columns, rows
+        finally:
+            file.close()
+
+    @staticmethod
+    def select_expressions(target, columns):
+        """Колонка целевой таблицы -> SQL-выражение над staging (s.*) с приведением типа"""
+        from inventory.services import calculate_status_sql
+
+        expressions = {}
+        for column, (sql_type, _) in HistoryLoadService.COLUMNS[target].items():
+            if column in columns:
+                value = f"NULLIF(btrim(s.{connection.ops.quote_name(column)}), '')"
+                expressions[column] = value if sql_type == 'text' else f"{value}::{sql_type}"
+            else:
+                expressions[column] = 'NULL'
+
+        status = calculate_status_sql(expressions['quantity'])
+        expressions['status'] = status if expressions['status'] == 'NULL' \
+            else f"COALESCE({expressions['status']}, {status})"
+        return expressions
+
+    @staticmethod
+    def check_staging(cursor, target, expressions):
+        """Проверяет обязательные значения и (для истории) наличие роботов. ValueError - файл нельзя загрузить."""
+        from robots.models import Robot
+
+        staging = HistoryLoadService.STAGING_TABLE
+        required = [column for column, (_, is_required) in HistoryLoadService.COLUMNS[target].items() if is_required]
+        cursor.execute(
+            f"SELECT count(*) FROM {staging} s WHERE "
+            + ' OR '.join(f"{expressions[column]} IS NULL" for column in required)
+        )
+        empty = cursor.fetchone()[0]
+        if empty:
+            raise ValueError(f"Строк без обязательных значений ({', '.join(required)}): {empty}")
+
+        if target == HistoryLoadService.TARGET_HISTORY:
+            cursor.execute(
+                f"SELECT DISTINCT {expressions['robot_id']} FROM {staging} s "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {connection.ops.quote_name(Robot._meta.db_table)} r "
+                f"WHERE r.id = {expressions['robot_id']}) LIMIT 10"
+            )
+            unknown = [row[0] for row in cursor.fetchall()]
+            if unknown:
+                raise ValueError(f"Роботы не найдены в базе данных: {', '.join(unknown)}")
+
+    @staticmethod
+    def create_products(cursor, columns, expressions):
+        """Недостающие карточки товаров (по одной из строк с таким product_id). Возвращает количество созданных."""
+        from products.models import Product
+
+        name = "NULLIF(btrim(s.product_name), '')" if 'product_name' in columns else 'NULL'
+        cursor.execute(
+            f"INSERT INTO {connection.ops.quote_name(Product._meta.db_table)} "
+            f"(id, name, category, min_stock, optimal_stock) "
+            f"SELECT DISTINCT ON (product_id) product_id, COALESCE(name, product_id), %s, 10, quantity "
+            f"FROM (SELECT {expressions['product_id']} AS product_id, {name} AS name, "
+            f"{expressions['quantity']} AS quantity FROM {HistoryLoadService.STAGING_TABLE} s) AS p "
+            f"ORDER BY product_id "
+            f"ON CONFLICT (id) DO NOTHING",
+            ['Без категории']
+        )
+        return cursor.rowcount
+
+    @staticmethod
+    def scanned_range(cursor, expressions):
+        cursor.execute(
+            f"SELECT min({expressions['scanned_at']}), max({expressions['scanned_at']}) "
+            f"FROM {HistoryLoadService.STAGING_TABLE} s"
+        )
+        return cursor.fetchone()
+
+    @staticmethod
+    def create_partitions(first, last):
+        """Создаёт недостающие помесячные партиции inventory_history и наблюдений роботов для диапазона загрузки"""
+        from .history_partitions import HistoryPartitionService
+
+        if not HistoryPartitionService.is_partitioned():
+            return []
+
+        # Границы партиций - по UTC
+        month = HistoryPartitionService.month_start(first.astimezone(dt_timezone.utc))
+        last_month = HistoryPartitionService.month_start(last.astimezone(dt_timezone.utc))
+        created = []
+        while month <= last_month:
+            created.extend(HistoryPartitionService.create_partition(month))
+            month = HistoryPartitionService.add_months(month, 1)
+        return created
+
+    @staticmethod
+    def merge(cursor, target, expressions):
+        """Переносит строки staging в целевую таблицу одним INSERT ... SELECT. Возвращает количество строк."""
+        model = HistoryLoadService.target_model(target)
+        columns = list(HistoryLoadService.COLUMNS[target])
+        cursor.execute(
+            f"INSERT INTO {connection.ops.quote_name(model._meta.db_table)} "
+            f"({', '.join(connection.ops.quote_name(column) for column in columns)}, created_at) "
+            f"SELECT {', '.join(expressions[column] for column in columns)}, now() "
+            f"FROM {HistoryLoadService.STAGING_TABLE} s"
+        )
+        return cursor.rowcount
+
+    @staticmethod
+    def load(path, target=TARGET_HISTORY, delimiter=';', defer_indexes=False, report=None):
+        """
+        target совпадает с source наблюдений (InventoryObservation.SOURCE_HISTORY / SOURCE_CSV).
+        Загружает файл в целевую таблицу (history - inventory_history, csv - импорты CSV) одной транзакцией.
+        report(phase, rows, seconds) вызывается после каждого этапа.
+        ValueError - файл нельзя загрузить (формат, колонки, пустые значения, неизвестные роботы).
+        Возвращает {'rows', 'products_created', 'partitions_created', 'first_scanned_at', 'last_scanned_at'}.
+        """
+        from inventory.services import ObservationService
+
+        if connection.vendor != 'postgresql':
+            raise ValueError('Загрузка через COPY доступна только на PostgreSQL')
+        if target not in HistoryLoadService.COLUMNS:
+            raise ValueError(f"target должен быть одним из: {', '.join(HistoryLoadService.COLUMNS)}")
+        if len(delimiter) != 1:
+            raise ValueError('Разделитель должен быть одним символом')
+
+        def done(phase, started, rows=None):
+            if report:
+                report(phase, rows, time.monotonic() - started)
+
+        model = HistoryLoadService.target_model(target)
+        indexes = list(model._meta.indexes) if defer_indexes else []
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            started = time.monotonic()
+            columns, rows = HistoryLoadService.copy_to_staging(cursor, path, target, delimiter)
+            done('copy', started, rows)
+
+            expressions = HistoryLoadService.select_expressions(target, columns)
+            HistoryLoadService.check_staging(cursor, target, expressions)
+            first, last = HistoryLoadService.scanned_range(cursor, expressions)
+
+            started = time.monotonic()
+            products_created = HistoryLoadService.create_products(cursor, columns, expressions)
+            partitions_created = []
+            if target == HistoryLoadService.TARGET_HISTORY and first is not None:
+                partitions_created = HistoryLoadService.create_partitions(first, last)
+            done('prepare', started)
+
+            last_id = ObservationService.last_id(target)
+            with connection.schema_editor(atomic=False) as schema_editor:
+                for index in indexes:
+                    schema_editor.remove_index(model, index)
+
+                started = time.monotonic()
+                loaded = HistoryLoadService.merge(cursor, target, expressions)
+                done('merge', started, loaded)
+
+                if indexes:
+                    started = time.monotonic()
+                    for index in indexes:
+                        schema_editor.add_index(model, index)
+                    done('indexes', started)
+
+            started = time.monotonic()
+            observed = ObservationService.record_after(target, last_id)
+            done('observations', started, observed)
+
+        # Актуальная статистика для планировщика и оценок количества строк (pg_class.reltuples)
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+
+        return {
+            'rows': loaded,
+            'products_created': products_created,
+            'partitions_created': partitions_created,
+            'first_scanned_at': first,
+            'last_scanned_at': last,
+        }
+
+    @staticmethod
+    def rebuild_derived(target, since):
+        """
+        Пересчитывает производные таблицы после загрузки начиная с момента since:
+        счётчики, а для истории - агрегаты сканирований и последние состояния ячеек.
+        """
+        from .cell_state import CellStateService
+        from .scan_counters import ScanCounterService
+        from .scan_rollups import ScanRollupService
+
+        result = {'counters': ScanCounterService.rebuild(since=timezone.localdate(since))}
+        if target == HistoryLoadService.TARGET_HISTORY:
+            result['rollups'] = ScanRollupService.rebuild(since=since)
+            result['cell_states'] = CellStateService.rebuild()
+        return result
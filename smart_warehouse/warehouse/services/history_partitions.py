@@ -0,0 +1,163 @@
+from datetime import date
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+
+class HistoryPartitionService:
+    """
+    Помесячные партиции inventory_history (PARTITION BY RANGE (scanned_at)) и наблюдений роботов.
+
+    inventory_observations секционирована по source (LIST): строки импорта CSV лежат в inventory_observations_csv,
+    сканирования роботов - в inventory_observations_history, которая делится на месяцы так же, как inventory_history.
+    Границы месяцев - по UTC. Партиции называются {таблица}_pYYYYMM и создаются заранее командой
+    manage_history_partitions сразу в обеих таблицах TABLES; строки вне созданных месяцев попадают
+    в {таблица}_default. Старые месяцы отсоединяются (DETACH - таблица остаётся для архивации)
+    или удаляются целиком в обеих таблицах, без DELETE по строкам.
+    """
+
+    TABLE = 'inventory_history'
+    DEFAULT_PARTITION = 'inventory_history_default'
+    # Таблицы с общими помесячными партициями: (секционированная таблица, её default-партиция)
+    TABLES = (
+        (TABLE, DEFAULT_PARTITION),
+        ('inventory_observations_history', 'inventory_observations_history_default'),
+    )
+
+    @staticmethod
+    def month_start(value):
+        return date(value.year, value.month, 1)
+
+    @staticmethod
+    def add_months(month, count):
+        index = month.year * 12 + month.month - 1 + count
+        return date(index // 12, index % 12 + 1, 1)
+
+    @classmethod
+    def partition_name(cls, month, table=None):
+        return f"{table or cls.TABLE}_p{month:%Y%m}"
+
+    @staticmethod
+    def is_partitioned():
+        if connection.vendor != 'postgresql':
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+                "WHERE c.relname = %s AND c.relnamespace = 'public'::regnamespace",
+                [HistoryPartitionService.TABLE]
+            )
+            return cursor.fetchone() is not None
+
+    @classmethod
+    def list_partitions(cls, table=None):
+        """Месяцы присоединённых помесячных партиций table (по умолчанию TABLE) по возрастанию: [(month, table_name)]"""
+        table = table or cls.TABLE
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = %s AND p.relnamespace = 'public'::regnamespace",
+                [table]
+            )
+            names = [row[0] for row in cursor.fetchall()]
+
+        prefix = f"{table}_p"
+        partitions = []
+        for name in names:
+            suffix = name[len(prefix):]
+            if name.startswith(prefix) and len(suffix) == 6 and suffix.isdigit():
+                partitions.append((date(int(suffix[:4]), int(suffix[4:]), 1), name))
+        return sorted(partitions)
+
+    @classmethod
+    def ensure_partitions(cls, ahead=None, now=None):
+        """
+        Создаёт партиции с текущего месяца на ahead месяцев вперёд.
+        Возвращает имена созданных таблиц.
+        """
+        if ahead is None:
+            ahead = getattr(settings, 'HISTORY_PARTITION_AHEAD_MONTHS', 3)
+        current = cls.month_start((now or timezone.now()).date())
+
+        created = []
+        for offset in range(ahead + 1):
+            created.extend(cls.create_partition(cls.add_months(current, offset)))
+        return created
+
+    @classmethod
+    def create_partition(cls, month):
+        """
+        Создаёт партицию месяца в каждой таблице TABLES, где её ещё нет. Строки этого месяца, успевшие
+        попасть в default-партицию, переносятся в новую в той же транзакции (иначе PostgreSQL не даст её создать).
+        Возвращает имена созданных таблиц.
+        """
+        start = f"{month.isoformat()} 00:00:00+00"
+        end = f"{cls.add_months(month, 1).isoformat()} 00:00:00+00"
+
+        created = []
+        with transaction.atomic(), connection.cursor() as cursor:
+            for table, default_partition in cls.TABLES:
+                if month in {existing for existing, _ in cls.list_partitions(table)}:
+                    continue
+                name = cls.partition_name(month, table)
+                moved = f"{name}_moved"
+
+                cursor.execute(
+                    f"SELECT EXISTS (SELECT 1 FROM {default_partition} WHERE scanned_at >= %s AND scanned_at < %s)",
+                    [start, end]
+                )
+                has_stray_rows = cursor.fetchone()[0]
+
+                if has_stray_rows:
+                    cursor.execute(f"CREATE TEMP TABLE {moved} (LIKE {table}) ON COMMIT DROP")
+                    cursor.execute(
+                        f"WITH moved AS (DELETE FROM {default_partition} "
+                        f"WHERE scanned_at >= %s AND scanned_at < %s RETURNING *) "
+                        f"INSERT INTO {moved} SELECT * FROM moved",
+                        [start, end]
+                    )
+
+                cursor.execute(
+                    f"CREATE TABLE {name} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{start}') TO ('{end}')"
+                )
+
+                if has_stray_rows:
+                    cursor.execute(f"INSERT INTO {table} SELECT * FROM {moved}")
+                created.append(name)
+        return created
+
+    @classmethod
+    def expired_partitions(cls, retention_months=None, now=None, table=None):
+        """Партиции таблицы table (по умолчанию - всех TABLES), целиком лежащие старше retention_months месяцев"""
+        if retention_months is None:
+            retention_months = getattr(settings, 'HISTORY_RETENTION_MONTHS', 12)
+        oldest_kept = cls.add_months(cls.month_start((now or timezone.now()).date()), -retention_months)
+        tables = [table] if table else [parent for parent, _ in cls.TABLES]
+        return [
+            (month, name)
+            for parent in tables
+            for month, name in cls.list_partitions(parent)
+            if month < oldest_kept
+        ]
+
+    @classmethod
+    def apply_retention(cls, retention_months=None, drop=False, now=None):
+        """
+        Отсоединяет (или при drop=True удаляет) партиции старше срока хранения - в inventory_history
+        и в наблюдениях роботов. Отсоединённая таблица остаётся в схеме под тем же именем -
+        её можно выгрузить pg_dump и удалить. Возвращает имена обработанных партиций.
+        """
+        processed = []
+        for table, _ in cls.TABLES:
+            for _, name in cls.expired_partitions(retention_months, now, table):
+                with connection.cursor() as cursor:
+                    if drop:
+                        cursor.execute(f"DROP TABLE {name}")
+                    else:
+                        cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+                processed.append(name)
+        return processed
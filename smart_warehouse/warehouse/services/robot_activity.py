@@ -0,0 +1,104 @@
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, DateTimeField, Func, Q, Sum, Value
+from django.utils import timezone
+
+
+class DateBin(Func):
+    """date_bin(шаг, scanned_at, начало окна) - начало интервала, в который попадает время (PostgreSQL 14+)"""
+    function = 'date_bin'
+    output_field = DateTimeField()
+
+
+class RobotActivityService:
+    """Гистограмма сканирований роботов по интервалам одним GROUP BY-запросом (по истории или агрегатам)"""
+
+    DURATION_RE = re.compile(r'^(\d+)\s*([mhd])$')
+    UNITS = {'m': 'minutes', 'h': 'hours', 'd': 'days'}
+
+    DEFAULT_WINDOW = timedelta(hours=1)
+    DEFAULT_BUCKET = timedelta(minutes=1)
+
+    @staticmethod
+    def parse_duration(value, default):
+        """'15m', '24h', '7d' -> timedelta; пустое значение -> default"""
+        if not value:
+            return default
+        match = RobotActivityService.DURATION_RE.match(str(value).strip().lower())
+        if not match or int(match.group(1)) <= 0:
+            raise ValueError(f"Неверная длительность '{value}', ожидается например 15m, 24h или 7d")
+        return timedelta(**{RobotActivityService.UNITS[match.group(2)]: int(match.group(1))})
+
+    @staticmethod
+    def validate(window, bucket):
+        max_window = timedelta(days=getattr(settings, 'ROBOT_ACTIVITY_MAX_WINDOW_DAYS', 30))
+        max_buckets = getattr(settings, 'ROBOT_ACTIVITY_MAX_BUCKETS', 1440)
+
+        if window > max_window:
+            raise ValueError(f"Окно не может быть больше {max_window.days} дней")
+        if bucket > window:
+            raise ValueError("Интервал не может быть больше окна")
+        if window / bucket > max_buckets:
+            raise ValueError(f"Слишком много интервалов: не больше {max_buckets}")
+
+    @staticmethod
+    def get_histogram(window=None, bucket=None, now=None, robot=None, zone=None):
+        """
+        Количество сканирований (и критических) по интервалам bucket за последние window.
+
+        Короткие окна (до ROBOT_ACTIVITY_RAW_MAX_HOURS) считаются по inventory_history,
+        интервалы отсчитываются от now - window. Длинные читаются из агрегатов scan_rollups
+        подходящего разрешения, тогда начало окна выравнивается по минуте/часу.
+        Пустые интервалы заполняются нулями. Возвращает {"activity": [...], "resolution": ...}.
+        """
+        from warehouse.models import InventoryHistory, ScanRollup
+        from warehouse.services import ScanRollupService
+
+        window = window or RobotActivityService.DEFAULT_WINDOW
+        bucket = bucket or RobotActivityService.DEFAULT_BUCKET
+        RobotActivityService.validate(window, bucket)
+
+        now = now or timezone.now()
+        start = now - window
+
+        resolution = None
+        if window > timedelta(hours=getattr(settings, 'ROBOT_ACTIVITY_RAW_MAX_HOURS', 6)):
+            resolution = ScanRollupService.choose_resolution(start, bucket, now)
+
+        if resolution:
+            start = ScanRollupService.truncate(start, resolution)
+            qs = ScanRollup.objects.filter(resolution=resolution, bucket__gte=start, bucket__lt=now)
+            time_field = 'bucket'
+            totals = {'scan_count': Sum('scans'), 'critical_count': Sum('critical')}
+        else:
+            qs = InventoryHistory.objects.filter(scanned_at__gte=start, scanned_at__lt=now)
+            time_field = 'scanned_at'
+            totals = {'scan_count': Count('id'), 'critical_count': Count('id', filter=Q(status='CRITICAL'))}
+
+        if robot:
+            qs = qs.filter(robot_id=robot)
+        if zone:
+            qs = qs.filter(zone=zone)
+
+        counts = {
+            item['interval']: item
+            for item in qs.annotate(interval=DateBin(Value(bucket), time_field, Value(start)))
+            .values('interval')
+            .annotate(**totals)
+        }
+
+        time_format = "%H:%M" if window <= timedelta(days=1) else "%d.%m %H:%M"
+        buckets_count = -(-(now - start) // bucket)
+        data = []
+        for i in range(buckets_count):
+            bucket_start = start + bucket * i
+            item = counts.get(bucket_start, {})
+            data.append({
+                "time": bucket_start.strftime(time_format),
+                "scans": item.get('scan_count') or 0,
+                "critical": item.get('critical_count') or 0,
+            })
+
+        return {"activity": data, "resolution": resolution or 'raw'}
@@ -0,0 +1,117 @@
+from collections import Counter
+from datetime import datetime, time
+
+from django.db import connection, transaction
+from django.db.models import CharField, Count, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+
+class ScanCounterService:
+    """Сервис дневных счётчиков сканирований (таблица daily_scan_counters)"""
+
+    @staticmethod
+    def count_by_day(rows):
+        """
+        Группирует пары (scanned_at, status) в {(day, status): count}.
+        Статус None хранится как пустая строка.
+        """
+        counts = Counter()
+        for scanned_at, status in rows:
+            if scanned_at is None:
+                continue
+            counts[(timezone.localdate(scanned_at), status or '')] += 1
+        return counts
+
+    @staticmethod
+    def increment(source, counts):
+        """
+        Атомарно прибавляет counts ({(day, status): n}) к счётчикам источника.
+        Выполняется одним INSERT ... ON CONFLICT DO UPDATE, поэтому безопасен
+        при параллельной записи и участвует во внешней транзакции.
+        """
+        from warehouse.models import DailyScanCounter
+
+        counts = {key: n for key, n in counts.items() if n}
+        if not counts:
+            return
+
+        table = connection.ops.quote_name(DailyScanCounter._meta.db_table)
+        placeholders = ', '.join(['(%s, %s, %s, %s)'] * len(counts))
+        params = []
+        for (day, status), n in counts.items():
+            params.extend([day, source, status, n])
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (day, source, status, count) VALUES {placeholders} '
+                f'ON CONFLICT (day, source, status) DO UPDATE SET count = {table}.count + EXCLUDED.count',
+                params
+            )
+
+    @staticmethod
+    def get_day_statistics(day=None, source='robot'):
+        """Возвращает checked_today/critical_stock за день одним запросом к счётчикам"""
+        from warehouse.models import DailyScanCounter
+
+        day = day or timezone.localdate()
+        counters = DailyScanCounter.objects.filter(day=day, source=source).values_list('status', 'count')
+
+        checked = 0
+        critical = 0
+        for status, count in counters:
+            checked += count
+            if status == 'CRITICAL':
+                critical += count
+
+        return {
+            'checked_today': checked,
+            'critical_stock': critical,
+        }
+
+    @staticmethod
+    def rebuild(since=None):
+        """
+        Пересчитывает счётчики по inventory_history и импортам CSV.
+        since - дата, начиная с которой пересчитывать (по умолчанию вся история).
+        Возвращает количество записанных строк счётчиков.
+        """
+        from inventory.models import InventoryCSVImport
+        from inventory.services import calculate_status_sql
+        from warehouse.models import DailyScanCounter, InventoryHistory
+
+        history = InventoryHistory.objects.filter(scanned_at__isnull=False)
+        imports = InventoryCSVImport.objects.all()
+        counters = DailyScanCounter.objects.all()
+
+        if since:
+            since_start = timezone.make_aware(datetime.combine(since, time.min))
+            history = history.filter(scanned_at__gte=since_start)
+            imports = imports.filter(scanned_at__gte=since_start)
+            counters = counters.filter(day__gte=since)
+
+        sources = [
+            (DailyScanCounter.SOURCE_ROBOT, history.annotate(bucket_status=Coalesce('status', Value('')))),
+            # Статус строки CSV - по количеству: старые импорты сохраняли status='OK' для любого остатка
+            (DailyScanCounter.SOURCE_CSV, imports.annotate(
+                bucket_status=RawSQL(calculate_status_sql('quantity'), [], output_field=CharField())
+            )),
+        ]
+
+        rows = []
+        for source, qs in sources:
+            grouped = qs.annotate(day=TruncDate('scanned_at')).values('day', 'bucket_status').annotate(n=Count('id'))
+            for item in grouped:
+                rows.append(DailyScanCounter(
+                    day=item['day'],
+                    source=source,
+                    status=item['bucket_status'],
+                    count=item['n'],
+                ))
+
+        with transaction.atomic():
+            counters.delete()
+            DailyScanCounter.objects.bulk_create(rows, batch_size=1000)
+
+        return len(rows)
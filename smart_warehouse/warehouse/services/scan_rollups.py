@@ -0,0 +1,162 @@
+from collections import defaultdict
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncHour, TruncMinute
+from django.utils import timezone
+
+
+class ScanRollupService:
+    """
+    Сервис агрегатов активности роботов (таблица scan_rollups).
+
+    Каждое сканирование прибавляется к минутному и часовому агрегату своего робота и зоны.
+    Минутные строки хранятся SCAN_ROLLUP_MINUTE_RETENTION_HOURS часов (удаляет compact_scan_rollups),
+    часовые - бессрочно. Границы интервалов - по UTC.
+    """
+
+    RESOLUTIONS = {
+        'minute': timedelta(minutes=1),
+        'hour': timedelta(hours=1),
+    }
+
+    TRUNC = {
+        'minute': TruncMinute,
+        'hour': TruncHour,
+    }
+
+    @staticmethod
+    def minute_retention():
+        return timedelta(hours=getattr(settings, 'SCAN_ROLLUP_MINUTE_RETENTION_HOURS', 48))
+
+    @staticmethod
+    def truncate(value, resolution):
+        """Начало минуты/часа (UTC), в которые попадает value"""
+        value = value.astimezone(dt_timezone.utc).replace(second=0, microsecond=0)
+        if resolution == 'hour':
+            value = value.replace(minute=0)
+        return value
+
+    @staticmethod
+    def count(rows):
+        """
+        Группирует сканы (scanned_at, robot_id, zone, status) по агрегатам.
+        Возвращает {(resolution, bucket, robot_id, zone): [scans, critical]}.
+        """
+        counts = defaultdict(lambda: [0, 0])
+        for scanned_at, robot_id, zone, status in rows:
+            if scanned_at is None:
+                continue
+            for resolution in ScanRollupService.RESOLUTIONS:
+                key = (resolution, ScanRollupService.truncate(scanned_at, resolution), robot_id, zone or '')
+                counts[key][0] += 1
+                counts[key][1] += status == 'CRITICAL'
+        return counts
+
+    @staticmethod
+    def increment(rows):
+        """
+        Прибавляет сканы к агрегатам одним INSERT ... ON CONFLICT DO UPDATE
+        (в той же транзакции, что и запись истории).
+        """
+        from warehouse.models import ScanRollup
+
+        counts = ScanRollupService.count(rows)
+        if not counts:
+            return
+
+        table = connection.ops.quote_name(ScanRollup._meta.db_table)
+        placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(counts))
+        params = []
+        for (resolution, bucket, robot_id, zone), (scans, critical) in counts.items():
+            params.extend([resolution, bucket, robot_id, zone, scans, critical])
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (resolution, bucket, robot_id, zone, scans, critical) VALUES {placeholders} '
+                f'ON CONFLICT (resolution, bucket, robot_id, zone) DO UPDATE SET '
+                f'scans = {table}.scans + EXCLUDED.scans, critical = {table}.critical + EXCLUDED.critical',
+                params
+            )
+
+    @staticmethod
+    def choose_resolution(start, bucket, now=None):
+        """
+        Агрегат, из которого можно построить график с шагом bucket от start:
+        шаг кратен разрешению, а для минут - окно в пределах хранения минутных строк.
+        None - агрегаты не подходят, нужно считать по inventory_history.
+        """
+        now = now or timezone.now()
+        if bucket % ScanRollupService.RESOLUTIONS['hour'] == timedelta(0):
+            return 'hour'
+        if bucket % ScanRollupService.RESOLUTIONS['minute'] == timedelta(0):
+            if start >= now - ScanRollupService.minute_retention():
+                return 'minute'
+        return None
+
+    @staticmethod
+    def rebuild(since=None, resolutions=None):
+        """
+        Пересчитывает агрегаты по inventory_history начиная с since (по умолчанию - всю историю;
+        минутные - не глубже срока хранения). Возвращает количество записанных строк.
+        """
+        from warehouse.models import InventoryHistory, ScanRollup
+
+        resolutions = resolutions or list(ScanRollupService.RESOLUTIONS)
+        now = timezone.now()
+
+        total = 0
+        for resolution in resolutions:
+            start = since
+            if resolution == 'minute':
+                oldest = now - ScanRollupService.minute_retention()
+                start = max(start, oldest) if start else oldest
+            if start:
+                start = ScanRollupService.truncate(start, resolution)
+
+            history = InventoryHistory.objects.all()
+            rollups = ScanRollup.objects.filter(resolution=resolution)
+            if start:
+                history = history.filter(scanned_at__gte=start)
+                rollups = rollups.filter(bucket__gte=start)
+
+            trunc = ScanRollupService.TRUNC[resolution]
+            grouped = history.annotate(
+                rollup_bucket=trunc('scanned_at', tzinfo=dt_timezone.utc)
+            ).values('rollup_bucket', 'robot_id', 'zone').annotate(
+                total=Count('id'),
+                critical_total=Count('id', filter=Q(status='CRITICAL')),
+            )
+
+            rows = [
+                ScanRollup(
+                    resolution=resolution,
+                    bucket=item['rollup_bucket'],
+                    robot_id=item['robot_id'],
+                    zone=item['zone'] or '',
+                    scans=item['total'],
+                    critical=item['critical_total'],
+                )
+                for item in grouped.iterator(chunk_size=5000)
+            ]
+
+            with transaction.atomic():
+                rollups.delete()
+                ScanRollup.objects.bulk_create(rows, batch_size=2000)
+            total += len(rows)
+
+        return total
+
+    @staticmethod
+    def prune_minutes(now=None):
+        """Удаляет минутные агрегаты старше срока хранения. Возвращает количество удалённых строк."""
+        from warehouse.models import ScanRollup
+
+        before = (now or timezone.now()) - ScanRollupService.minute_retention()
+        deleted, _ = ScanRollup.objects.filter(
+            resolution=ScanRollup.RESOLUTION_MINUTE,
+            bucket__lt=ScanRollupService.truncate(before, 'minute'),
+        ).delete()
+        return deleted
@@ -0,0 +1,76 @@
+from django.db import connection
+
+
+class SyntheticDataService:
+    """
+    Генерация синтетической истории сканирований для нагрузочных замеров (только PostgreSQL).
+    Строки создаются одним INSERT ... SELECT generate_series на стороне БД.
+    """
+
+    @staticmethod
+    def seed_history(count):
+        """Добавляет count сканирований по существующим роботам и товарам за последние 90 дней"""
+        from inventory.models import InventoryObservation
+        from inventory.services import ObservationService, calculate_status_sql
+        from products.models import Product
+        from robots.models import Robot
+        from warehouse.models import InventoryHistory
+
+        if not Robot.objects.exists() or not Product.objects.exists():
+            raise ValueError('Для генерации сканирований нужны роботы и товары (manage_init_data.py)')
+
+        last_id = ObservationService.last_id(InventoryObservation.SOURCE_HISTORY)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {InventoryHistory._meta.db_table}
+                    (robot_id, product_id, quantity, zone, row_number, shelf_number, status, scanned_at, created_at)
+                SELECT
+                    r.ids[1 + g %% array_length(r.ids, 1)],
+                    p.ids[1 + (g / 7) %% array_length(p.ids, 1)],
+                    quantity,
+                    chr(65 + g %% 26),
+                    1 + (g / 26) %% 50,
+                    1 + g %% 10,
+                    {calculate_status_sql('quantity')},
+                    now() - random() * interval '90 days',
+                    now()
+                FROM (SELECT g, (random() * 100)::int AS quantity FROM generate_series(1, %s) AS g) AS s
+                CROSS JOIN (SELECT array_agg(id) AS ids FROM {Robot._meta.db_table}) AS r
+                CROSS JOIN (SELECT array_agg(id) AS ids FROM {Product._meta.db_table}) AS p
+                """,
+                [count]
+            )
+            ObservationService.record_after(InventoryObservation.SOURCE_HISTORY, last_id)
+            cursor.execute(f"ANALYZE {InventoryHistory._meta.db_table}")
+            cursor.execute(f"ANALYZE {InventoryObservation._meta.db_table}")
+
+    @staticmethod
+    def seed_csv(count):
+        """Добавляет count строк импорта CSV по 1000 условным товарам"""
+        from inventory.models import InventoryCSVImport, InventoryObservation
+        from inventory.services import ObservationService, calculate_status_sql
+
+        last_id = ObservationService.last_id(InventoryObservation.SOURCE_CSV)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {InventoryCSVImport._meta.db_table}
+                    (product_id, product_name, quantity, zone, row_number, shelf_number, scanned_at, created_at, status)
+                SELECT
+                    'TEST' || lpad((g %% 1000)::text, 4, '0'),
+                    'Товар ' || (g %% 1000),
+                    quantity,
+                    chr(65 + g %% 26),
+                    1 + (g / 26) %% 50,
+                    1 + g %% 10,
+                    now() - random() * interval '90 days',
+                    now(),
+                    {calculate_status_sql('quantity')}
+                FROM (SELECT g, (random() * 100)::int AS quantity FROM generate_series(1, %s) AS g) AS s
+                """,
+                [count]
+            )
+            ObservationService.record_after(InventoryObservation.SOURCE_CSV, last_id)
+            cursor.execute(f"ANALYZE {InventoryCSVImport._meta.db_table}")
+            cursor.execute(f"ANALYZE {InventoryObservation._meta.db_table}")
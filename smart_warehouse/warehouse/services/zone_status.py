@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+
+class ZoneStatusService:
+    """
+    Карта склада: последний скан каждой ячейки (зона, ряд).
+
+    Стратегии выборки (настройка ZONE_STATUS_STRATEGY):
+    - 'cells' - готовая таблица cell_states, одна строка на ячейку;
+    - 'distinct_on' - SELECT DISTINCT ON (zone, row_number) по inventory_history (PostgreSQL);
+    - 'window' - ROW_NUMBER() OVER (PARTITION BY zone, row_number) по inventory_history.
+    Все стратегии читают только сериализуемые колонки и дают одинаковый ответ.
+    """
+
+    STRATEGIES = ('cells', 'distinct_on', 'window')
+
+    # Колонки, из которых собирается ответ
+    FIELDS = ['zone', 'row_number', 'scanned_at', 'status', 'quantity', 'product_name', 'product_id', 'robot_id']
+
+    @staticmethod
+    def get_grid():
+        """Сетка склада из настроек: (буквы зон, количество рядов в зоне)"""
+        zones = getattr(settings, 'WAREHOUSE_ZONES', 'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+        rows = getattr(settings, 'WAREHOUSE_ROWS', 50)
+        return list(zones), rows
+
+    @staticmethod
+    def get_strategy():
+        return getattr(settings, 'ZONE_STATUS_STRATEGY', 'cells')
+
+    @staticmethod
+    def latest_scans(strategy=None):
+        """Queryset values() с последним сканом каждой ячейки сетки"""
+        from warehouse.models import CellState, InventoryHistory
+
+        strategy = strategy or ZoneStatusService.get_strategy()
+        if strategy not in ZoneStatusService.STRATEGIES:
+            raise ValueError(f"Неизвестная стратегия карты склада: {strategy}")
+
+        zones, rows_count = ZoneStatusService.get_grid()
+        model = CellState if strategy == 'cells' else InventoryHistory
+        qs = model.objects.filter(
+            zone__in=zones,
+            row_number__gte=1,
+            row_number__lte=rows_count,
+        ).annotate(product_name=F('product__name'))
+
+        if strategy == 'distinct_on':
+            qs = qs.order_by('zone', 'row_number', '-scanned_at', '-id').distinct('zone', 'row_number')
+        elif strategy == 'window':
+            qs = qs.annotate(
+                position=Window(
+                    RowNumber(),
+                    partition_by=[F('zone'), F('row_number')],
+                    order_by=[F('scanned_at').desc(), F('id').desc()],
+                )
+            ).filter(position=1)
+
+        return qs.values(*ZoneStatusService.FIELDS)
+
+    @staticmethod
+    def get_zone_status(strategy=None):
+        """Карта склада {"A1": {...} | None, ...} по сетке из настроек"""
+        zones, rows_count = ZoneStatusService.get_grid()
+        cells = {
+            (scan['zone'], scan['row_number']): scan
+            for scan in ZoneStatusService.latest_scans(strategy)
+        }
+
+        zone_status = {}
+        for zone in zones:
+            for row in range(1, rows_count + 1):
+                scan = cells.get((zone, row))
+
+                if scan:
+                    zone_status[f"{zone}{row}"] = {
+                        'time': scan['scanned_at'].isoformat() if scan['scanned_at'] else None,
+                        'status': scan['status'],
+                        'quantity': scan['quantity'],
+                        'product': scan['product_name'],
+                        'product_id': str(scan['product_id']),
+                        'robot_id': str(scan['robot_id']),
+                        'zone': zone,
+                        'row': row,
+                    }
+                else:
+                    zone_status[f"{zone}{row}"] = None
+
+        return zone_status
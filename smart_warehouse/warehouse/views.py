@@ -2,9 +2,6 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 import random
-from django.utils import timezone
-from datetime import timedelta
-from .models import InventoryHistory
 from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from .models import AIPrediction
@@ -14,7 +11,8 @@ from .serializers import (
     PredictionResponseSerializer,
     AIPredictionSerializer
 )
-from .services import AIPredictionService, PredictionProviderFactory
+from .services import AIPredictionService, PredictionProviderFactory, RobotActivityService
+from inventory.pagination import KeysetPagination, estimate_count
 
 
 class WarehousePredictAPIView(APIView):
@@ -145,6 +143,24 @@ class PredictionHistoryAPIView(APIView):
     )
     def get(self, request, product_id):
         product = get_object_or_404(Product, id=product_id)
+
+        if KeysetPagination.is_requested(request):
+            # Курсорный режим: страница по (prediction_date, id) без OFFSET
+            paginator = KeysetPagination(['-prediction_date', '-id'])
+            history = AIPrediction.objects.filter(product=product).select_related('product')
+            page = paginator.paginate_queryset(history, request)
+            serializer = AIPredictionSerializer(page, many=True)
+
+            return Response({
+                "product_id": product_id,
+                "product_name": product.name,
+                "history": serializer.data,
+                "count": len(serializer.data),
+                "total": estimate_count(history),
+                "total_is_estimate": True,
+                "pagination": paginator.get_pagination_data(),
+            }, status=status.HTTP_200_OK)
+
         limit = int(request.query_params.get('limit', 10))
 
         history = AIPredictionService.get_prediction_history(product, limit)
@@ -159,22 +175,32 @@ class PredictionHistoryAPIView(APIView):
 
 
 class RobotActivityAPIView(APIView):
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='window', type=str, description='Окно, например 1h, 24h, 7d (по умолчанию 1h)', required=False),
+            OpenApiParameter(name='bucket', type=str, description='Интервал, например 1m, 15m, 1h (по умолчанию 1m)', required=False),
+            OpenApiParameter(name='robot', type=str, description='Только сканы робота', required=False),
+            OpenApiParameter(name='zone', type=str, description='Только сканы зоны', required=False),
+        ],
+        description='Количество сканирований роботов по интервалам (один запрос к БД при любом числе интервалов)'
+    )
     def get(self, request):
-        now = timezone.now()
-        one_hour_ago = now - timedelta(hours=1)
-
-        scans = InventoryHistory.objects.filter(scanned_at__gte=one_hour_ago)
-
-        data = []
-        for i in range(60):
-            minute_start = one_hour_ago + timedelta(minutes=i)
-            minute_end = minute_start + timedelta(minutes=1)
-            count = scans.filter(scanned_at__gte=minute_start, scanned_at__lt=minute_end).count()
-            data.append({
-                "time": minute_start.strftime("%H:%M"),
-                "scans": count
-            })
-
-        return Response({"activity": data})
+        try:
+            window = RobotActivityService.parse_duration(
+                request.query_params.get('window'), RobotActivityService.DEFAULT_WINDOW
+            )
+            bucket = RobotActivityService.parse_duration(
+                request.query_params.get('bucket'), RobotActivityService.DEFAULT_BUCKET
+            )
+            result = RobotActivityService.get_histogram(
+                window,
+                bucket,
+                robot=request.query_params.get('robot'),
+                zone=request.query_params.get('zone'),
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(result)
 
 